@@ -0,0 +1,214 @@
+import builtins
+import json
+import math
+import os
+import random
+import tempfile
+
+from drb.container import (
+    RESOURCE_FLAGS, is_timeout, run_in_container, run_with_stdin, write_files,
+)
+from drb.native import NATIVE_ENGINE, native_command, run_native
+
+DEFAULT_SIZES = [100, 1000, 10000, 100000, 1000000]
+BENCH_TIMEOUT = 90
+SIZE_BUDGET = 1.0  # seconds one call may take before larger sizes are skipped
+REPEAT = 3
+MIN_TIME = 0.02  # seconds a timing sample must span; fast calls are repeated
+MAX_ELEMENTS = 10 ** 6  # cap on input copies held per sample (calls * n)
+RESULT_MARKER = "__DRB_BENCH__"
+
+MODELS = [
+    ("O(1)", lambda n: 1.0),
+    ("O(log n)", lambda n: math.log2(n)),
+    ("O(n)", lambda n: float(n)),
+    ("O(n log n)", lambda n: n * math.log2(n)),
+    ("O(n^2)", lambda n: float(n) * n),
+]
+
+# Generators come from problem JSON files and only need to build plain data.
+SAFE_BUILTINS = {
+    name: getattr(builtins, name)
+    for name in ("abs", "dict", "enumerate", "int", "len", "list", "max", "min",
+                 "range", "reversed", "set", "sorted", "str", "sum", "tuple", "zip")
+}
+
+
+def load_generator(generator: str):
+    """The generate(n, rng) function defined by a problem's generator source."""
+    namespace = {"__builtins__": SAFE_BUILTINS}
+    exec(generator, namespace)
+    return namespace["generate"]
+
+
+def generate_inputs(generator: str, sizes: list, seed: int = 0) -> list:
+    """Build benchmark inputs from a problem's generator source.
+
+    generator defines generate(n, rng) returning the argument list for one
+    call at size n; rng is a random.Random seeded per size so runs compare
+    like with like.
+    """
+    generate = load_generator(generator)
+    return [{"n": n, "args": generate(n, random.Random(seed + n))} for n in sizes]
+
+
+def fit_complexity(timings: list):
+    """Pick the growth model that best explains [(n, seconds), ...].
+
+    Each model is fitted as seconds = c * f(n) by least squares on the
+    relative error, so small and large sizes weigh the same. Returns None
+    with fewer than three sizes.
+    """
+    points = [(n, t) for n, t in timings if t > 0]
+    if len(points) < 3:
+        return None
+    best = None
+    for label, f in MODELS:
+        ratios = [f(n) / t for n, t in points]
+        c = sum(ratios) / sum(r * r for r in ratios)
+        error = sum((c * r - 1) ** 2 for r in ratios)
+        if best is None or error < best[0]:
+            best = (error, label)
+    return best[1]
+
+
+def parse_results(output: str) -> dict:
+    """Collect the driver's marker lines into per-module timings."""
+    results = {}
+    for line in output.splitlines():
+        if not line.startswith(RESULT_MARKER):
+            continue
+        try:
+            record = json.loads(line[len(RESULT_MARKER):])
+        except ValueError:
+            continue
+        entry = results.setdefault(record.get("module"), {"timings": [], "error": None})
+        if "error" in record:
+            entry["error"] = record["error"]
+        else:
+            entry["timings"].append([record["n"], record["seconds"]])
+    return results
+
+
+def run_benchmark(user_code: str, problem: dict, pack: dict, pack_dir: str,
+                  engine: str, image: str, cpuset: str = "0",
+                  timeout: int = BENCH_TIMEOUT, name: str = None,
+                  on_output=None, resource_flags=RESOURCE_FLAGS,
+                  transport: str = "mount") -> dict:
+    """Time the user's solution against growing inputs in the pack image.
+
+    The pack's bench driver calls the problem's benchmark entry point with
+    generated inputs, first in the reference solution (if the problem has
+    one) and then in the user's, pinned to the cpuset CPUs. Sizes stop
+    growing once a single call takes longer than SIZE_BUDGET. With the
+    native engine the driver runs in the host sandbox under taskset. With
+    transport "stdin" the files reach the container as a tar stream (see
+    drb.container.run_with_stdin) rather than a bind-mounted temp directory.
+    Returns dict with 'passed', 'output' (a report) and 'benchmark'.
+    """
+    spec = problem.get("benchmark")
+    if not spec or not pack.get("bench_command"):
+        return {"passed": False, "output": "This problem has no benchmark."}
+
+    solution_file = pack.get("solution_file", "solution.py")
+    ext = os.path.splitext(solution_file)[1]
+    modules = ["solution"]
+    files = {solution_file: user_code}
+    if problem.get("reference_solution"):
+        modules.insert(0, "reference")
+        files[f"reference{ext}"] = problem["reference_solution"]
+    driver = pack["bench_driver"]
+    with open(os.path.join(pack_dir, driver)) as f:
+        files[driver] = f.read()
+    files["bench.json"] = json.dumps({
+        "entry": spec["entry"],
+        "modules": modules,
+        "cases": generate_inputs(spec["generator"], spec.get("sizes", DEFAULT_SIZES)),
+        "budget": SIZE_BUDGET,
+        "repeat": REPEAT,
+        "min_time": MIN_TIME,
+        "max_elements": MAX_ELEMENTS,
+    })
+
+    # Streaming keeps the sizes measured so far if the run times out.
+    def progress(line):
+        _progress(line, on_output)
+
+    if engine == NATIVE_ENGINE:
+        command = f"taskset -c {cpuset} {native_command(pack, 'bench_command')}"
+        run = run_native(command, files, timeout, name=name, on_output=progress,
+                         resource_flags=resource_flags)
+    elif transport == "stdin":
+        run = run_with_stdin(engine, image, pack["bench_command"], files, timeout,
+                             name=name, on_output=progress,
+                             extra_flags=[f"--cpuset-cpus={cpuset}"],
+                             resource_flags=resource_flags)
+    else:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            write_files(tmpdir, files)
+            run = run_in_container(engine, image, pack["bench_command"], tmpdir,
+                                   timeout, name=name, on_output=progress,
+                                   extra_flags=[f"--cpuset-cpus={cpuset}"],
+                                   resource_flags=resource_flags)
+
+    results = parse_results(run["output"])
+    for module in modules:
+        entry = results.setdefault(module, {"timings": [], "error": None})
+        entry["complexity"] = fit_complexity(entry["timings"])
+    solution = results["solution"]
+    if is_timeout(run) and not solution["error"]:
+        solution["error"] = f"Timed out after {timeout} seconds; larger sizes were not measured."
+    elif not solution["timings"] and not solution["error"]:
+        solution["error"] = run["output"][-2000:] or "The benchmark produced no timings."
+    return {
+        "passed": not solution["error"],
+        "output": format_report(problem, results, modules, cpuset),
+        "benchmark": {module: results[module] for module in modules},
+    }
+
+
+def _progress(line: str, on_output):
+    """Forward a driver line to on_output, rewriting markers for people."""
+    if on_output is None:
+        return
+    if line.startswith(RESULT_MARKER):
+        module, entry = parse_results(line).popitem()
+        if entry["error"]:
+            line = f"{module}: error: {entry['error']}\n"
+        else:
+            n, seconds = entry["timings"][0]
+            line = f"{module}: n={n} {seconds * 1000:.3f} ms\n"
+    on_output(line)
+
+
+def format_report(problem: dict, results: dict, modules: list, cpuset: str) -> str:
+    sizes = sorted({n for m in modules for n, _ in results[m]["timings"]})
+    lines = [
+        f"Benchmark: {problem.get('title', problem.get('id', ''))} "
+        f"(best of {REPEAT}, CPU {cpuset})",
+        "",
+        f"{'n':>10}" + "".join(f"{m:>14}" for m in modules),
+    ]
+    for n in sizes:
+        row = f"{n:>10}"
+        for m in modules:
+            seconds = dict(results[m]["timings"]).get(n)
+            cell = "-" if seconds is None else f"{seconds * 1000:.3f} ms"
+            row += f"{cell:>14}"
+        lines.append(row)
+    lines.append("")
+    for m in modules:
+        entry = results[m]
+        lines.append(f"{m}: {entry['complexity'] or 'not enough sizes to estimate'}")
+        if entry["error"]:
+            lines.append(f"  error: {entry['error']}")
+    if "reference" in modules:
+        common = [n for n in sizes
+                  if n in dict(results["solution"]["timings"])
+                  and n in dict(results["reference"]["timings"])]
+        if common:
+            n = common[-1]
+            ratio = dict(results["solution"]["timings"])[n] / max(
+                dict(results["reference"]["timings"])[n], 1e-9)
+            lines.append(f"At n={n} the solution takes {ratio:.1f}x the reference's time.")
+    return "\n".join(lines)
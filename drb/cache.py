@@ -0,0 +1,86 @@
+import hashlib
+import json
+import os
+import tempfile
+
+DEFAULT_CACHE_MB = 20
+
+
+def cache_key(user_code: str, test_code: str, test_command: str,
+              image_id: str) -> str:
+    """Hash everything that can change the outcome of a test run."""
+    h = hashlib.sha256()
+    for part in (user_code, test_code, test_command, image_id):
+        h.update(part.encode())
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class ResultCache:
+    """Content-addressed test results on disk, evicted least-recently-used.
+
+    Each result is a small JSON file named after its key. Hits bump the
+    file's mtime, and writes evict the oldest files once the directory
+    grows past max_bytes.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = DEFAULT_CACHE_MB * 1024 * 1024):
+        self._dir = cache_dir
+        self._max_bytes = max_bytes
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self._dir, f"{key}.json")
+
+    def get(self, key: str):
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                result = json.load(f)
+        except (OSError, ValueError):
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return result
+
+    def put(self, key: str, result: dict):
+        os.makedirs(self._dir, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self._dir, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(result, f)
+        os.replace(tmp, self._path(key))
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        total = 0
+        for entry in os.scandir(self._dir):
+            if not entry.name.endswith(".json"):
+                continue
+            st = entry.stat()
+            entries.append((st.st_mtime, st.st_size, entry.path))
+            total += st.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self._max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+
+def create_result_cache(config: dict, state_dir: str):
+    """Build the result cache from config.json, or None if disabled.
+
+    "result_cache_mb" bounds the cache size (default 20); 0 turns it off.
+    """
+    size_mb = config.get("result_cache_mb", DEFAULT_CACHE_MB)
+    if not size_mb:
+        return None
+    return ResultCache(
+        os.path.join(state_dir, "cache", "results"),
+        max_bytes=int(float(size_mb) * 1024 * 1024),
+    )
@@ -0,0 +1,46 @@
+import os
+import re
+import shlex
+
+# Top-level test definitions per test file type. Python and Ruby cases are
+# named by their method, Go cases by their function, and JavaScript cases by
+# the string passed to test()/it().
+CASE_PATTERNS = {
+    ".py": re.compile(r"^def (test_\w+)\s*\(", re.M),
+    ".rb": re.compile(r"^\s*def (test_\w+)\b", re.M),
+    ".js": re.compile(r"""^\s*(?:test|it)\(\s*(['"`])((?:(?!\1).)+)\1""", re.M),
+    ".go": re.compile(r"^func (Test\w*)\(\w+ \*testing\.T\)", re.M),
+}
+
+
+def discover_cases(test_code: str, test_file: str) -> list:
+    """List the names of the individual test cases in test_code.
+
+    Returns an empty list for file types drb cannot split.
+    """
+    pattern = CASE_PATTERNS.get(os.path.splitext(test_file)[1])
+    if pattern is None:
+        return []
+    names = []
+    for match in pattern.finditer(test_code):
+        name = match.group(match.lastindex)
+        if name not in names:
+            names.append(name)
+    return names
+
+
+def case_filter(test_file: str, name: str) -> str:
+    """The value a test runner needs to select exactly one case.
+
+    jest's -t and go test's -run take regular expressions over the test
+    name, so the name is escaped and anchored; pytest node IDs and minitest
+    -n take names as-is.
+    """
+    if test_file.endswith((".js", ".go")):
+        return f"^{re.escape(name)}$"
+    return name
+
+
+def case_command(template: str, test_file: str, name: str) -> str:
+    """Fill a pack's case_command template for one case."""
+    return template.replace("{case}", shlex.quote(case_filter(test_file, name)))
@@ -1,3 +1,4 @@
+import argparse
 import json
 import os
 import shutil
@@ -5,6 +6,7 @@ import signal
 import socket
 import subprocess
 import sys
+import threading
 
 
 DEFAULT_STATE_DIR = os.path.expanduser("~/.dont-rust-bro")
@@ -26,14 +28,19 @@ def is_daemon_running(state_dir: str) -> bool:
         return False
 
 
-def send_to_daemon(state_dir: str, command: str) -> dict:
+def send_to_daemon(state_dir: str, command: str, **params) -> dict:
     """Send a command to the running daemon via Unix socket."""
     sock_path = os.path.join(state_dir, "daemon.sock")
     client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
     client.settimeout(5)
     client.connect(sock_path)
-    client.sendall(json.dumps({"command": command}).encode() + b"\n")
-    data = client.recv(4096)
+    client.sendall(json.dumps({"command": command, **params}).encode() + b"\n")
+    data = b""
+    while not data.endswith(b"\n"):
+        chunk = client.recv(4096)
+        if not chunk:
+            break
+        data += chunk
     client.close()
     return json.loads(data.decode())
 
@@ -59,13 +66,31 @@ def ensure_daemon(state_dir: str):
                 break
 
 
+def _positive_int(value: str) -> int:
+    """argparse type for counts such as --workers."""
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"expected a positive integer, got {value!r}")
+    return number
+
+
+def _packs_dir(state_dir: str) -> str:
+    packs_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "packs")
+    if not os.path.isdir(packs_dir):
+        packs_dir = os.path.join(state_dir, "packs")
+    return packs_dir
+
+
 def main(argv=None):
     args = argv if argv is not None else sys.argv[1:]
     state_dir = DEFAULT_STATE_DIR
 
     if not args:
         print("Usage: drb <command>")
-        print("Commands: show, hide, stop, status, update, packs, tutor, uninstall")
+        print("Commands: show, hide, stop, status, update, packs, grade, stats, tutor, uninstall")
         sys.exit(1)
 
     command = args[0]
@@ -93,9 +118,7 @@ def main(argv=None):
 
     elif command == "packs":
         sub = args[1] if len(args) > 1 else "list"
-        packs_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "packs")
-        if not os.path.isdir(packs_dir):
-            packs_dir = os.path.join(state_dir, "packs")
+        packs_dir = _packs_dir(state_dir)
 
         from drb.problems import list_packs
         from drb.state import StateManager
@@ -114,22 +137,316 @@ def main(argv=None):
                 sys.exit(1)
             from drb.problems import load_pack
             from drb.container import load_config, ensure_image
+            from drb.engine_api import configure
             pack_data = load_pack(packs_dir, pack_name)
             config = load_config(os.path.join(state_dir, "config.json"))
             engine = config.get("engine", "docker")
+            configure(config)
             pack_dir = os.path.join(packs_dir, pack_name)
-            try:
-                ensure_image(engine, pack_data["image"], dockerfile_dir=pack_dir)
-            except Exception as e:
-                print(f"Failed to build/pull image '{pack_data['image']}': {e}", file=sys.stderr)
-                sys.exit(1)
+            image = pack_data["image"]
+            resp = None
+            if engine == "native":
+                from drb.native import missing_tools
+                missing = missing_tools((pack_data.get("native") or {}).get("requires", ()))
+                if missing:
+                    print(f"Warning: the native engine needs {', '.join(missing)} "
+                          f"on PATH to run this pack.", file=sys.stderr)
+            elif is_daemon_running(state_dir):
+                # Let the daemon build in the background so switching is instant.
+                try:
+                    resp = send_to_daemon(state_dir, "build_image",
+                                          image=image, dockerfile_dir=pack_dir)
+                except (ConnectionRefusedError, FileNotFoundError, socket.timeout):
+                    pass
+            if resp is None and engine != "native":
+                try:
+                    ensure_image(engine, image, dockerfile_dir=pack_dir)
+                except Exception as e:
+                    print(f"Failed to build/pull image '{image}': {e}", file=sys.stderr)
+                    sys.exit(1)
             sm = StateManager(state_dir)
             sm.active_pack = pack_name
             sm.current_problem_index = 0
             sm.clear_code()
             print(f"Switched to pack: {pack_name}")
+            if resp is not None and resp.get("state") == "building":
+                print(f"Building image '{image}' in the background. "
+                      f"Follow it with: drb packs status {pack_name}")
+        elif sub == "prepare":
+            from drb.problems import load_pack
+            from drb.container import load_config
+            from drb.engine_api import configure
+            from drb.images import ImageRegistry, prepare_images
+
+            parser = argparse.ArgumentParser(prog="drb packs prepare")
+            parser.add_argument("names", nargs="*")
+            parser.add_argument("--all", action="store_true")
+            parser.add_argument("--workers", type=_positive_int, default=os.cpu_count() or 2)
+            options = parser.parse_args(args[2:])
+            names = options.names + (list_packs(packs_dir) if options.all else [])
+            workers = options.workers
+            if not names:
+                names = [StateManager(state_dir).active_pack]
+
+            targets = []
+            native = {}
+            for name in sorted(set(names)):
+                try:
+                    pack_data = load_pack(packs_dir, name)
+                except FileNotFoundError:
+                    print(f"Pack '{name}' not found.", file=sys.stderr)
+                    sys.exit(1)
+                targets.append((name, pack_data["image"], os.path.join(packs_dir, name)))
+                native[name] = (pack_data.get("native") or {}).get("requires", ())
+
+            config = load_config(os.path.join(state_dir, "config.json"))
+            engine = config.get("engine", "docker")
+            configure(config)
+            if engine == "native":
+                # No images to build; check the host has each pack's tools.
+                from drb.native import missing_tools
+                ok = True
+                for name, requires in native.items():
+                    missing = missing_tools(requires)
+                    ok = ok and not missing
+                    state = f"missing {', '.join(missing)}" if missing else "ready"
+                    print(f"  {name:<12} native       {state}")
+                if not ok:
+                    sys.exit(1)
+                return
+            registry = ImageRegistry(state_dir, engine)
+            print_lock = threading.Lock()
+
+            def show(pack_name, line):
+                with print_lock:
+                    print(f"[{pack_name}] {line.rstrip()}", flush=True)
+
+            results = prepare_images(registry, engine, targets,
+                                     workers=min(workers, len(targets)),
+                                     on_output=show)
+            print()
+            for r in results:
+                size = f"{r['size'] / 1e6:.1f} MB" if r["size"] else "-"
+                print(f"  {r['pack']:<12} {r['image']:<20} {r['state']:<8} "
+                      f"{r['seconds']:>6.1f}s  {size}")
+                if r["error"]:
+                    print(f"    {r['error']}")
+            if any(r["state"] != "ready" for r in results):
+                sys.exit(1)
+        elif sub == "verify":
+            from drb.container import configure_output, ensure_image, load_config
+            from drb.engine_api import configure
+            from drb.problems import load_pack
+            from drb.verify import format_row, verify_packs
+
+            parser = argparse.ArgumentParser(prog="drb packs verify")
+            parser.add_argument("names", nargs="*")
+            parser.add_argument("--all", action="store_true")
+            parser.add_argument("--workers", type=_positive_int, default=os.cpu_count() or 2)
+            options = parser.parse_args(args[2:])
+            names = options.names + (list_packs(packs_dir) if options.all else [])
+            workers = options.workers
+            names = sorted(set(names or [StateManager(state_dir).active_pack]))
+            config = load_config(os.path.join(state_dir, "config.json"))
+            engine = config.get("engine", "docker")
+            configure(config)
+            configure_output(config)
+            for name in names:
+                try:
+                    image = load_pack(packs_dir, name)["image"]
+                except FileNotFoundError:
+                    print(f"Pack '{name}' not found.", file=sys.stderr)
+                    sys.exit(1)
+                if engine == "native":
+                    continue
+                try:
+                    ensure_image(engine, image, dockerfile_dir=os.path.join(packs_dir, name))
+                except Exception as e:
+                    print(f"Failed to build/pull image '{image}': {e}", file=sys.stderr)
+                    sys.exit(1)
+
+            rows = verify_packs(packs_dir, names, config, state_dir, workers=workers,
+                                on_result=lambda row: print(format_row(row), flush=True))
+            failed = [row for row in rows if not row["ok"]]
+            missing = sum(row["reference"] is None for row in rows)
+            slow = sum(row["slow"] for row in rows)
+            print()
+            for row in failed:
+                for error in row["errors"]:
+                    print(f"{row['pack']}/{row['problem']}: {error}")
+            print(f"{len(rows) - len(failed)}/{len(rows)} problems verified, "
+                  f"{missing} without a reference solution, {slow} slow")
+            if failed:
+                sys.exit(1)
+        elif sub == "prune-caches":
+            from drb.container import (
+                image_volume_prefix, list_cache_volumes, load_config, remove_cache_volumes,
+            )
+            from drb.native import remove_native_caches
+            from drb.problems import load_pack
+
+            config = load_config(os.path.join(state_dir, "config.json"))
+            engine = config.get("engine", "docker")
+            names = list_packs(packs_dir) if "--all" in args[2:] else args[2:]
+            packs = []
+            for name in names or [StateManager(state_dir).active_pack]:
+                try:
+                    packs.append(load_pack(packs_dir, name))
+                except FileNotFoundError:
+                    print(f"Pack '{name}' not found.", file=sys.stderr)
+                    sys.exit(1)
+            if engine == "native":
+                removed = [path for pack in packs for path in remove_native_caches(pack, state_dir)]
+            else:
+                # Every build of each pack's image, not just the current one.
+                prefixes = tuple(image_volume_prefix(pack["image"]) for pack in packs)
+                volumes = [name for name in list_cache_volumes(engine)
+                           if name.startswith(prefixes)]
+                removed = remove_cache_volumes(engine, volumes)
+                for volume in volumes:
+                    if volume not in removed:
+                        print(f"  {volume} is in use; stop drb and try again.")
+            for name in removed:
+                print(f"  removed {name}")
+            print(f"Removed {len(removed)} build cache(s).")
+        elif sub == "add-fixture" and len(args) > 3:
+            from drb.fixtures import add_fixture
+
+            pack_name, path = args[2], args[3]
+            if pack_name not in list_packs(packs_dir):
+                print(f"Pack '{pack_name}' not found.", file=sys.stderr)
+                sys.exit(1)
+            compress = ".gz" if "--gzip" in args[4:] else ".xz" if "--xz" in args[4:] else None
+            try:
+                digest = add_fixture(os.path.join(packs_dir, pack_name), path, compress)
+            except OSError as e:
+                print(f"Could not add fixture: {e}", file=sys.stderr)
+                sys.exit(1)
+            print(digest)
+            print(f'Reference it from a problem as "fixtures": '
+                  f'{{"{os.path.basename(path)}": "{digest}"}}')
+        elif sub == "status":
+            from drb.problems import load_pack
+            names = args[2:] or list_packs(packs_dir)
+            for name in names:
+                try:
+                    image = load_pack(packs_dir, name)["image"]
+                except FileNotFoundError:
+                    print(f"Pack '{name}' not found.", file=sys.stderr)
+                    sys.exit(1)
+                try:
+                    resp = send_to_daemon(state_dir, "image_status", image=image,
+                                          dockerfile_dir=os.path.join(packs_dir, name))
+                except (ConnectionRefusedError, FileNotFoundError):
+                    print("Daemon is not running.", file=sys.stderr)
+                    sys.exit(1)
+                line = f"  {name}: {image} {resp.get('state', 'unknown')}"
+                if resp.get("elapsed") is not None:
+                    line += f" ({resp['elapsed']}s)"
+                print(line)
+                if resp.get("error"):
+                    print(f"    {resp['error']}")
+                if resp.get("state") == "building":
+                    for progress in resp.get("progress", [])[-5:]:
+                        print(f"    {progress}")
         else:
-            print("Usage: drb packs [list|use <name>]")
+            print("Usage: drb packs [list|use <name>|status [name...]|"
+                  "prepare [--all|name...] [--workers N]|"
+                  "verify [--all|name...] [--workers N]|prune-caches [--all|name...]|"
+                  "add-fixture <name> <file> [--gzip|--xz]]")
+
+    elif command == "grade":
+        if len(args) < 2 or not os.path.isdir(args[1]):
+            print("Usage: drb grade <dir> [--pack NAME] [--workers N] "
+                  "[--output FILE.csv|FILE.json] [--no-pool]", file=sys.stderr)
+            sys.exit(1)
+        from drb.cache import create_result_cache
+        from drb.container import configure_output, ensure_image, load_config
+        from drb.engine_api import configure
+        from drb.grade import find_submissions, format_row, grade, write_report
+        from drb.pool import create_pool
+        from drb.problems import load_pack
+        from drb.runner import pack_run_options
+        from drb.state import StateManager
+
+        parser = argparse.ArgumentParser(prog="drb grade <dir>")
+        parser.add_argument("--pack")
+        parser.add_argument("--workers", type=_positive_int, default=os.cpu_count() or 2)
+        parser.add_argument("--output")
+        parser.add_argument("--no-pool", dest="use_pool", action="store_false")
+        options = parser.parse_args(args[2:])
+        packs_dir = _packs_dir(state_dir)
+        pack_name = options.pack or StateManager(state_dir).active_pack
+        workers, output, use_pool = options.workers, options.output, options.use_pool
+        try:
+            pack_data = load_pack(packs_dir, pack_name)
+        except FileNotFoundError:
+            print(f"Pack '{pack_name}' not found.", file=sys.stderr)
+            sys.exit(1)
+        submissions = find_submissions(args[1], pack_data)
+        if not submissions:
+            print(f"No solutions to {pack_name} problems found in {args[1]}.",
+                  file=sys.stderr)
+            sys.exit(1)
+
+        config = load_config(os.path.join(state_dir, "config.json"))
+        engine = config.get("engine", "docker")
+        configure(config)
+        configure_output(config)
+        if engine != "native":
+            try:
+                ensure_image(engine, pack_data["image"],
+                             dockerfile_dir=os.path.join(packs_dir, pack_name))
+            except Exception as e:
+                print(f"Failed to build/pull image '{pack_data['image']}': {e}",
+                      file=sys.stderr)
+                sys.exit(1)
+        workers = max(1, min(workers, len(submissions)))
+        # One warm container per worker, carrying the pack's limits and caches.
+        # Each grades a single submission and is then replaced, so nothing one
+        # leaves in its root or tmpfs caches reaches the next (see drb.grade).
+        pool = (create_pool(dict(config, pool_size=workers, pool_max_runs=1), state_dir)
+                if use_pool else None)
+        if pool is not None:
+            try:
+                pool.warm(pack_data["image"], harness=pack_data.get("harness"),
+                          flags=pack_run_options(pack_data, None, config, state_dir,
+                                                 private_caches=True)["resource_flags"])
+            except Exception as e:
+                print(f"Warning: no warm containers ({e}); "
+                      f"using one container per run.", file=sys.stderr)
+                pool.shutdown()
+                pool = None
+        print(f"Grading {len(submissions)} solutions with {workers} workers...")
+        try:
+            rows = grade(submissions, packs_dir, pack_name, config, state_dir, workers=workers,
+                         pool=pool, cache=create_result_cache(config, state_dir),
+                         on_result=lambda row: print(format_row(row), flush=True))
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        passed = sum(row["passed"] for row in rows)
+        print(f"\n{passed}/{len(rows)} passed")
+        if output:
+            write_report(rows, output)
+            print(f"Report written to {output}")
+
+    elif command == "stats":
+        sub = args[1] if len(args) > 1 else "runs"
+        if sub != "runs":
+            print("Usage: drb stats runs [--pack NAME]")
+            sys.exit(1)
+        from drb.stats import format_summary, load_runs, summarize
+
+        runs = load_runs(state_dir)
+        if "--pack" in args[2:]:
+            i = args.index("--pack", 2)
+            pack_name = args[i + 1] if i + 1 < len(args) else None
+            runs = [r for r in runs if r.get("pack") == pack_name]
+        if not runs:
+            print("No runs recorded yet.")
+            return
+        print(format_summary(summarize(runs)))
 
     elif command == "update":
         print("Pulling latest problems...")
@@ -1,7 +1,59 @@
+import codecs
+import hashlib
+import io
+import itertools
 import json
 import os
+import re
+import shlex
 import shutil
 import subprocess
+import tarfile
+import threading
+import time
+
+RESOURCE_FLAGS = ("--memory=256m", "--cpus=1")  # drb.limits.DEFAULT_LIMITS as flags
+TIMEOUT_MESSAGE = "Timeout: tests did not complete within {timeout} seconds."
+TRANSPORTS = ("mount", "stdin")
+STATS_MARKER = "__DRB_STATS__"
+REPORT_MARKER = "__DRB_REPORT__"  # see drb.reports.with_report
+
+# Runs a test command and then ends the output with a STATS_MARKER line
+# holding the container cgroup's memory peak and limit, its OOM-kill
+# counter before and after, and the wall-clock nanoseconds at which the
+# test command started and ended, followed by the shell's `times` (the CPU
+# time of the whole process tree). Paths cover cgroup v2 and the v1 memory
+# controller; missing values stay empty.
+STATS_SCRIPT = """\
+c=/sys/fs/cgroup
+oom() {{ sed -n 's/^oom_kill //p' $c/memory.events $c/memory/memory.oom_control 2>/dev/null | head -n 1; }}
+o=$(oom)
+s=$(date +%s%N)
+sh -c {command}
+r=$?
+e=$(date +%s%N)
+p={peak}
+l=$(cat $c/memory.max $c/memory/memory.limit_in_bytes 2>/dev/null | head -n 1)
+printf '\\n{marker} oom_before=%s oom_after=%s peak=%s limit=%s started=%s ended=%s\\n' \\
+    "$o" "$(oom)" "$p" "$l" "$s" "$e"
+times
+exit $r"""
+PEAK_PROBE = "$(cat $c/memory.peak $c/memory/memory.max_usage_in_bytes 2>/dev/null | head -n 1)"
+CACHE_VOLUME_PREFIX = "drb-cache-"
+PRIVATE_CACHE_MB = 256  # tmpfs size for a private cache without "max_mb"
+RUN_LABEL = "drb.run"  # value: the epoch second after which the run is overdue
+POOL_LABEL = "drb.pool"  # value: the PID of the process owning the pool
+REAP_GRACE = 30  # seconds past its timeout before a run container is an orphan
+OUTPUT_HEAD = 64 * 1024  # bytes kept from the start of a run's output...
+OUTPUT_TAIL = 64 * 1024  # ...and from its end; see OutputBuffer
+MAX_LINE = 8192  # characters of an unfinished line held back from on_output
+DROPPED_NOTICE = "[drb: {dropped} bytes of output dropped]"
+ENGINE_ERROR = 125  # exit codes from here up are the engine's or a signal's, not the tests'
+_DROPPED_LINE = re.compile(r"^\[drb: (\d+) bytes of output dropped\]$", re.M)
+
+_image_ids = {}
+_run_ids = itertools.count(1)
+_output_limits = [OUTPUT_HEAD, OUTPUT_TAIL]
 
 
 def detect_engine() -> str:
@@ -37,30 +89,698 @@ def ensure_image(engine: str, image: str, dockerfile_dir: str = None):
             )
 
 
+def is_timeout(result: dict) -> bool:
+    """Whether a run result ended because its timeout expired."""
+    return TIMEOUT_MESSAGE.split("{")[0] in result.get("output", "")
+
+
+def abnormal_exit(returncode) -> bool:
+    """Whether returncode means the engine failed or the run was killed.
+
+    Engines exit 125-127 when they cannot start the container, shells
+    128+N when a signal ends the command, and subprocess reports a signal
+    as -N; none of these say anything about the tests themselves.
+    """
+    return isinstance(returncode, int) and (returncode < 0 or returncode >= ENGINE_ERROR)
+
+
+def resolve_image_id(engine: str, image: str, refresh: bool = False):
+    """Return the local ID of image, or None if it cannot be inspected.
+
+    IDs are looked up once per process; pass refresh=True after building
+    an image so the new ID replaces the remembered one.
+    """
+    key = (engine, image)
+    if refresh:
+        _image_ids.pop(key, None)
+    if key not in _image_ids:
+        inspected = _api_inspect(engine, image)
+        if inspected is not None:
+            if inspected:
+                _image_ids[key] = inspected["Id"]
+            return _image_ids.get(key)
+        try:
+            result = subprocess.run(
+                [engine, "image", "inspect", "--format", "{{.Id}}", image],
+                capture_output=True, text=True, timeout=10,
+            )
+        except (OSError, subprocess.TimeoutExpired):
+            return None
+        if result.returncode != 0 or not result.stdout.strip():
+            return None
+        _image_ids[key] = result.stdout.strip()
+    return _image_ids[key]
+
+
+def image_size(engine: str, image: str):
+    """Return the size of a local image in bytes, or None if unknown."""
+    inspected = _api_inspect(engine, image)
+    if inspected is not None:
+        return inspected.get("Size")
+    try:
+        result = subprocess.run(
+            [engine, "image", "inspect", "--format", "{{.Size}}", image],
+            capture_output=True, text=True, timeout=10,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    try:
+        return int(result.stdout.strip())
+    except ValueError:
+        return None
+
+
+def _api_inspect(engine: str, image: str):
+    """Inspect image through the engine API if one is configured.
+
+    Returns the inspect dict, {} if the image does not exist, or None when
+    the CLI should be asked instead.
+    """
+    from drb.engine_api import EngineAPIError, client_for
+
+    client = client_for(engine)
+    if client is None:
+        return None
+    try:
+        return client.inspect_image(image)
+    except EngineAPIError as e:
+        return {} if e.status == 404 else None
+    except OSError:
+        return None
+
+
+def configure_output(config: dict):
+    """Size the OutputBuffer of every later run from config.json.
+
+    "output_head_kb" and "output_tail_kb" set how much of the start and
+    the end of a run's output is kept (64 each by default).
+    """
+    _output_limits[:] = [int(float(config.get("output_head_kb", OUTPUT_HEAD / 1024)) * 1024),
+                         int(float(config.get("output_tail_kb", OUTPUT_TAIL / 1024)) * 1024)]
+
+
+def output_limits() -> tuple:
+    """The (head, tail) byte counts set by configure_output."""
+    return tuple(_output_limits)
+
+
+class OutputBuffer:
+    """Keeps the first head and the last tail bytes written to it.
+
+    A solution printing in a tight loop would otherwise have all of its
+    output held in memory and shipped to the window. What falls between
+    head and tail is only counted; getvalue() marks the gap with a
+    DROPPED_NOTICE line. The stats and report blocks that with_stats and
+    with_report append come last, so the tail keeps them.
+    """
+
+    def __init__(self, head: int = None, tail: int = None):
+        default_head, default_tail = output_limits()
+        self.head_size = default_head if head is None else head
+        self.tail_size = default_tail if tail is None else tail
+        self._head = bytearray()
+        self._tail = bytearray()
+        self.dropped = 0
+
+    def write(self, data: bytes):
+        room = self.head_size - len(self._head)
+        if room > 0:
+            self._head += data[:room]
+            data = data[room:]
+        self._tail += data
+        excess = len(self._tail) - self.tail_size
+        if excess > 0:
+            del self._tail[:excess]
+            self.dropped += excess
+
+    def getvalue(self) -> str:
+        """The kept output as text, newlines normalized as in text mode."""
+        text = self._head.decode(errors="replace")
+        if self.dropped:
+            text += "\n" + DROPPED_NOTICE.format(dropped=self.dropped) + "\n"
+        text += self._tail.decode(errors="replace")
+        return text.replace("\r\n", "\n").replace("\r", "\n")
+
+
+def dropped_bytes(output: str) -> int:
+    """Bytes an OutputBuffer left out of output, going by its notice."""
+    match = _DROPPED_LINE.search(output)
+    return int(match.group(1)) if match else 0
+
+
+def stream_process(cmd: list, timeout: int, on_output, on_timeout=None,
+                   input: bytes = None, on_start=None):
+    """Run cmd, passing each line of merged stdout/stderr to on_output.
+
+    stderr is redirected into stdout so lines arrive in the order they were
+    written. on_timeout is called after the process is killed, e.g. to kill
+    the container the CLI was attached to. input, if given, is written to
+    the process's stdin, which is then closed. on_start, if given, is
+    called with the Popen object once the process is running.
+    Output is kept in an OutputBuffer, so a run printing without end costs
+    bounded memory; on_output still sees every line.
+    Returns (returncode, output); returncode is None on timeout.
+    """
+    process = subprocess.Popen(
+        cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+        stdin=subprocess.PIPE if input is not None else None,
+    )
+    if on_start is not None:
+        on_start(process)
+    if input is not None:
+        threading.Thread(
+            target=_feed_stdin, args=(process, input), daemon=True,
+        ).start()
+    timed_out = threading.Event()
+
+    def kill():
+        timed_out.set()
+        process.kill()
+        if on_timeout is not None:
+            on_timeout()
+
+    timer = threading.Timer(timeout, kill)
+    timer.start()
+    captured = OutputBuffer()
+    decoder = io.IncrementalNewlineDecoder(
+        codecs.getincrementaldecoder("utf-8")(errors="replace"), translate=True,
+    )
+    pending = ""
+    try:
+        while True:
+            data = process.stdout.read1(65536)
+            if not data:
+                break
+            captured.write(data)
+            lines = (pending + decoder.decode(data)).split("\n")
+            pending = lines.pop()
+            for line in lines:
+                on_output(line + "\n")
+            if len(pending) > MAX_LINE:
+                # A line without end; pass it on in pieces.
+                on_output(pending)
+                pending = ""
+        pending += decoder.decode(b"", final=True)
+        if pending:
+            on_output(pending)
+        process.wait()
+    finally:
+        timer.cancel()
+        process.stdout.close()
+    output = captured.getvalue()
+    if timed_out.is_set():
+        return None, output
+    return process.returncode, output
+
+
+def with_stats(test_command: str, peak: bool = True) -> str:
+    """Wrap test_command so the run reports its resource usage.
+
+    peak=False leaves out the cgroup memory peak, for long-lived containers
+    where it covers every run so far rather than this one.
+    """
+    return STATS_SCRIPT.format(
+        command=shlex.quote(test_command),
+        peak=PEAK_PROBE if peak else "",
+        marker=STATS_MARKER,
+    )
+
+
+def _int_or_none(value: str):
+    # cgroup v1 spells "no limit" as a number just under 2**63.
+    return int(value) if value.isdigit() and int(value) < 2 ** 60 else None
+
+
+def _split_stats(output: str):
+    """Cut the with_stats block off output.
+
+    Returns (output, fields, times): the marker line's key=value fields and
+    the `times` text, or (output, None, None) if there is no block.
+    """
+    start = output.rfind(STATS_MARKER)
+    if start < 0:
+        return output, None, None
+    block, output = output[start:], output[:start]
+    line, _, times = block.partition("\n")
+    fields = dict(item.partition("=")[::2] for item in line.split()[1:])
+    if not {"oom_before", "oom_after", "peak", "limit"} <= set(fields):
+        return output, None, None
+    return output, fields, times
+
+
+def _resources(fields: dict, times: str, wall_ms: int) -> dict:
+    # `times` prints the shell's own user/sys times, then its children's.
+    clock = re.findall(r"(\d+)m([\d.]+)s", times)
+    cpu_ms = None
+    if len(clock) >= 4:
+        cpu_ms = round(sum(int(m) * 60 + float(s) for m, s in clock[2:4]) * 1000)
+    oom_before, oom_after = fields["oom_before"], fields["oom_after"]
+    oom_killed = None
+    if oom_before.isdigit() and oom_after.isdigit():
+        oom_killed = int(oom_after) > int(oom_before)
+    return {
+        "wall_ms": wall_ms,
+        "cpu_ms": cpu_ms,
+        "peak_memory_bytes": _int_or_none(fields["peak"]),
+        "memory_limit_bytes": _int_or_none(fields["limit"]),
+        "oom_killed": oom_killed,
+    }
+
+
+def extract_stats(output: str, wall_ms: int):
+    """Split the with_stats line off output.
+
+    Returns (output, resources); resources is None if the line is missing,
+    otherwise a dict with 'wall_ms', 'cpu_ms', 'peak_memory_bytes',
+    'memory_limit_bytes' and 'oom_killed' (None where unknown).
+    """
+    output, fields, times = _split_stats(output)
+    if fields is None:
+        return output, None
+    return output, _resources(fields, times, wall_ms)
+
+
+def run_phases(fields: dict, started: float, finished: float):
+    """Split a run's wall time using the with_stats timestamps.
+
+    started and finished are host time.monotonic() values around the
+    engine call. Returns {'start', 'test', 'teardown'} in ms (engine and
+    container startup, the test command itself, and everything after it
+    such as --rm cleanup), or None if the timestamps are missing.
+    drb.runner adds its own phases around these.
+    """
+    began, ended = fields.get("started", ""), fields.get("ended", "")
+    if not (began.isdigit() and ended.isdigit()):
+        return None
+    # The container shares the host's clock; map its wall-clock stamps
+    # onto the monotonic clock the host measured with.
+    offset = time.time() - time.monotonic()
+    began = int(began) / 1e9 - offset
+    ended = int(ended) / 1e9 - offset
+    return {
+        "start": max(0, round((began - started) * 1000)),
+        "test": max(0, round((ended - began) * 1000)),
+        "teardown": max(0, round((finished - ended) * 1000)),
+    }
+
+
+def finish_run(returncode, output: str, started: float) -> dict:
+    """Build a run result, moving any with_stats line into 'resources'.
+
+    The result also gets 'phases' (see run_phases) when the line carries
+    timestamps, 'dropped_bytes' when its OutputBuffer dropped some, and
+    'exit_code' when the run ended abnormally (see abnormal_exit).
+    """
+    finished = time.monotonic()
+    output, fields, times = _split_stats(output)
+    result = {"passed": returncode == 0, "output": output.strip()}
+    if abnormal_exit(returncode):
+        result["exit_code"] = returncode
+    dropped = dropped_bytes(output)
+    if dropped:
+        result["dropped_bytes"] = dropped
+    if fields is not None:
+        result["resources"] = _resources(fields, times, round((finished - started) * 1000))
+        phases = run_phases(fields, started, finished)
+        if phases is not None:
+            result["phases"] = phases
+    return result
+
+
+def hide_stats(on_output):
+    """Wrap an on_output callback so it never sees the stats or report blocks."""
+    if on_output is None:
+        return None
+    seen = []
+
+    def forward(line):
+        if line.startswith((STATS_MARKER, REPORT_MARKER)):
+            seen.append(line)
+        if not seen:
+            on_output(line)
+
+    return forward
+
+
+def _feed_stdin(process, data: bytes):
+    try:
+        process.stdin.write(data)
+        process.stdin.close()
+    except (BrokenPipeError, OSError, ValueError):
+        pass
+
+
+def content_mtime(data: bytes) -> int:
+    """A modification time for a run file, derived from its content.
+
+    Run files keep their names from run to run, and bytecode caches
+    (CPython's, pytest's) trust a source whose mtime and size match the
+    cached entry; making the mtime a digest of the content keeps a shared
+    cache from serving code compiled from an earlier solution. 30 bits keep
+    it in the past, as tar warns about timestamps in the future.
+    """
+    return int.from_bytes(hashlib.sha256(data).digest()[:4], "big") >> 2
+
+
+def write_files(directory: str, files: dict):
+    """Write a {name: content} mapping into directory (see content_mtime)."""
+    for name, content in files.items():
+        data = content.encode() if isinstance(content, str) else content
+        path = os.path.join(directory, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        mtime = content_mtime(data)
+        os.utime(path, (mtime, mtime))
+
+
+def pack_files(files: dict) -> bytes:
+    """Pack a {name: content} mapping into an in-memory tar archive."""
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w") as tar:
+        for name, content in files.items():
+            data = content.encode() if isinstance(content, str) else content
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mode = 0o644
+            info.mtime = content_mtime(data)
+            tar.addfile(info, io.BytesIO(data))
+    return buf.getvalue()
+
+
+def resolve_transport(config: dict, engine: str) -> str:
+    """Pick how run files reach the container for this engine.
+
+    "transport" in config.json is either a single value or a mapping of
+    engine name to value, e.g. {"podman": "stdin", "docker": "mount"}.
+    """
+    transport = config.get("transport", "mount")
+    if isinstance(transport, dict):
+        transport = transport.get(engine, "mount")
+    if transport not in TRANSPORTS:
+        raise ValueError(f"Unknown transport '{transport}'; expected one of {TRANSPORTS}")
+    return transport
+
+
+def container_name(name: str = None) -> str:
+    """name, or one unique to this process for a run started without one.
+
+    Every run container is named so that it can be killed and removed by
+    name when its run times out or is cancelled.
+    """
+    return name or f"drb-run-{os.getpid()}-{next(_run_ids)}"
+
+
+def run_labels(timeout: int) -> dict:
+    """Labels marking a run container, and when reap_orphans may remove it."""
+    return {RUN_LABEL: str(int(time.time() + timeout + REAP_GRACE))}
+
+
 def run_in_container(engine: str, image: str, test_command: str,
-                     work_dir: str, timeout: int = 10) -> dict:
+                     work_dir: str, timeout: int = 10, name: str = None,
+                     on_output=None, extra_flags=(),
+                     resource_flags=RESOURCE_FLAGS) -> dict:
     """Run test command in an ephemeral container.
 
-    Mounts work_dir to /work inside the container.
+    Mounts work_dir to /work inside the container. The container is started
+    under name (see container_name) so it can be killed from elsewhere.
+    If on_output is given, output lines are passed to it as they arrive.
+    resource_flags set the memory/CPU/pids limits (see drb.limits), and
+    extra_flags are added to the engine's run options, e.g. --cpuset-cpus.
+    Uses the engine API instead of the CLI when one is configured (see
+    drb.engine_api).
     Returns dict with 'passed' (bool) and 'output' (str).
     """
+    name = container_name(name)
+    labels = run_labels(timeout)
+    result = _run_via_api(engine, image, test_command, work_dir=work_dir,
+                          timeout=timeout, name=name, labels=labels,
+                          on_output=on_output, extra_flags=extra_flags,
+                          resource_flags=resource_flags)
+    if result is not None:
+        return result
     cmd = [
-        engine, "run", "--rm",
+        engine, "run", "--rm", "--name", name,
+        *[f"--label={key}={value}" for key, value in labels.items()],
         "-v", f"{work_dir}:/work", "-w", "/work",
-        "--memory=256m", "--cpus=1",
-        image, "sh", "-c", test_command,
+        *resource_flags, *extra_flags,
+        image, "sh", "-c", with_stats(test_command),
+    ]
+    started = time.monotonic()
+    returncode, output = _run_cli(engine, name, cmd, timeout, on_output)
+    return finish_run(returncode, output, started)
+
+
+def run_with_stdin(engine: str, image: str, test_command: str, files: dict,
+                   timeout: int = 10, name: str = None, on_output=None,
+                   extra_flags=(), resource_flags=RESOURCE_FLAGS) -> dict:
+    """Run test command in an ephemeral container fed over stdin.
+
+    files ({name: content}) are streamed in as a tar archive and unpacked
+    into a tmpfs /work, so no host directory or bind mount is involved and
+    nothing is left on disk if the run is killed. extra_flags are as for
+    run_in_container. With the engine API the files are copied in before the container starts.
+    Returns dict with 'passed' (bool) and 'output' (str).
+    """
+    name = container_name(name)
+    labels = run_labels(timeout)
+    result = _run_via_api(engine, image, test_command, files=files,
+                          timeout=timeout, name=name, labels=labels,
+                          on_output=on_output, extra_flags=extra_flags,
+                          resource_flags=resource_flags)
+    if result is not None:
+        return result
+    cmd = [
+        engine, "run", "--rm", "-i", "--name", name,
+        *[f"--label={key}={value}" for key, value in labels.items()],
+        "--tmpfs", "/work:rw,exec,size=64m", "-w", "/work",
+        *resource_flags, *extra_flags,
+        image, "sh", "-c", "tar -xf - && " + with_stats(test_command),
     ]
+    started = time.monotonic()
+    returncode, output = _run_cli(engine, name, cmd, timeout, on_output,
+                                  input=pack_files(files))
+    return finish_run(returncode, output, started)
+
+
+def _run_cli(engine: str, name: str, cmd: list, timeout: int, on_output,
+             input: bytes = None):
+    """Run an engine CLI command that starts container name.
+
+    Returns (returncode, output), returncode None on timeout. Killing the
+    CLI client leaves the container running, so on a timeout or Ctrl-C
+    the container itself is killed and removed.
+    """
+    kwargs = {} if input is None else {"input": input}
     try:
-        result = subprocess.run(
-            cmd, capture_output=True, text=True, timeout=timeout,
+        returncode, output = stream_process(
+            cmd, timeout, hide_stats(on_output) or (lambda line: None),
+            lambda: remove_container(engine, name), **kwargs,
+        )
+    except KeyboardInterrupt:
+        remove_container(engine, name)
+        raise
+    if returncode is None:
+        output += "\n" + TIMEOUT_MESSAGE.format(timeout=timeout)
+    return returncode, output
+
+
+def _run_via_api(engine: str, image: str, test_command: str, **kwargs):
+    """Run through the engine API, or return None to use the CLI instead."""
+    from drb.engine_api import EngineAPIError, client_for, run_container
+
+    client = client_for(engine)
+    if client is None:
+        return None
+    try:
+        return run_container(client, image, test_command, **kwargs)
+    except (OSError, ValueError, EngineAPIError):
+        # Unreachable socket, a flag the API mapping lacks, or a missing
+        # image (which the CLI pulls).
+        return None
+
+
+def remove_container(engine: str, name: str):
+    """Kill and remove a container by name, ignoring containers that are gone."""
+    if engine == "native":
+        from drb.native import kill_native
+        kill_native(name)
+        return
+    from drb.engine_api import EngineAPIError, client_for
+
+    client = client_for(engine)
+    if client is not None:
+        try:
+            client.remove(name)
+            return
+        except (OSError, EngineAPIError):
+            pass
+    try:
+        subprocess.run(
+            [engine, "rm", "-f", name],
+            capture_output=True, timeout=30,
         )
-        output = result.stdout + result.stderr
-        passed = result.returncode == 0
     except subprocess.TimeoutExpired:
-        output = f"Timeout: tests did not complete within {timeout} seconds."
-        passed = False
+        pass
+
+
+def reap_orphans(engine: str) -> list:
+    """Kill and remove drb containers that nothing else will clean up.
+
+    A run container is orphaned once its RUN_LABEL deadline has passed,
+    e.g. because the process running it was killed before it could remove
+    it. A pool container is orphaned once the process in its POOL_LABEL
+    has exited. Returns the names of the containers removed.
+    """
+    result = subprocess.run(
+        [engine, "ps", "-a", "-q", "--filter", "name=drb-"],
+        capture_output=True, text=True, timeout=30,
+    )
+    ids = result.stdout.split()
+    if not ids:
+        return []
+    template = (f'{{{{.Name}}}}\t{{{{index .Config.Labels "{RUN_LABEL}"}}}}'
+                f'\t{{{{index .Config.Labels "{POOL_LABEL}"}}}}')
+    result = subprocess.run(
+        [engine, "inspect", "--format", template, *ids],
+        capture_output=True, text=True, timeout=30,
+    )
+    now = time.time()
+    orphans = []
+    for line in result.stdout.splitlines():
+        name, _, labels = line.partition("\t")
+        deadline, _, owner = labels.partition("\t")
+        if ((deadline.isdigit() and int(deadline) < now)
+                or (owner.isdigit() and not _process_alive(int(owner)))):
+            orphans.append(name.lstrip("/"))
+    for name in orphans:
+        remove_container(engine, name)
+    return orphans
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # alive, just not ours
+    return True
 
-    return {"passed": passed, "output": output.strip()}
+
+def image_volume_prefix(image: str) -> str:
+    """Prefix shared by the cache volumes of every build of image."""
+    return f"{CACHE_VOLUME_PREFIX}{re.sub(r'[^A-Za-z0-9.-]', '-', image)}_"
+
+
+def cache_volume(image: str, image_id: str, cache: dict) -> str:
+    """Name of the volume holding one of image's build caches.
+
+    cache is an entry of a pack's "caches": "name" identifies it, "path"
+    is where the toolchain keeps it, "env" (optional) a variable pointed
+    at that path, "max_mb" (optional) caps its size (see
+    trim_cache_volumes), and "read_only_ok" (optional) says the toolchain
+    can use it without writing to it (see cache_flags). Volumes are keyed
+    by image ID, so a rebuilt image never reads artifacts its
+    predecessor's toolchain wrote.
+    """
+    return f"{image_volume_prefix(image)}{image_id.split(':')[-1][:12]}_{cache['name']}"
+
+
+def cache_flags(engine: str, image: str, caches, private: bool = False) -> tuple:
+    """Run flags mounting a pack's "caches" as named volumes.
+
+    Volumes outlive the --rm containers using them, so a toolchain's
+    compiled artifacts carry over from one run to the next. A new volume
+    starts as a copy of what the image has at the cache path. Without an
+    image ID to key them by (the image is not built yet), runs go
+    uncached.
+
+    Runs of code nobody vouches for, such as a class's submissions, must
+    not leave artifacts for later runs to load. With private, caches whose
+    toolchain copes ("read_only_ok") are mounted read-only, so such runs
+    still reuse what trusted runs compiled; the others become an empty
+    tmpfs that goes away with its container. So does a read-only cache
+    whose volume does not exist yet, since a toolchain may not even start
+    on an empty cache it cannot write to.
+    """
+    image_id = resolve_image_id(engine, image) if caches else None
+    existing = None
+    if private and image_id and any(cache.get("read_only_ok") for cache in caches):
+        existing = set(list_cache_volumes(engine))
+    flags = []
+    for cache in caches or ():
+        if private and not (cache.get("read_only_ok") and existing
+                            and cache_volume(image, image_id, cache) in existing):
+            size = int(cache.get("max_mb") or PRIVATE_CACHE_MB)
+            flags.append(f"--tmpfs={cache['path']}:size={size}m")
+        elif image_id is None:
+            continue
+        else:
+            mode = ":ro" if private else ""
+            flags.append(f"--volume={cache_volume(image, image_id, cache)}:{cache['path']}{mode}")
+        if cache.get("env"):
+            flags.append(f"--env={cache['env']}={cache['path']}")
+    return tuple(flags)
+
+
+def list_cache_volumes(engine: str) -> list:
+    """Names of the cache volumes drb has created on engine."""
+    result = subprocess.run(
+        [engine, "volume", "ls", "-q", "--filter", f"name={CACHE_VOLUME_PREFIX}"],
+        capture_output=True, text=True, timeout=30,
+    )
+    return [name for name in result.stdout.split() if name.startswith(CACHE_VOLUME_PREFIX)]
+
+
+def trim_cache_volumes(engine: str, image: str, caches) -> list:
+    """Drop image's stale cache volumes and empty oversized ones.
+
+    Volumes left by earlier builds of image are removed. One throwaway
+    container then sizes the current build's capped volumes with du and
+    clears those over their "max_mb"; the next run rebuilds what it
+    needs. Emptied volumes no container mounts are removed too, so
+    private runs find them missing rather than empty (see cache_flags).
+    Returns the names of the volumes removed or emptied.
+    """
+    image_id = resolve_image_id(engine, image)
+    if not caches or image_id is None:
+        return []
+    existing = [name for name in list_cache_volumes(engine)
+                if name.startswith(image_volume_prefix(image))]
+    current = {cache_volume(image, image_id, cache) for cache in caches}
+    trimmed = remove_cache_volumes(engine, [name for name in existing if name not in current])
+    capped = [cache for cache in caches
+              if cache.get("max_mb") and cache_volume(image, image_id, cache) in existing]
+    if not capped:
+        return trimmed
+    cmd = [engine, "run", "--rm", "--network=none"]
+    checks = []
+    for i, cache in enumerate(capped):
+        cmd.append(f"--volume={cache_volume(image, image_id, cache)}:/drb-cache-{i}")
+        checks.append(
+            f'if [ "$(du -sk /drb-cache-{i} | cut -f1)" -gt {int(cache["max_mb"]) * 1024} ]; '
+            f"then find /drb-cache-{i} -mindepth 1 -delete; echo {i}; fi"
+        )
+    cmd += [image, "sh", "-c", "; ".join(checks)]
+    result = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
+    emptied = [cache_volume(image, image_id, capped[int(line)])
+               for line in result.stdout.split() if line.isdigit()]
+    remove_cache_volumes(engine, emptied)
+    return trimmed + emptied
+
+
+def remove_cache_volumes(engine: str, names) -> list:
+    """Remove cache volumes by name; returns those removed.
+
+    Volumes still mounted by a container (a warm pool's, say) stay.
+    """
+    removed = []
+    for name in names:
+        result = subprocess.run([engine, "volume", "rm", name],
+                                capture_output=True, text=True, timeout=60)
+        if result.returncode == 0:
+            removed.append(name)
+    return removed
 
 
 def load_config(config_path: str) -> dict:
@@ -2,8 +2,11 @@ import json
 import os
 import signal
 import socket
+import subprocess
 import threading
 
+REAP_INTERVAL = 300  # seconds between sweeps for orphaned containers
+
 
 class DaemonServer:
     """Unix socket server that manages GUI visibility."""
@@ -14,6 +17,8 @@ class DaemonServer:
         self._running = False
         self._server_socket = None
         self._gui = None
+        self._images = None
+        self._reaper_stop = None
 
         os.makedirs(state_dir, exist_ok=True)
         self.sock_path = os.path.join(state_dir, "daemon.sock")
@@ -27,8 +32,62 @@ class DaemonServer:
         if os.path.isfile(self._pid_path):
             os.remove(self._pid_path)
 
-    def _handle_command(self, command: str) -> dict:
-        if command == "show":
+    @property
+    def images(self):
+        """The ImageRegistry shared by socket clients and the GUI."""
+        if self._images is None:
+            from drb.container import load_config
+            from drb.engine_api import configure
+            from drb.images import ImageRegistry
+
+            config = load_config(os.path.join(self._state_dir, "config.json"))
+            configure(config)
+            self._images = ImageRegistry(self._state_dir, config.get("engine", "docker"))
+        return self._images
+
+    def start_reaper(self):
+        """Sweep for orphaned containers now and every "reap_interval" seconds.
+
+        Runs in a background thread; see drb.container.reap_orphans. A
+        "reap_interval" of 0 in config.json turns the sweeps off.
+        """
+        from drb.container import load_config
+
+        config = load_config(os.path.join(self._state_dir, "config.json"))
+        interval = float(config.get("reap_interval", REAP_INTERVAL))
+        engine = config.get("engine", "docker")
+        if interval <= 0 or engine == "native":
+            return None
+        self._reaper_stop = threading.Event()
+        thread = threading.Thread(target=self._reap_loop, args=(engine, interval),
+                                  daemon=True)
+        thread.start()
+        return thread
+
+    def _reap_loop(self, engine: str, interval: float):
+        from drb.container import reap_orphans
+
+        while True:
+            try:
+                reap_orphans(engine)
+            except (OSError, subprocess.SubprocessError):
+                pass  # engine missing or hung; try again next sweep
+            if self._reaper_stop.wait(interval):
+                return
+
+    def _handle_command(self, command: str, msg: dict = None) -> dict:
+        msg = msg or {}
+        if command == "build_image":
+            if not msg.get("image"):
+                return {"status": "error", "message": "Missing image"}
+            status = self.images.build_async(msg["image"], msg.get("dockerfile_dir"))
+            return {"status": "ok", **status}
+        elif command == "image_status":
+            if not msg.get("image"):
+                return {"status": "error", "message": "Missing image"}
+            status = self.images.status(msg["image"], msg.get("dockerfile_dir"))
+            return {"status": "ok", **status}
+        elif command == "show":
             if self._gui and not self._headless:
                 self._gui.show()
             return {"status": "ok", "visible": True}
@@ -54,7 +113,7 @@ class DaemonServer:
                 return
             msg = json.loads(data.decode().strip())
             command = msg.get("command", "")
-            response = self._handle_command(command)
+            response = self._handle_command(command, msg)
             conn.sendall(json.dumps(response).encode() + b"\n")
         except (json.JSONDecodeError, KeyError):
             conn.sendall(json.dumps({"status": "error", "message": "Invalid message"}).encode() + b"\n")
@@ -92,3 +151,5 @@ class DaemonServer:
 
     def shutdown(self):
         self._running = False
+        if self._reaper_stop is not None:
+            self._reaper_stop.set()
@@ -13,6 +13,7 @@ def main():
     from drb.daemon import DaemonServer
 
     server = DaemonServer(args.state_dir, headless=args.headless)
+    server.start_reaper()
 
     if args.headless:
         server.serve_forever()
@@ -30,9 +31,11 @@ def main():
 
         gui = PracticeWindow(state_dir=args.state_dir, packs_dir=packs_dir)
         server.set_gui(gui)
+        gui.images = server.images
         gui.run()
 
-        # GUI exited, stop server
+        # GUI exited, stop server and release warm containers
+        gui.shutdown()
         server.shutdown()
 
 
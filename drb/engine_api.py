@@ -0,0 +1,295 @@
+import http.client
+import json
+import os
+import socket
+import struct
+import threading
+import time
+import urllib.parse
+
+from drb.container import (
+    RESOURCE_FLAGS, TIMEOUT_MESSAGE, OutputBuffer, finish_run, hide_stats, pack_files,
+    with_stats,
+)
+from drb.limits import memory_bytes
+
+API_VERSION = "v1.41"  # served by Docker 20.10+ and podman's compat API
+SOCKET_CANDIDATES = {
+    "docker": ["/var/run/docker.sock"],
+    "podman": ["$XDG_RUNTIME_DIR/podman/podman.sock", "/run/podman/podman.sock"],
+}
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+class EngineAPIError(Exception):
+    """The engine answered a request with an error status."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(f"{status}: {message}")
+        self.status = status
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTPConnection over a Unix socket instead of TCP."""
+
+    def __init__(self, socket_path: str, timeout: float = 30):
+        super().__init__("localhost", timeout=timeout)
+        self._socket_path = socket_path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self._socket_path)
+        self.sock = sock
+
+
+class EngineClient:
+    """Talks to the Docker-compatible engine API over its Unix socket.
+
+    Short requests share one keep-alive connection, so a run costs a few
+    round trips instead of a CLI process; log streams get a connection of
+    their own since they stay open until the container exits. OSError
+    means the socket is unusable, EngineAPIError that the engine refused.
+    """
+
+    def __init__(self, socket_path: str):
+        self.socket_path = socket_path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def request(self, method: str, path: str, body=None, params: dict = None,
+                content_type: str = "application/json", timeout: float = 30):
+        """Send one request and return the decoded JSON (or raw bytes)."""
+        url = f"/{API_VERSION}{path}"
+        if params:
+            url += "?" + urllib.parse.urlencode(params)
+        if body is not None and not isinstance(body, bytes):
+            body = json.dumps(body).encode()
+        headers = {"Content-Type": content_type} if body is not None else {}
+        with self._lock:
+            for attempt in (0, 1):
+                if self._conn is None:
+                    self._conn = UnixHTTPConnection(self.socket_path)
+                self._conn.timeout = timeout
+                if self._conn.sock is not None:
+                    self._conn.sock.settimeout(timeout)
+                try:
+                    self._conn.request(method, url, body=body, headers=headers)
+                    response = self._conn.getresponse()
+                    data = response.read()
+                    break
+                except (http.client.HTTPException, OSError):
+                    # The engine may have closed an idle keep-alive connection.
+                    self._conn.close()
+                    self._conn = None
+                    if attempt:
+                        raise
+        if response.status >= 400:
+            try:
+                message = json.loads(data).get("message", "")
+            except ValueError:
+                message = data.decode(errors="replace")
+            raise EngineAPIError(response.status, message)
+        if response.getheader("Content-Type", "").startswith("application/json"):
+            return json.loads(data) if data else None
+        return data
+
+    def ping(self) -> bool:
+        try:
+            self.request("GET", "/_ping", timeout=2)
+            return True
+        except (OSError, EngineAPIError):
+            return False
+
+    def inspect_image(self, image: str) -> dict:
+        return self.request("GET", f"/images/{urllib.parse.quote(image, safe='')}/json")
+
+    def create(self, spec: dict, name: str = None) -> str:
+        params = {"name": name} if name else None
+        return self.request("POST", "/containers/create", spec, params)["Id"]
+
+    def put_archive(self, container: str, path: str, archive: bytes):
+        self.request("PUT", f"/containers/{container}/archive", archive,
+                     {"path": path}, content_type="application/x-tar")
+
+    def start(self, container: str):
+        self.request("POST", f"/containers/{container}/start")
+
+    def wait(self, container: str, timeout: float = 30) -> int:
+        return self.request("POST", f"/containers/{container}/wait",
+                            timeout=timeout)["StatusCode"]
+
+    def remove(self, container: str):
+        try:
+            self.request("DELETE", f"/containers/{container}", params={"force": "1"})
+        except EngineAPIError as e:
+            if e.status != 404:
+                raise
+
+    def follow_logs(self, container: str, on_chunk, timeout: float):
+        """Pass decoded stdout/stderr chunks to on_chunk until the container exits.
+
+        Raises socket.timeout if it is still running after timeout seconds.
+        """
+        conn = UnixHTTPConnection(self.socket_path, timeout=timeout)
+        deadline = time.monotonic() + timeout
+        try:
+            params = urllib.parse.urlencode({"follow": 1, "stdout": 1, "stderr": 1})
+            conn.request("GET", f"/{API_VERSION}/containers/{container}/logs?{params}")
+            response = conn.getresponse()
+            if response.status >= 400:
+                raise EngineAPIError(response.status, response.read().decode(errors="replace"))
+            while True:
+                conn.sock.settimeout(max(deadline - time.monotonic(), 0.01))
+                # Without a TTY the stream is multiplexed: an 8-byte header
+                # (stream type, 3 padding bytes, big-endian length) per frame.
+                header = response.read(8)
+                if len(header) < 8:
+                    return
+                size = struct.unpack(">xxxxL", header)[0]
+                on_chunk(response.read(size).decode(errors="replace"))
+        finally:
+            conn.close()
+
+
+def find_socket(engine: str):
+    """Locate the API socket for engine, honouring DOCKER_HOST / CONTAINER_HOST."""
+    for var in ("DOCKER_HOST", "CONTAINER_HOST"):
+        value = os.environ.get(var, "")
+        if value.startswith("unix://") and os.path.exists(value[len("unix://"):]):
+            return value[len("unix://"):]
+    for candidate in SOCKET_CANDIDATES.get(engine, []):
+        path = os.path.expandvars(candidate)
+        if "$" not in path and os.path.exists(path):
+            return path
+    return None
+
+
+def configure(config: dict):
+    """Set up (or drop) the API client for config's engine.
+
+    "engine_api" in config.json is true to find the engine's socket, a
+    socket path, or false (the default) to always use the CLI. Returns the
+    client, or None if the API is off or the socket does not answer.
+    """
+    engine = config.get("engine", "docker")
+    setting = config.get("engine_api", False)
+    if not setting:
+        with _clients_lock:
+            _clients.pop(engine, None)
+        return None
+    path = setting if isinstance(setting, str) else find_socket(engine)
+    with _clients_lock:
+        client = _clients.get(engine)
+        if client is not None and client.socket_path == path:
+            return client
+    client = EngineClient(path) if path else None
+    if client is not None and not client.ping():
+        client = None
+    with _clients_lock:
+        if client is None:
+            _clients.pop(engine, None)
+        else:
+            _clients[engine] = client
+    return client
+
+
+def client_for(engine: str):
+    """The configured API client for engine, or None to use its CLI."""
+    return _clients.get(engine)
+
+
+def host_config(flags) -> dict:
+    """Translate engine run flags into a HostConfig; ValueError if one has no mapping."""
+    config = {}
+    for flag in flags:
+        option, _, value = flag.partition("=")
+        if option == "--memory":
+            config["Memory"] = memory_bytes(value)
+        elif option == "--cpus":
+            config["NanoCpus"] = int(float(value) * 1e9)
+        elif option == "--pids-limit":
+            config["PidsLimit"] = int(value)
+        elif option == "--cpuset-cpus":
+            config["CpusetCpus"] = value
+        elif option == "--volume":
+            config.setdefault("Binds", []).append(value)
+        else:
+            raise ValueError(f"No engine API mapping for {flag}")
+    return config
+
+
+def run_container(client: EngineClient, image: str, test_command: str,
+                  work_dir: str = None, files: dict = None, timeout: int = 10,
+                  name: str = None, labels: dict = None, on_output=None,
+                  extra_flags=(), resource_flags=RESOURCE_FLAGS) -> dict:
+    """Run test command in an ephemeral container through the engine API.
+
+    The API counterpart of run_in_container (work_dir is bind-mounted at
+    /work) and run_with_stdin (files are copied into /work with the
+    archive endpoint before the container starts). The container is
+    removed in the background once its result is in, or right away if
+    the caller is interrupted.
+    Returns dict with 'passed' (bool) and 'output' (str).
+    """
+    flags = [*resource_flags, *extra_flags]
+    # --env belongs to the container, not its HostConfig.
+    env = [flag.partition("=")[2] for flag in flags if flag.startswith("--env=")]
+    spec = {
+        "Image": image,
+        "Cmd": ["sh", "-c", with_stats(test_command)],
+        "WorkingDir": "/work",
+        "HostConfig": host_config([flag for flag in flags if not flag.startswith("--env=")]),
+    }
+    if env:
+        spec["Env"] = env
+    if labels:
+        spec["Labels"] = labels
+    if work_dir is not None:
+        spec["HostConfig"].setdefault("Binds", []).append(f"{work_dir}:/work")
+    started = time.monotonic()
+    container = client.create(spec, name=name)
+    try:
+        if files is not None:
+            client.put_archive(container, "/work", pack_files(files))
+        client.start(container)
+        forward = hide_stats(on_output)
+        captured = OutputBuffer()
+        pending = [""]
+
+        def on_chunk(text):
+            captured.write(text.encode())
+            if forward is None:
+                return
+            lines = (pending[0] + text).split("\n")
+            pending[0] = lines.pop()
+            for line in lines:
+                forward(line + "\n")
+
+        try:
+            client.follow_logs(container, on_chunk, timeout)
+        except socket.timeout:
+            output = captured.getvalue() + "\n" + TIMEOUT_MESSAGE.format(timeout=timeout)
+            return finish_run(None, output, started)
+        if forward is not None and pending[0]:
+            forward(pending[0])
+        returncode = client.wait(container)
+        return finish_run(returncode, captured.getvalue(), started)
+    except KeyboardInterrupt:
+        # The process is on its way out; a background removal would die with it.
+        _remove_quietly(client, container)
+        container = None
+        raise
+    finally:
+        if container is not None:
+            threading.Thread(target=_remove_quietly, args=(client, container),
+                             daemon=True).start()
+
+
+def _remove_quietly(client: EngineClient, container: str):
+    try:
+        client.remove(container)
+    except (OSError, EngineAPIError):
+        pass
@@ -0,0 +1,134 @@
+import gzip
+import hashlib
+import lzma
+import os
+import shutil
+import tempfile
+import threading
+
+FIXTURES_DIR = "fixtures"  # in the state directory: the shared store and pack views
+FIXTURES_PATH = "/fixtures"  # where tests find them inside containers
+FIXTURES_ENV = "DRB_FIXTURES"
+PACK_FIXTURES = "fixtures"  # a pack's own, possibly compressed, copies
+COMPRESSORS = {".gz": gzip.open, ".xz": lzma.open}
+CHUNK = 1024 * 1024
+
+
+def fixture_digest(path: str) -> str:
+    """SHA-256 of the file at path, the name fixtures are stored under."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def add_fixture(pack_dir: str, path: str, compress: str = None) -> str:
+    """Store the file at path among pack_dir's fixtures; returns its digest.
+
+    compress is ".gz", ".xz" or None. The digest is that of the
+    uncompressed content either way, so it is what problems refer to.
+    """
+    if compress and compress not in COMPRESSORS:
+        raise ValueError(f"Unknown compression {compress!r}; use .gz or .xz.")
+    digest = fixture_digest(path)
+    store = os.path.join(pack_dir, PACK_FIXTURES)
+    os.makedirs(store, exist_ok=True)
+    target = os.path.join(store, digest + (compress or ""))
+    if not os.path.exists(target):
+        fd, tmp = tempfile.mkstemp(dir=store, suffix=".tmp")
+        os.close(fd)
+        try:
+            with open(path, "rb") as src, (COMPRESSORS.get(compress) or open)(tmp, "wb") as dst:
+                shutil.copyfileobj(src, dst, CHUNK)
+            os.replace(tmp, target)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+    return digest
+
+
+def fixture_view(pack: dict, state_dir: str) -> str:
+    """Host directory holding pack's fixtures under the names tests use."""
+    return os.path.join(state_dir, FIXTURES_DIR, "packs", pack["name"])
+
+
+def fixture_flags(pack: dict, state_dir: str) -> tuple:
+    """Run flags mounting pack's fixture view read-only at /fixtures.
+
+    Packs opt in with "fixtures": true, and the whole view is mounted, not
+    just one problem's files, so pool containers can serve every problem.
+    """
+    if not pack.get("fixtures"):
+        return ()
+    view = fixture_view(pack, state_dir)
+    os.makedirs(view, exist_ok=True)
+    return (f"--volume={view}:{FIXTURES_PATH}:ro", f"--env={FIXTURES_ENV}={FIXTURES_PATH}")
+
+
+def prepare_fixtures(pack: dict, problem: dict, pack_dir: str, state_dir: str) -> list:
+    """Put problem's fixtures into pack's fixture view; returns their names.
+
+    A problem's "fixtures" maps the file name its tests open (under
+    $DRB_FIXTURES) to the content's digest. Each digest is expanded from
+    pack_dir's fixtures once into a store under state_dir shared by all
+    packs, checked, made read-only and hard-linked into the view, so runs
+    neither copy nor decompress anything. Names are shared by all of a pack's problems; a
+    name whose content changed is relinked. Raises FileNotFoundError for a
+    digest the pack does not ship and ValueError for bad names or content
+    that does not match its digest.
+    """
+    fixtures = problem.get("fixtures") or {}
+    if not fixtures:
+        return []
+    view = fixture_view(pack, state_dir)
+    os.makedirs(view, exist_ok=True)
+    for name, digest in fixtures.items():
+        if os.path.basename(name) != name or name.startswith("."):
+            raise ValueError(f"Fixture name {name!r} must be a plain file name.")
+        blob = _expand(pack_dir, digest, state_dir)
+        entry = os.path.join(view, name)
+        if os.path.exists(entry) and os.path.samefile(entry, blob):
+            continue
+        tmp = f"{entry}.{os.getpid()}-{threading.get_ident()}.tmp"
+        if os.path.lexists(tmp):
+            os.remove(tmp)
+        try:
+            os.link(blob, tmp)
+        except OSError:
+            shutil.copyfile(blob, tmp)  # the store is on another filesystem
+        os.replace(tmp, entry)
+    return list(fixtures)
+
+
+def _expand(pack_dir: str, digest: str, state_dir: str) -> str:
+    """Path of digest's content in the shared store, expanding it if needed."""
+    store = os.path.join(state_dir, FIXTURES_DIR, "blobs")
+    blob = os.path.join(store, digest)
+    if os.path.exists(blob):
+        return blob
+    source = None
+    for suffix in ("", *COMPRESSORS):
+        candidate = os.path.join(pack_dir, PACK_FIXTURES, digest + suffix)
+        if os.path.isfile(candidate):
+            source = candidate, COMPRESSORS.get(suffix) or open
+            break
+    if source is None:
+        raise FileNotFoundError(f"Fixture {digest} is not in {pack_dir}/{PACK_FIXTURES}.")
+
+    os.makedirs(store, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=store, suffix=".tmp")
+    try:
+        hasher = hashlib.sha256()
+        with source[1](source[0], "rb") as src, os.fdopen(fd, "wb") as dst:
+            for chunk in iter(lambda: src.read(CHUNK), b""):
+                hasher.update(chunk)
+                dst.write(chunk)
+        if hasher.hexdigest() != digest:
+            raise ValueError(f"Fixture {source[0]} does not match its digest.")
+        os.chmod(tmp, 0o444)
+        os.replace(tmp, blob)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return blob
@@ -0,0 +1,154 @@
+import json
+import os
+import random
+import tempfile
+
+from drb.bench import load_generator
+from drb.container import (
+    RESOURCE_FLAGS, is_timeout, run_in_container, run_with_stdin, write_files,
+)
+from drb.native import NATIVE_ENGINE, native_command, run_native
+
+FUZZ_CASES = 2000
+MAX_SIZE = 12  # inputs are kept small so a counterexample is easy to read
+FUZZ_TIMEOUT = 60
+RESULT_MARKER = "__DRB_FUZZ__"
+COMPARE_MODES = ("returned", "unordered", "args")
+
+
+def generate_cases(generator: str, count: int = FUZZ_CASES, seed: int = 0) -> list:
+    """Random, distinct argument lists for a fuzz run, smallest first.
+
+    generator is the problem's generate(n, rng) source (see
+    drb.bench.generate_inputs); n cycles through 0..MAX_SIZE. Sizes the
+    generator cannot build (it raises) are skipped. Cases are ordered by
+    the length of their JSON, so the first one a solution fails is the
+    smallest counterexample found.
+    """
+    generate = load_generator(generator)
+    rng = random.Random(seed)
+    cases = {}
+    for i in range(count * 2):
+        if len(cases) >= count:
+            break
+        try:
+            args = generate(i % (MAX_SIZE + 1), rng)
+        except Exception:
+            continue
+        encoded = json.dumps(args)
+        cases.setdefault(encoded, args)
+    return [cases[key] for key in sorted(cases, key=lambda key: (len(key), key))]
+
+
+def parse_results(output: str) -> dict:
+    """The driver's last marker record, or {} if it printed none."""
+    record = {}
+    for line in output.splitlines():
+        if line.startswith(RESULT_MARKER):
+            try:
+                record = json.loads(line[len(RESULT_MARKER):])
+            except ValueError:
+                pass
+    return record
+
+
+def run_fuzz(user_code: str, problem: dict, pack: dict, pack_dir: str,
+             engine: str, image: str, timeout: int = FUZZ_TIMEOUT,
+             name: str = None, on_output=None, resource_flags=RESOURCE_FLAGS,
+             count: int = FUZZ_CASES, seed: int = None,
+             transport: str = "mount") -> dict:
+    """Compare the user's solution with the reference on random inputs.
+
+    The problem's "fuzz" spec names the entry point, a generator (see
+    generate_cases) and how results compare: "returned" values (the
+    default), "unordered" returned values (lists compared as multisets,
+    at every depth) or the "args" after the call, for solutions that work
+    in place. The pack's fuzz driver runs every case through both
+    solutions in one process and stops at the first disagreement; cases
+    on which the reference itself raises are skipped. Returns dict with
+    'passed', 'output' (a report) and 'fuzz': 'seed', 'cases' generated,
+    'checked', 'skipped' and, on failure, 'counterexample' with 'args',
+    'expected' and 'actual'. transport is as for drb.runner.run_tests.
+    """
+    spec = problem.get("fuzz")
+    if not spec or not pack.get("fuzz_command") or not problem.get("reference_solution"):
+        return {"passed": False, "output": "This problem has no fuzz test."}
+    if seed is None:
+        seed = random.randrange(2 ** 31)
+
+    solution_file = pack.get("solution_file", "solution.py")
+    ext = os.path.splitext(solution_file)[1]
+    files = {solution_file: user_code, f"reference{ext}": problem["reference_solution"]}
+    driver = pack["fuzz_driver"]
+    with open(os.path.join(pack_dir, driver)) as f:
+        files[driver] = f.read()
+    cases = generate_cases(spec["generator"], count, seed)
+    files["fuzz.json"] = json.dumps({
+        "entry": spec["entry"],
+        "compare": spec.get("compare", "returned"),
+        "cases": cases,
+    })
+
+    if engine == NATIVE_ENGINE:
+        run = run_native(native_command(pack, "fuzz_command"), files, timeout,
+                         name=name, on_output=on_output, resource_flags=resource_flags)
+    elif transport == "stdin":
+        run = run_with_stdin(engine, image, pack["fuzz_command"], files, timeout,
+                             name=name, on_output=on_output, resource_flags=resource_flags)
+    else:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            write_files(tmpdir, files)
+            run = run_in_container(engine, image, pack["fuzz_command"], tmpdir,
+                                   timeout, name=name, on_output=on_output,
+                                   resource_flags=resource_flags)
+
+    record = parse_results(run["output"])
+    fuzz = {"seed": seed, "cases": len(cases), "checked": record.get("checked", 0),
+            "skipped": record.get("skipped", 0)}
+    if "index" in record:
+        fuzz["counterexample"] = {
+            "args": cases[record["index"]],
+            "expected": record.get("expected"),
+            "actual": record.get("actual"),
+        }
+    error = None
+    if is_timeout(run):
+        error = (f"Timed out after {timeout} seconds; a case may make the "
+                 "solution loop forever.")
+    elif "error" in record:
+        error = record["error"]
+    elif "checked" not in record:
+        error = run["output"][-2000:] or "The fuzz driver reported nothing."
+    return {
+        "passed": error is None and "counterexample" not in fuzz,
+        "output": format_report(problem, spec, fuzz, error),
+        "fuzz": fuzz,
+    }
+
+
+def format_report(problem: dict, spec: dict, fuzz: dict, error: str = None) -> str:
+    lines = [f"Fuzz: {problem.get('title', problem.get('id', ''))} "
+             f"({fuzz['cases']} random inputs, seed {fuzz['seed']})", ""]
+    counterexample = fuzz.get("counterexample")
+    if counterexample:
+        args = ", ".join(json.dumps(arg) for arg in counterexample["args"])
+        lines.append(f"Counterexample after {fuzz['checked']} passing cases:")
+        lines.append(f"  {spec['entry']}({args})")
+        label = "args after the call" if spec.get("compare") == "args" else "returned"
+        lines.append(f"  expected ({label}): {_describe(counterexample['expected'])}")
+        lines.append(f"  actual ({label}):   {_describe(counterexample['actual'])}")
+    elif error:
+        lines.append(f"error: {error}")
+    else:
+        lines.append(f"All {fuzz['checked']} inputs matched the reference.")
+    if fuzz["skipped"]:
+        lines.append(f"({fuzz['skipped']} inputs the reference rejected were skipped.)")
+    return "\n".join(lines)
+
+
+def _describe(outcome) -> str:
+    if isinstance(outcome, dict) and "error" in outcome:
+        return f"raised {outcome['error']}"
+    if isinstance(outcome, dict) and "value" in outcome:
+        return json.dumps(outcome["value"])
+    return json.dumps(outcome)
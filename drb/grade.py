@@ -0,0 +1,145 @@
+import csv
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from drb.problems import load_pack, load_problem
+from drb.runner import pack_run_options, run_tests
+
+REPORT_FIELDS = (
+    "submitter", "problem", "file", "passed", "cached", "tests_passed",
+    "tests_total", "total_ms", "test_ms", "cpu_ms", "peak_memory_bytes", "error",
+)
+ERROR_CHARS = 500  # output kept per failing submission in the report
+
+
+def find_submissions(root: str, pack: dict) -> list:
+    """Find solutions to pack's problems under root.
+
+    A solution is a file named after a problem with the pack's solution
+    extension (two_sum.py), or the pack's solution file inside a directory
+    named after the problem (two_sum/solution.py). The directory holding it,
+    relative to root, names the submitter, so one directory per person or
+    model grades a whole team at once. Returns sorted
+    {"submitter", "problem", "path"} dicts.
+    """
+    solution_file = pack.get("solution_file", "solution.py")
+    ext = os.path.splitext(solution_file)[1]
+    problems = set(pack.get("problems", []))
+    submissions = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+        for filename in filenames:
+            stem, file_ext = os.path.splitext(filename)
+            if file_ext == ext and stem in problems:
+                problem, owner = stem, dirpath
+            elif filename == solution_file and os.path.basename(dirpath) in problems:
+                problem, owner = os.path.basename(dirpath), os.path.dirname(dirpath)
+            else:
+                continue
+            submitter = os.path.relpath(owner, root)
+            submissions.append({
+                "submitter": "" if submitter == "." else submitter,
+                "problem": problem,
+                "path": os.path.join(dirpath, filename),
+            })
+    return sorted(submissions, key=lambda s: (s["submitter"], s["problem"], s["path"]))
+
+
+def grade(submissions: list, packs_dir: str, pack_name: str, config: dict,
+          state_dir: str, workers: int = None, pool=None, cache=None, on_result=None) -> list:
+    """Run every submission's problem tests, workers at a time.
+
+    Runs go through drb.runner.run_tests with the same limits, commands and
+    reporter as the practice window, and cache is used the same way too.
+    No submission may leave anything behind for another to load, so build
+    caches are read-only or private (see drb.container.cache_flags), and
+    pool (warm containers, see drb.pool) must retire each container after
+    one run ("pool_max_runs" 1, as drb grade sets it): a container's root
+    and tmpfs caches are writable and outlive its runs. Workers are
+    threads: each spends its time waiting on a container. on_result(row) is called
+    as each submission finishes; one that could not be run at all gets a
+    failed row with the reason in 'error'. Returns report rows in
+    submission order.
+    """
+    pack = load_pack(packs_dir, pack_name)
+    engine = config.get("engine", "docker")
+    problems = {}
+    for sub in submissions:
+        if sub["problem"] not in problems:
+            problems[sub["problem"]] = load_problem(packs_dir, pack_name, sub["problem"])
+
+    def run(index, sub):
+        problem = problems[sub["problem"]]
+        started = time.monotonic()
+        try:
+            with open(sub["path"]) as f:
+                code = f.read()
+            result = run_tests(code, problem["test_code"], engine=engine, pool=pool,
+                               name=f"drb-grade-{os.getpid()}-{index}", cache=cache,
+                               **pack_run_options(pack, problem, config, state_dir,
+                                                  os.path.join(packs_dir, pack_name),
+                                                  private_caches=True))
+        except Exception as e:
+            # One unreadable file or broken run must not lose the others' rows.
+            result = {"passed": False, "output": f"Error: {e}"}
+        return report_row(sub, result, round((time.monotonic() - started) * 1000))
+
+    rows = [None] * len(submissions)
+    workers = max(1, min(workers or os.cpu_count() or 2, len(submissions) or 1))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(run, i, sub): i for i, sub in enumerate(submissions)}
+        for future in as_completed(futures):
+            row = future.result()
+            rows[futures[future]] = row
+            if on_result is not None:
+                on_result(row)
+    return rows
+
+
+def report_row(submission: dict, result: dict, elapsed_ms: int) -> dict:
+    """Flatten one run result into a report row (see REPORT_FIELDS)."""
+    tests = result.get("tests")
+    phases = result.get("phases") or {}
+    resources = result.get("resources") or {}
+    return {
+        "submitter": submission["submitter"],
+        "problem": submission["problem"],
+        "file": submission["path"],
+        "passed": bool(result.get("passed")),
+        "cached": bool(result.get("cached")),
+        "tests_passed": None if tests is None else sum(t["status"] == "passed" for t in tests),
+        "tests_total": None if tests is None else len(tests),
+        "total_ms": phases.get("total", elapsed_ms),
+        "test_ms": phases.get("test"),
+        "cpu_ms": resources.get("cpu_ms"),
+        "peak_memory_bytes": resources.get("peak_memory_bytes"),
+        "error": None if result.get("passed") else result.get("output", "")[-ERROR_CHARS:],
+    }
+
+
+def write_report(rows: list, path: str, fmt: str = None):
+    """Write rows as CSV or JSON; fmt defaults to path's extension."""
+    fmt = fmt or ("json" if path.endswith(".json") else "csv")
+    if fmt not in ("csv", "json"):
+        raise ValueError(f"Unknown report format '{fmt}'")
+    with open(path, "w", newline="") as f:
+        if fmt == "json":
+            json.dump(rows, f, indent=2)
+            f.write("\n")
+            return
+        writer = csv.DictWriter(f, fieldnames=REPORT_FIELDS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({k: "" if row[k] is None else row[k] for k in REPORT_FIELDS})
+
+
+def format_row(row: dict) -> str:
+    status = "PASS" if row["passed"] else "FAIL"
+    who = f"{row['submitter']}/" if row["submitter"] else ""
+    tests = ""
+    if row["tests_total"] is not None:
+        tests = f" {row['tests_passed']}/{row['tests_total']} tests"
+    cached = " (cached)" if row["cached"] else ""
+    return f"{status}  {who}{row['problem']}{tests} {row['total_ms']} ms{cached}"
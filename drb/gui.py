@@ -1,10 +1,58 @@
+import json
 import os
+import subprocess
+import threading
+import time
 
-from drb.container import load_config
+from drb.cache import create_result_cache
+from drb.container import configure_output, load_config, output_limits
+from drb.engine_api import configure as configure_engine_api
+from drb.jobs import JobRunner, fingerprint
 from drb.problems import load_pack, load_problem
 from drb.state import StateManager
 
 
+class OutputStream:
+    """Forwards streamed output lines to the page in small batches.
+
+    A print-heavy solution can produce thousands of lines per second; one
+    evaluate_js call per line would swamp the bridge, so lines are grouped
+    into at most one call per FLUSH_INTERVAL. Past limit characters
+    (the output head size by default) nothing more is streamed; the
+    run's result shows the kept head and tail when it finishes.
+    """
+
+    FLUSH_INTERVAL = 0.05
+    CAPPED_NOTICE = "[drb: more output follows; its end is shown when the run finishes]\n"
+
+    def __init__(self, window, job_id: str, limit: int = None):
+        self._pw = window
+        self._job_id = job_id
+        self._pending = []
+        self._last_flush = 0.0
+        self._left = output_limits()[0] if limit is None else limit
+
+    def write(self, line: str):
+        if self._left < 0:
+            return
+        if len(line) > self._left:
+            line = self.CAPPED_NOTICE
+            self._left = -1
+        else:
+            self._left -= len(line)
+        self._pending.append(line)
+        if time.monotonic() - self._last_flush >= self.FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        text = "".join(self._pending)
+        self._pending = []
+        self._last_flush = time.monotonic()
+        self._pw.eval_js(f"onRunOutput({json.dumps(self._job_id)}, {json.dumps(text)})")
+
+
 class Api:
     """JavaScript-callable API exposed via pywebview."""
 
@@ -37,24 +85,188 @@ class Api:
         return self.get_problem()
 
     def run_tests(self, code: str) -> dict:
-        from drb.runner import run_tests
-        from drb.container import load_config
+        """Start a test run in the background and return its job ID.
+
+        The result is pushed to the page via onRunComplete(jobId, result).
+        A newer run for the same problem cancels this one; an identical run
+        already in flight is shared.
+        """
+        self.save_code(code)
+        problem = self._pw.current_problem
+        key = f"{self._pw.state.active_pack}/{problem['id']}"
+        job_id = self._pw.jobs.submit(
+            key, fingerprint(key, code),
+            lambda job: self._execute_run(job, code, problem),
+        )
+        return {"job_id": job_id}
 
+    def benchmark(self, code: str) -> dict:
+        """Start a complexity benchmark in the background.
+
+        Returns {"job_id"} like run_tests, or {"error"} if the problem has
+        no benchmark. The report arrives via onRunComplete.
+        """
         self.save_code(code)
+        problem = self._pw.current_problem
+        if not problem.get("benchmark") or not self._pw._pack.get("bench_command"):
+            return {"error": "This problem has no benchmark."}
+        key = f"{self._pw.state.active_pack}/{problem['id']}"
+        job_id = self._pw.jobs.submit(
+            key, fingerprint(key, "benchmark", code),
+            lambda job: self._execute_benchmark(job, code, problem),
+        )
+        return {"job_id": job_id}
+
+    def _execute_benchmark(self, job, code: str, problem: dict) -> dict:
+        from drb.bench import BENCH_TIMEOUT, run_benchmark
+        from drb.container import remove_container, resolve_transport
+        from drb.limits import limit_flags, resolve_limits
+        from drb.native import NATIVE_ENGINE, native_flags
+
+        config = load_config(os.path.join(self._pw._state_dir, "config.json"))
+        engine = config.get("engine", "docker")
+        configure_engine_api(config)
+        configure_output(config)
+        pack = self._pw._pack
+        limits = resolve_limits(pack, problem, config)
+        name = f"drb-bench-{job.id}"
+        job.on_cancel(lambda: remove_container(engine, name))
+        stream = OutputStream(self._pw, job.id)
+        result = run_benchmark(
+            code, problem, pack,
+            os.path.join(self._pw._packs_dir, self._pw.state.active_pack),
+            engine, pack.get("image", "python:3.12-slim"),
+            cpuset=str(config.get("bench_cpus", "0")), name=name,
+            on_output=stream.write,
+            # The CPU-time rlimit follows the timeout, which is longer here.
+            resource_flags=(native_flags(dict(limits, timeout=BENCH_TIMEOUT), pack,
+                                         self._pw._state_dir)
+                            if engine == NATIVE_ENGINE else limit_flags(limits)),
+            transport=resolve_transport(config, engine),
+        )
+        stream.flush()
+        return result
+
+    def fuzz(self, code: str) -> dict:
+        """Start a differential fuzz run against the reference solution.
+
+        Returns {"job_id"} like run_tests, or {"error"} if the problem has
+        no fuzz test. The report arrives via onRunComplete.
+        """
+        self.save_code(code)
+        problem = self._pw.current_problem
+        if not problem.get("fuzz") or not self._pw._pack.get("fuzz_command"):
+            return {"error": "This problem has no fuzz test."}
+        key = f"{self._pw.state.active_pack}/{problem['id']}"
+        job_id = self._pw.jobs.submit(
+            key, fingerprint(key, "fuzz", code),
+            lambda job: self._execute_fuzz(job, code, problem),
+        )
+        return {"job_id": job_id}
+
+    def _execute_fuzz(self, job, code: str, problem: dict) -> dict:
+        from drb.container import remove_container, resolve_transport
+        from drb.fuzz import FUZZ_TIMEOUT, run_fuzz
+        from drb.limits import limit_flags, resolve_limits
+        from drb.native import NATIVE_ENGINE, native_flags
+
+        config = load_config(os.path.join(self._pw._state_dir, "config.json"))
+        engine = config.get("engine", "docker")
+        configure_engine_api(config)
+        configure_output(config)
+        pack = self._pw._pack
+        limits = dict(resolve_limits(pack, problem, config), timeout=FUZZ_TIMEOUT)
+        name = f"drb-fuzz-{job.id}"
+        job.on_cancel(lambda: remove_container(engine, name))
+        result = run_fuzz(
+            code, problem, pack,
+            os.path.join(self._pw._packs_dir, self._pw.state.active_pack),
+            engine, pack.get("image", "python:3.12-slim"), name=name,
+            resource_flags=(native_flags(limits, pack, self._pw._state_dir)
+                            if engine == NATIVE_ENGINE else limit_flags(limits)),
+            transport=resolve_transport(config, engine),
+        )
+        return result
+
+    def cancel_run(self, job_id: str) -> bool:
+        return self._pw.jobs.cancel(job_id)
+
+    def get_run_result(self, job_id: str) -> dict:
+        job = self._pw.jobs.get(job_id)
+        if job is None:
+            return {"status": "unknown", "result": None}
+        return {"status": job.status, "result": job.result}
+
+    def _execute_run(self, job, code: str, problem: dict) -> dict:
+        from drb.cases import discover_cases
+        from drb.native import NATIVE_ENGINE, native_command
+        from drb.runner import pack_run_options, run_cases, run_tests
+        from drb.container import load_config, remove_container
+
         config_path = os.path.join(self._pw._state_dir, "config.json")
         config = load_config(config_path)
         engine = config.get("engine", "docker")
+        configure_engine_api(config)
+        configure_output(config)
         pack = self._pw._pack
-        image = pack.get("image", "python:3.12-slim")
-        test_command = pack.get("test_command", "pytest test_solution.py --tb=short -q")
+        options = pack_run_options(
+            pack, problem, config, self._pw._state_dir,
+            os.path.join(self._pw._packs_dir, self._pw.state.active_pack),
+        )
+        image = options["image"]
+        case_template = pack.get("case_command")
+        if engine == NATIVE_ENGINE:
+            case_template = native_command(pack, "case_command")
+
+        images = self._pw.images
+        if (engine != NATIVE_ENGINE and images is not None
+                and images.status(image)["state"] == "building"):
+            return {
+                "passed": False,
+                "output": f"Image '{image}' is still building. Try again in a moment.",
+            }
+
+        name = f"drb-run-{job.id}"
+        stream = OutputStream(self._pw, job.id)
+
+        # "parallel_cases" in config.json fans a problem's test functions
+        # out across containers, for packs that say how to select one case.
+        cases = []
+        if config.get("parallel_cases") and case_template:
+            cases = discover_cases(problem["test_code"], options["test_file"])
+        if len(cases) > 1:
+            for i in range(len(cases)):
+                job.on_cancel(lambda n=f"{name}-{i}": remove_container(engine, n))
+            del options["test_command"]
+            result = run_cases(code, problem["test_code"], engine=engine,
+                               case_command=case_template, cases=cases,
+                               pool=self._pw._pool, name=name,
+                               workers=int(config.get("case_workers", 4)),
+                               on_output=stream.write, cache=self._pw._cache,
+                               should_cache=lambda: not job.cancelled,
+                               on_cancel=job.on_cancel, **options)
+            stream.flush()
+            self._record_run(result, problem, engine)
+            return result
 
-        solution_file = pack.get("solution_file", "solution.py")
-        test_file = pack.get("test_file", "test_solution.py")
+        job.on_cancel(lambda: remove_container(engine, name))
+        result = run_tests(code, problem["test_code"], engine=engine,
+                           pool=self._pw._pool, name=name, on_output=stream.write,
+                           cache=self._pw._cache, should_cache=lambda: not job.cancelled,
+                           on_cancel=job.on_cancel, **options)
+        stream.flush()
+        self._record_run(result, problem, engine)
+        return result
 
-        return run_tests(code, self._pw.current_problem["test_code"],
-                         engine=engine, image=image,
-                         test_command=test_command, timeout=30,
-                         solution_file=solution_file, test_file=test_file)
+    def _record_run(self, result: dict, problem: dict, engine: str):
+        """Log the run's phase timings for drb stats runs."""
+        from drb.stats import record_run
+
+        try:
+            record_run(self._pw._state_dir, result, self._pw.state.active_pack,
+                       problem["id"], engine)
+        except OSError:
+            pass  # timings are diagnostics; never fail a run over them
 
     def _reload_tutor_config(self) -> dict:
         self._pw._tutor_config = load_config(self._pw._config_path)
@@ -114,6 +326,57 @@ class PracticeWindow:
         self._hint_history = []
         self._config_path = os.path.join(state_dir, "config.json")
         self._tutor_config = load_config(self._config_path)
+        self.jobs = JobRunner(on_complete=self._on_run_complete)
+        self.images = None
+        self._cache = create_result_cache(self._tutor_config, state_dir)
+        self._pool = None
+        if not headless:
+            self._start_pool()
+            threading.Thread(target=self._trim_caches, daemon=True).start()
+
+    def _start_pool(self):
+        from drb.pool import create_pool
+        from drb.runner import pack_run_options
+
+        config = load_config(self._config_path)
+        configure_engine_api(config)
+        self._pool = create_pool(config, self._state_dir)
+        if self._pool is not None:
+            # Pool containers carry the pack's limits and cache volumes;
+            # problems declaring their own limits run in fresh containers.
+            self._pool.warm_in_background(
+                self._pack.get("image", "python:3.12-slim"),
+                harness=self._pack.get("harness"),
+                flags=pack_run_options(self._pack, None, config,
+                                       self._state_dir)["resource_flags"],
+            )
+
+    def _trim_caches(self):
+        """Drop the pack's stale build caches and empty oversized ones."""
+        from drb.container import trim_cache_volumes
+        from drb.native import NATIVE_ENGINE, trim_native_caches
+
+        engine = load_config(self._config_path).get("engine", "docker")
+        try:
+            if engine == NATIVE_ENGINE:
+                trim_native_caches(self._pack, self._state_dir)
+            else:
+                trim_cache_volumes(engine, self._pack.get("image", "python:3.12-slim"),
+                                   self._pack.get("caches"))
+        except (OSError, subprocess.SubprocessError):
+            pass  # a cache over its cap is not worth failing startup for
+
+    def eval_js(self, script: str):
+        if self._window and not self._headless:
+            self._window.evaluate_js(script)
+
+    def _on_run_complete(self, job):
+        self.eval_js(f"onRunComplete({json.dumps(job.id)}, {json.dumps(job.result)})")
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
 
     def _load_current_problem(self):
         idx = self.state.current_problem_index
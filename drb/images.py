@@ -0,0 +1,232 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from drb.container import image_size, resolve_image_id, stream_process
+
+BUILD_TIMEOUT = 600
+PROGRESS_LINES = 20  # trailing build output lines kept for status queries
+
+
+def context_hash(dockerfile_dir: str) -> str:
+    """Hash the Dockerfile and the files it COPYs or ADDs.
+
+    Problem JSON files live next to the Dockerfile but never end up in the
+    image, so editing them must not trigger a rebuild.
+    """
+    dockerfile = os.path.join(dockerfile_dir, "Dockerfile")
+    h = hashlib.sha256()
+    with open(dockerfile, "rb") as f:
+        content = f.read()
+    h.update(content)
+    for line in content.decode(errors="replace").splitlines():
+        parts = line.split()
+        if len(parts) < 3 or parts[0].upper() not in ("COPY", "ADD"):
+            continue
+        for src in parts[1:-1]:
+            if src.startswith("--"):
+                continue
+            path = os.path.join(dockerfile_dir, src)
+            if os.path.isfile(path):
+                h.update(src.encode())
+                with open(path, "rb") as f:
+                    h.update(f.read())
+    return h.hexdigest()
+
+
+class ImageRegistry:
+    """Daemon-side record of pack images and the builds producing them.
+
+    images.json in the state dir maps each image to the ID it was built as
+    and the hash of the Dockerfile context it was built from, so images are
+    only rebuilt when their Dockerfile (or a file it copies) changes, and
+    readiness checks do not need to shell out to the engine every time.
+    """
+
+    def __init__(self, state_dir: str, engine: str):
+        self._engine = engine
+        self._path = os.path.join(state_dir, "images.json")
+        self._lock = threading.Lock()
+        self._builds = {}
+        self._verified = set()
+        self._records = {}
+        self._reload()
+
+    def _reload(self):
+        if os.path.isfile(self._path):
+            try:
+                with open(self._path) as f:
+                    self._records = json.load(f)
+            except ValueError:
+                self._records = {}
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self._path), exist_ok=True)
+        with open(self._path, "w") as f:
+            json.dump(self._records, f, indent=2)
+
+    def _wanted_hash(self, image: str, dockerfile_dir: str = None) -> str:
+        if dockerfile_dir and os.path.isfile(os.path.join(dockerfile_dir, "Dockerfile")):
+            return context_hash(dockerfile_dir)
+        return f"pull:{image}"
+
+    def is_ready(self, image: str, dockerfile_dir: str = None) -> bool:
+        """Whether image exists and matches its current Dockerfile.
+
+        The engine is asked at most once per session whether a recorded
+        image still exists. images.json is re-read on a miss in case another
+        process (e.g. drb packs prepare) built the image meanwhile.
+        """
+        wanted = self._wanted_hash(image, dockerfile_dir)
+        record = self._records.get(image)
+        if not record or record.get("hash") != wanted:
+            with self._lock:
+                self._reload()
+            record = self._records.get(image)
+            if not record or record.get("hash") != wanted:
+                return False
+        if image not in self._verified:
+            if resolve_image_id(self._engine, image) != record.get("id"):
+                return False
+            self._verified.add(image)
+        return True
+
+    def ensure(self, image: str, dockerfile_dir: str = None, on_output=None) -> dict:
+        """Build or pull image if it is missing or stale. Blocks until done.
+
+        Returns the image's status dict.
+        """
+        if self.is_ready(image, dockerfile_dir):
+            return self.status(image)
+        with self._lock:
+            build = self._builds.get(image)
+            if build is None or build["state"] != "building":
+                build = self._new_build(image)
+                start = True
+            else:
+                start = False
+        if start:
+            self._build(image, dockerfile_dir, build, on_output)
+        else:
+            build["done"].wait()
+        return self.status(image)
+
+    def build_async(self, image: str, dockerfile_dir: str = None) -> dict:
+        """Start building image in the background unless it is ready or building."""
+        if self.is_ready(image, dockerfile_dir):
+            return self.status(image)
+        with self._lock:
+            build = self._builds.get(image)
+            if build is not None and build["state"] == "building":
+                return self.status(image)
+            build = self._new_build(image)
+        threading.Thread(
+            target=self._build, args=(image, dockerfile_dir, build), daemon=True,
+        ).start()
+        return self.status(image)
+
+    def _new_build(self, image: str) -> dict:
+        build = {
+            "state": "building",
+            "started": time.time(),
+            "finished": None,
+            "lines": [],
+            "error": None,
+            "done": threading.Event(),
+        }
+        self._builds[image] = build
+        return build
+
+    def _build(self, image: str, dockerfile_dir: str, build: dict, on_output=None):
+        wanted = self._wanted_hash(image, dockerfile_dir)
+        if wanted.startswith("pull:"):
+            cmd = [self._engine, "pull", image]
+        else:
+            cmd = [self._engine, "build", "-t", image, dockerfile_dir]
+
+        def progress(line):
+            build["lines"].append(line.rstrip("\n"))
+            del build["lines"][:-PROGRESS_LINES]
+            if on_output is not None:
+                on_output(line)
+
+        try:
+            returncode, _ = stream_process(cmd, BUILD_TIMEOUT, progress)
+            if returncode is None:
+                raise RuntimeError(f"Build of {image} timed out after {BUILD_TIMEOUT} seconds.")
+            if returncode != 0:
+                raise RuntimeError(f"Build of {image} failed (exit {returncode}).")
+            image_id = resolve_image_id(self._engine, image, refresh=True)
+            if not image_id:
+                raise RuntimeError(f"Image {image} missing after build.")
+            with self._lock:
+                self._records[image] = {
+                    "id": image_id,
+                    "hash": wanted,
+                    "built_at": time.time(),
+                }
+                self._save()
+                self._verified.add(image)
+            build["state"] = "ready"
+        except Exception as e:
+            build["state"] = "failed"
+            build["error"] = str(e)
+        finally:
+            build["finished"] = time.time()
+            build["done"].set()
+
+    def status(self, image: str, dockerfile_dir: str = None) -> dict:
+        """Describe image readiness for the daemon socket.
+
+        state is one of ready, building, failed, stale (built from an older
+        Dockerfile) or missing.
+        """
+        build = self._builds.get(image)
+        record = self._records.get(image)
+        if build is not None and build["state"] != "ready":
+            state = build["state"]
+        elif not record:
+            state = "missing"
+        elif dockerfile_dir and record["hash"] != self._wanted_hash(image, dockerfile_dir):
+            state = "stale"
+        else:
+            state = "ready"
+        status = {"image": image, "state": state}
+        if record:
+            status["id"] = record["id"]
+        if build is not None:
+            status["progress"] = list(build["lines"])
+            status["elapsed"] = round((build["finished"] or time.time()) - build["started"], 1)
+            if build["error"]:
+                status["error"] = build["error"]
+        return status
+
+
+def prepare_images(registry: ImageRegistry, engine: str, targets: list,
+                   workers: int = 3, on_output=None) -> list:
+    """Build or pull several pack images concurrently.
+
+    targets is a list of (pack_name, image, dockerfile_dir) tuples. At most
+    workers builds run at once. on_output(pack_name, line) receives build
+    output as it arrives. Returns one summary dict per target with 'pack',
+    'image', 'state', 'seconds', 'size' (bytes or None) and 'error'.
+    """
+    def prepare(target):
+        pack_name, image, dockerfile_dir = target
+        start = time.monotonic()
+        emit = (lambda line: on_output(pack_name, line)) if on_output else None
+        status = registry.ensure(image, dockerfile_dir, on_output=emit)
+        return {
+            "pack": pack_name,
+            "image": image,
+            "state": status["state"],
+            "seconds": round(time.monotonic() - start, 1),
+            "size": image_size(engine, image) if status["state"] == "ready" else None,
+            "error": status.get("error"),
+        }
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        return list(executor.map(prepare, targets))
@@ -0,0 +1,118 @@
+import hashlib
+import threading
+import uuid
+
+MAX_JOBS = 50  # finished jobs kept around for result lookups
+
+
+def fingerprint(*parts: str) -> str:
+    """Hash submission parts into a single-flight key."""
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part.encode())
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class Job:
+    """A single background test run."""
+
+    def __init__(self, key: str, fingerprint: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.key = key
+        self.fingerprint = fingerprint
+        self.result = None
+        self.cancelled = False
+        self.done = threading.Event()
+        self._on_cancel = []
+
+    @property
+    def status(self) -> str:
+        if self.cancelled:
+            return "cancelled"
+        return "done" if self.done.is_set() else "running"
+
+    def on_cancel(self, callback):
+        """Register a callable that aborts the job's work (e.g. kills its container)."""
+        self._on_cancel.append(callback)
+        if self.cancelled:
+            callback()
+
+
+class JobRunner:
+    """Runs test jobs on background threads.
+
+    Submissions are coalesced two ways: an identical submission that is
+    still in flight is shared instead of started again (single-flight), and
+    a newer submission for the same key cancels the older one (latest wins).
+    on_complete(job) is called when a job finishes without being cancelled.
+    """
+
+    def __init__(self, on_complete=None):
+        self._on_complete = on_complete
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._latest = {}
+        self._inflight = {}
+
+    def submit(self, key: str, fingerprint: str, fn) -> str:
+        """Start fn(job) in the background and return the job ID."""
+        with self._lock:
+            existing = self._inflight.get(fingerprint)
+            if existing is not None:
+                self._latest[key] = existing
+                return existing.id
+            stale = self._latest.get(key)
+            job = Job(key, fingerprint)
+            self._prune()
+            self._jobs[job.id] = job
+            self._latest[key] = job
+            self._inflight[fingerprint] = job
+
+        if stale is not None:
+            self._cancel(stale)
+        threading.Thread(target=self._run, args=(job, fn), daemon=True).start()
+        return job.id
+
+    def _run(self, job: Job, fn):
+        try:
+            result = fn(job)
+        except Exception as e:
+            result = {"passed": False, "output": f"Error: {e}"}
+        with self._lock:
+            if self._inflight.get(job.fingerprint) is job:
+                del self._inflight[job.fingerprint]
+            job.result = result
+            notify = not job.cancelled
+        job.done.set()
+        if notify and self._on_complete is not None:
+            self._on_complete(job)
+
+    def _cancel(self, job: Job):
+        with self._lock:
+            if job.cancelled or job.done.is_set():
+                return
+            job.cancelled = True
+            if self._inflight.get(job.fingerprint) is job:
+                del self._inflight[job.fingerprint]
+        for callback in job._on_cancel:
+            try:
+                callback()
+            except Exception:
+                pass
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a running job. Returns False if it was unknown or finished."""
+        job = self._jobs.get(job_id)
+        if job is None or job.done.is_set():
+            return False
+        self._cancel(job)
+        return True
+
+    def get(self, job_id: str):
+        return self._jobs.get(job_id)
+
+    def _prune(self):
+        finished = [jid for jid, job in self._jobs.items() if job.done.is_set()]
+        for jid in finished[:max(0, len(self._jobs) - MAX_JOBS + 1)]:
+            del self._jobs[jid]
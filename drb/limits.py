@@ -0,0 +1,54 @@
+import re
+
+DEFAULT_LIMITS = {"timeout": 30, "memory": "256m", "cpus": 1, "pids": None}
+MEMORY_PATTERN = re.compile(r"^\d+(\.\d+)?[bkmg]?$", re.I)
+MEMORY_UNITS = {"": 1, "b": 1, "k": 1024, "m": 1024 ** 2, "g": 1024 ** 3}
+
+
+def resolve_limits(pack: dict, problem: dict = None, config: dict = None) -> dict:
+    """Merge run limits from defaults, pack.json, the problem and config.json.
+
+    Each source may have a "limits" object with any of timeout (seconds),
+    memory (engine syntax, e.g. "512m"), cpus and pids; later sources win,
+    so config.json overrides apply to every pack. Raises ValueError for
+    values the engine would reject.
+    """
+    limits = dict(DEFAULT_LIMITS)
+    for source in (pack, problem, config):
+        limits.update((source or {}).get("limits") or {})
+    _validate(limits)
+    return limits
+
+
+def _validate(limits: dict):
+    unknown = set(limits) - set(DEFAULT_LIMITS)
+    if unknown:
+        raise ValueError(f"Unknown limits: {', '.join(sorted(unknown))}")
+    if not _positive(limits["timeout"]):
+        raise ValueError(f"Invalid timeout limit: {limits['timeout']!r}")
+    if not MEMORY_PATTERN.match(str(limits["memory"])):
+        raise ValueError(f"Invalid memory limit: {limits['memory']!r}")
+    if not _positive(limits["cpus"]):
+        raise ValueError(f"Invalid cpus limit: {limits['cpus']!r}")
+    if limits["pids"] is not None and not (
+            isinstance(limits["pids"], int) and limits["pids"] > 0):
+        raise ValueError(f"Invalid pids limit: {limits['pids']!r}")
+
+
+def _positive(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and value > 0
+
+
+def limit_flags(limits: dict) -> tuple:
+    """Engine run flags enforcing memory, cpus and pids limits."""
+    flags = [f"--memory={limits['memory']}", f"--cpus={limits['cpus']}"]
+    if limits.get("pids"):
+        flags.append(f"--pids-limit={limits['pids']}")
+    return tuple(flags)
+
+
+def memory_bytes(size) -> int:
+    """Convert an engine memory size such as "256m" to bytes."""
+    size = str(size).lower()
+    unit = size[-1] if size[-1] in MEMORY_UNITS else ""
+    return int(float(size[:len(size) - len(unit)]) * MEMORY_UNITS[unit])
@@ -0,0 +1,256 @@
+import math
+import os
+import re
+import shlex
+import shutil
+import threading
+import time
+
+from drb.container import (
+    PRIVATE_CACHE_MB, STATS_MARKER, TIMEOUT_MESSAGE, finish_run, hide_stats, pack_files,
+    stream_process,
+)
+from drb.fixtures import FIXTURES_ENV, fixture_view
+from drb.limits import memory_bytes
+
+NATIVE_ENGINE = "native"
+SANDBOX_TOOLS = ("unshare", "prlimit")
+UNSHARE_FLAGS = (
+    "--user", "--map-root-user", "--mount", "--net", "--pid", "--fork",
+    "--kill-child", "--mount-proc",
+)
+ULIMIT_FLAG = re.compile(r"^--ulimit=(\w+)=(\d+)$")
+CACHE_FLAG = re.compile(r"^--cache=(\w+)=(.+)$")
+READ_ONLY_CACHE_FLAG = re.compile(r"^--read-only-cache=(\w+)=(.+)$")
+PRIVATE_CACHE_FLAG = re.compile(r"^--private-cache=(\w+)=(\d+)$")
+FIXTURES_FLAG = re.compile(r"^--fixtures=(.+)$")
+NATIVE_CACHE_DIR = "cache"  # in the state directory
+
+# Runs inside fresh user, mount, network and PID namespaces. /tmp becomes a
+# private tmpfs holding the run files (read from stdin as a tar stream),
+# every other mount (/, /dev/shm, /sys, ...) is made read-only (build
+# caches are bind-mounted writable from the host, through descriptors
+# opened before /tmp is replaced, so caches under the host's /tmp work
+# too; pack fixtures are bound the same way, read-only), and the test
+# command runs under prlimit. A mount that cannot be made read-only fails
+# the run rather than leaving it writable. Mount points in /proc/self/mounts
+# have spaces and the like octal-escaped, which printf %b undoes. The
+# trailing STATS_MARKER block matches drb.container.with_stats minus the
+# cgroup values, which belong to the host here.
+SANDBOX_SCRIPT = """\
+{open_caches}mount -t tmpfs -o size=64m tmpfs /tmp || exit 125
+{caches}while read -r _ point _ options _; do
+  case $point in /tmp|/tmp/*) continue;; esac
+  case ,$options, in *,ro,*) continue;; esac
+  point=$(printf '%b' "$point")
+  mount -o remount,bind,ro "$point" || {{
+    echo "drb: could not make $point read-only" >&2; exit 125
+  }}
+done <<EOF
+$(cat /proc/self/mounts)
+EOF
+mkdir /tmp/work && cd /tmp/work && tar -xf - || exit 125
+s=$(date +%s%N)
+prlimit {rlimits} sh -c {command}
+r=$?
+printf '\\n{marker} oom_before= oom_after= peak= limit= started=%s ended=%s\\n' "$s" "$(date +%s%N)"
+times
+exit $r"""
+
+_running = {}
+_running_lock = threading.Lock()
+
+
+def missing_tools(requires=()) -> list:
+    """Executables the native engine needs that are not on PATH.
+
+    requires lists a pack's own tools (its "native" "requires" entry), which
+    are looked up on the host since runs use the host's toolchains.
+    """
+    return [tool for tool in (*SANDBOX_TOOLS, *requires) if not shutil.which(tool)]
+
+
+def native_command(pack: dict, key: str = "test_command") -> str:
+    """The pack command to run natively; a "native" block may override it."""
+    return (pack.get("native") or {}).get(key) or pack.get(key)
+
+
+def native_flags(limits: dict, pack: dict = None, state_dir: str = None,
+                 private_caches: bool = False) -> tuple:
+    """Express drb.limits limits as --ulimit flags for run_native.
+
+    Memory becomes an address-space limit, which counts reserved as well as
+    used memory; runtimes that reserve large heaps up front (V8, Ruby) need
+    the pack's "native" "address_space" to raise it. cpus becomes CPU
+    seconds over the timeout, and pids a process-count limit. A pack with
+    fixtures gets its fixture view in state_dir bound read-only (see
+    drb.fixtures), and its caches are directories there too.
+    With private_caches, runs cannot write to the shared caches (see
+    drb.container.cache_flags): they are bound read-only, or replaced by
+    an empty tmpfs per run, as are read-only ones not yet populated.
+    """
+    native = (pack or {}).get("native") or {}
+    flags = [
+        f"--ulimit=as={memory_bytes(native.get('address_space') or limits['memory'])}",
+        f"--ulimit=cpu={math.ceil(limits['timeout'] * limits['cpus']) + 1}",
+    ]
+    if limits.get("pids"):
+        flags.append(f"--ulimit=nproc={limits['pids']}")
+    for cache in (pack or {}).get("caches") or ():
+        if not cache.get("env"):
+            continue
+        path = native_cache_dir(pack, cache, state_dir)
+        if private_caches and cache.get("read_only_ok") and _populated(path):
+            flags.append(f"--read-only-cache={cache['env']}={path}")
+        elif private_caches:
+            size = int(cache.get("max_mb") or PRIVATE_CACHE_MB)
+            flags.append(f"--private-cache={cache['env']}={size}")
+        else:
+            flags.append(f"--cache={cache['env']}={path}")
+    if (pack or {}).get("fixtures"):
+        flags.append(f"--fixtures={fixture_view(pack, state_dir)}")
+    return tuple(flags)
+
+
+def native_cache_dir(pack: dict, cache: dict, state_dir: str) -> str:
+    """Host directory in state_dir standing in for one of pack's cache volumes."""
+    return os.path.join(state_dir, NATIVE_CACHE_DIR, pack["name"], cache["name"])
+
+
+def _populated(path: str) -> bool:
+    try:
+        return bool(os.listdir(path))
+    except OSError:
+        return False
+
+
+def trim_native_caches(pack: dict, state_dir: str) -> list:
+    """Empty pack's host cache directories that have outgrown "max_mb".
+
+    The native counterpart of drb.container.trim_cache_volumes; returns
+    the directories emptied.
+    """
+    emptied = []
+    for cache in pack.get("caches") or ():
+        path = native_cache_dir(pack, cache, state_dir)
+        if not cache.get("max_mb") or not os.path.isdir(path):
+            continue
+        size = 0
+        for dirpath, _, filenames in os.walk(path):
+            for filename in filenames:
+                try:
+                    size += os.lstat(os.path.join(dirpath, filename)).st_size
+                except OSError:
+                    pass
+        if size > cache["max_mb"] * 1024 * 1024:
+            shutil.rmtree(path, ignore_errors=True)
+            emptied.append(path)
+    return emptied
+
+
+def remove_native_caches(pack: dict, state_dir: str) -> list:
+    """Delete pack's host cache directories; returns those removed."""
+    removed = []
+    for cache in pack.get("caches") or ():
+        path = native_cache_dir(pack, cache, state_dir)
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+            removed.append(path)
+    return removed
+
+
+def sandbox_command(test_command: str, resource_flags=()) -> list:
+    """The unshare command line running test_command in the sandbox."""
+    rlimits = []
+    open_caches = []
+    caches = []
+    for flag in resource_flags:
+        match = ULIMIT_FLAG.match(flag)
+        if match:
+            rlimits.append(f"--{match.group(1)}={match.group(2)}")
+        match = CACHE_FLAG.match(flag) or READ_ONLY_CACHE_FLAG.match(flag)
+        if match:
+            fd = 3 + len(caches)
+            mount_point = f"/tmp/.cache/{len(caches)}"
+            read_only = (f" && mount -o remount,bind,ro {mount_point}"
+                         if match.re is READ_ONLY_CACHE_FLAG else "")
+            open_caches.append(f"exec {fd}<{shlex.quote(match.group(2))} || exit 125\n")
+            caches.append(
+                f"mkdir -p {mount_point} && mount --bind /proc/self/fd/{fd} {mount_point}"
+                f"{read_only} || exit 125\nexec {fd}<&-\nexport {match.group(1)}={mount_point}\n"
+            )
+        match = PRIVATE_CACHE_FLAG.match(flag)
+        if match:
+            mount_point = f"/tmp/.cache/{len(caches)}"
+            caches.append(
+                f"mkdir -p {mount_point} && mount -t tmpfs -o size={match.group(2)}m tmpfs "
+                f"{mount_point} || exit 125\nexport {match.group(1)}={mount_point}\n"
+            )
+        match = FIXTURES_FLAG.match(flag)
+        if match:
+            fd = 3 + len(caches)
+            mount_point = "/tmp/.fixtures"
+            open_caches.append(f"exec {fd}<{shlex.quote(match.group(1))} || exit 125\n")
+            caches.append(
+                f"mkdir -p {mount_point} && mount --bind /proc/self/fd/{fd} {mount_point} "
+                f"&& mount -o remount,bind,ro {mount_point} || exit 125\n"
+                f"exec {fd}<&-\nexport {FIXTURES_ENV}={mount_point}\n"
+            )
+    script = SANDBOX_SCRIPT.format(
+        open_caches="".join(open_caches),
+        caches="".join(caches),
+        rlimits=" ".join(rlimits),
+        command=shlex.quote(test_command),
+        marker=STATS_MARKER,
+    )
+    return ["unshare", *UNSHARE_FLAGS, "sh", "-c", script]
+
+
+def run_native(test_command: str, files: dict, timeout: int = 10,
+               name: str = None, on_output=None, resource_flags=()) -> dict:
+    """Run test command on the host in a namespace sandbox.
+
+    The counterpart of drb.container.run_with_stdin for the "native"
+    engine: no image or container is involved, so a run costs a process
+    spawn. resource_flags are native_flags; others are ignored. A run
+    started under name can be killed with kill_native.
+    Returns dict with 'passed' (bool) and 'output' (str).
+    """
+    cmd = sandbox_command(test_command, resource_flags)
+    for flag in resource_flags:
+        match = (CACHE_FLAG.match(flag) or READ_ONLY_CACHE_FLAG.match(flag)
+                 or FIXTURES_FLAG.match(flag))
+        if match:
+            os.makedirs(match.group(match.lastindex), exist_ok=True)
+    started = time.monotonic()
+
+    def track(process):
+        if name:
+            with _running_lock:
+                _running[name] = process
+
+    try:
+        returncode, output = stream_process(
+            cmd, timeout, hide_stats(on_output) or (lambda line: None),
+            input=pack_files(files), on_start=track,
+        )
+    except FileNotFoundError:
+        return {
+            "passed": False,
+            "output": "The native engine needs unshare and prlimit (util-linux).",
+        }
+    finally:
+        if name:
+            with _running_lock:
+                _running.pop(name, None)
+    if returncode is None:
+        output += "\n" + TIMEOUT_MESSAGE.format(timeout=timeout)
+    return finish_run(returncode, output, started)
+
+
+def kill_native(name: str):
+    """Kill a named native run; the sandbox's processes die with it."""
+    with _running_lock:
+        process = _running.get(name)
+    if process is not None:
+        process.kill()
@@ -0,0 +1,517 @@
+import json
+import os
+import select
+import shutil
+import subprocess
+import threading
+import time
+import uuid
+
+from drb.container import (
+    POOL_LABEL, RESOURCE_FLAGS, TIMEOUT_MESSAGE, abnormal_exit, dropped_bytes, finish_run,
+    hide_stats, output_limits, pack_files, resolve_transport, stream_process, with_stats,
+    write_files,
+)
+
+HEALTH_CHECK_AFTER = 30  # seconds a container may sit idle before re-checking
+HARNESS_STARTUP_TIMEOUT = 60
+HARNESS_GRACE = 5  # seconds the harness gets beyond the run timeout to answer
+POOL_TMPFS = "/pool:rw,exec,size=64m"
+CANCELLED_MESSAGE = "Run cancelled."
+
+# Unpacks the run's files from stdin into a fresh directory, runs the test
+# command there ($1) and removes the directory again.
+STDIN_RUN_SCRIPT = (
+    'd=/pool/$2; mkdir "$d" && cd "$d" && tar -xf - && sh -c "$1"; '
+    'rc=$?; cd / && rm -rf "$d"; exit $rc'
+)
+
+
+class HarnessError(RuntimeError):
+    """The in-container harness died or answered with garbage."""
+
+
+class PooledContainer:
+    """A long-lived idle container that tests are exec'd into.
+
+    When the pack ships a harness, process is the attached engine client
+    whose stdin/stdout carry the harness's JSON-lines protocol.
+    """
+
+    def __init__(self, name: str, image: str, host_dir: str, process=None):
+        self.name = name
+        self.image = image
+        self.host_dir = host_dir
+        self.process = process
+        self.buffer = b""
+        self.runs = 0
+        self.last_used = time.monotonic()
+        self.run_id = None  # the run in progress, if any
+        self.cancelled = False
+
+
+class ContainerPool:
+    """Keeps warm containers per image and runs tests in them via exec.
+
+    Each container bind-mounts its own host scratch directory at /pool and
+    every run gets a fresh subdirectory, so runs never see each other's
+    files. Containers are recycled after max_runs runs, on timeout, or when
+    a health check finds them dead.
+
+    If a harness command is registered for an image, its containers run that
+    harness as their main process instead of sleeping, and runs are sent to
+    it as JSON lines rather than exec'd with the pack's test_command.
+
+    With transport "stdin", /pool is a tmpfs inside the container rather
+    than a host directory, and each run's files are piped in as a tar
+    archive through the exec.
+    """
+
+    def __init__(self, engine: str, work_root: str, size: int = 2,
+                 max_runs: int = 50, transport: str = "mount"):
+        self._engine = engine
+        self._transport = transport
+        self._work_root = work_root
+        self._size = max(1, size)
+        self._max_runs = max_runs
+        self._idle = {}
+        self._count = {}
+        self._harnesses = {}
+        self._flags = {}
+        self._broken_harnesses = set()
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def _start(self, image: str) -> PooledContainer:
+        name = f"drb-pool-{uuid.uuid4().hex[:12]}"
+        if self._transport == "stdin":
+            host_dir = None
+        else:
+            host_dir = os.path.join(self._work_root, name)
+            os.makedirs(host_dir, exist_ok=True)
+        harness = self._harnesses.get(image)
+        if harness:
+            return self._start_harness(name, image, host_dir, harness)
+        cmd = [
+            self._engine, "run", "-d", "--rm",
+            "--name", name, "--label", f"{POOL_LABEL}={os.getpid()}",
+            *self._mount_flags(host_dir),
+            *self.flags_for(image),
+            image, "sleep", "infinity",
+        ]
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
+        if result.returncode != 0:
+            if host_dir:
+                shutil.rmtree(host_dir, ignore_errors=True)
+            raise RuntimeError(
+                f"Failed to start pool container for {image}: {result.stderr.strip()}"
+            )
+        return PooledContainer(name, image, host_dir)
+
+    def _mount_flags(self, host_dir: str) -> list:
+        if host_dir is None:
+            return ["--tmpfs", POOL_TMPFS]
+        return ["-v", f"{host_dir}:/pool"]
+
+    def _start_harness(self, name: str, image: str, host_dir: str,
+                       harness: str) -> PooledContainer:
+        cmd = [
+            self._engine, "run", "-i", "--rm",
+            "--name", name, "--label", f"{POOL_LABEL}={os.getpid()}",
+            *self._mount_flags(host_dir),
+            *self.flags_for(image),
+            image, "sh", "-c", harness,
+        ]
+        process = subprocess.Popen(
+            cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        container = PooledContainer(name, image, host_dir, process)
+        try:
+            reply = self._read_reply(container, HARNESS_STARTUP_TIMEOUT)
+            if not reply.get("ready"):
+                raise HarnessError(f"Unexpected harness greeting: {reply}")
+        except HarnessError:
+            # Most likely an image built before the harness was added; use
+            # plain exec containers for it from now on.
+            self._broken_harnesses.add(image)
+            self._harnesses.pop(image, None)
+            self._remove(container)
+            raise
+        return container
+
+    def _read_reply(self, container: PooledContainer, timeout: float) -> dict:
+        """Read one JSON line from the harness, waiting at most timeout."""
+        deadline = time.monotonic() + timeout
+        fd = container.process.stdout.fileno()
+        while b"\n" not in container.buffer:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise HarnessError("Harness did not answer in time.")
+            ready, _, _ = select.select([fd], [], [], remaining)
+            if not ready:
+                continue
+            data = os.read(fd, 65536)
+            if not data:
+                raise HarnessError("Harness exited unexpectedly.")
+            container.buffer += data
+        line, _, container.buffer = container.buffer.partition(b"\n")
+        try:
+            return json.loads(line)
+        except ValueError:
+            raise HarnessError(f"Invalid harness reply: {line[:200]!r}")
+
+    def _remove(self, container: PooledContainer):
+        subprocess.run(
+            [self._engine, "rm", "-f", container.name],
+            capture_output=True, timeout=30,
+        )
+        if container.process is not None:
+            container.process.kill()
+            container.process.wait()
+        if container.host_dir:
+            shutil.rmtree(container.host_dir, ignore_errors=True)
+
+    def _healthy(self, container: PooledContainer) -> bool:
+        if container.process is not None and container.process.poll() is not None:
+            return False
+        try:
+            result = subprocess.run(
+                [self._engine, "inspect", "-f", "{{.State.Running}}", container.name],
+                capture_output=True, text=True, timeout=10,
+            )
+        except subprocess.TimeoutExpired:
+            return False
+        return result.returncode == 0 and result.stdout.strip() == "true"
+
+    def _register_harness(self, image: str, harness: str):
+        if harness and image not in self._broken_harnesses:
+            self._harnesses[image] = harness
+
+    def flags_for(self, image: str) -> tuple:
+        """Resource flags the pool's containers for image are started with."""
+        return self._flags.get(image, RESOURCE_FLAGS)
+
+    def warm(self, image: str, harness: str = None, flags=None):
+        """Start containers for image until the pool is full.
+
+        flags, if given, become the resource flags for image's containers
+        from now on; containers already running keep theirs.
+        """
+        self._register_harness(image, harness)
+        if flags is not None:
+            self._flags[image] = tuple(flags)
+        while True:
+            with self._cond:
+                if self._closed or self._count.get(image, 0) >= self._size:
+                    return
+                self._count[image] = self._count.get(image, 0) + 1
+            try:
+                container = self._start(image)
+            except Exception:
+                with self._cond:
+                    self._count[image] -= 1
+                raise
+            self._release(container)
+
+    def _acquire(self, image: str) -> PooledContainer:
+        while True:
+            start_new = False
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise RuntimeError("Container pool is shut down.")
+                    idle = self._idle.setdefault(image, [])
+                    if idle:
+                        container = idle.pop()
+                        break
+                    if self._count.get(image, 0) < self._size:
+                        self._count[image] = self._count.get(image, 0) + 1
+                        start_new = True
+                        break
+                    self._cond.wait()
+            if start_new:
+                try:
+                    return self._start(image)
+                except Exception:
+                    with self._cond:
+                        self._count[image] -= 1
+                        self._cond.notify()
+                    raise
+            stale = time.monotonic() - container.last_used > HEALTH_CHECK_AFTER
+            if not stale or self._healthy(container):
+                return container
+            self._discard(container)
+
+    def _release(self, container: PooledContainer):
+        container.last_used = time.monotonic()
+        with self._cond:
+            if not self._closed:
+                self._idle.setdefault(container.image, []).append(container)
+                self._cond.notify()
+                return
+        self._remove(container)
+
+    def _discard(self, container: PooledContainer):
+        """Remove a container and start a replacement in the background."""
+        with self._cond:
+            self._count[container.image] -= 1
+            self._cond.notify()
+        self._remove(container)
+        if not self._closed:
+            self.warm_in_background(container.image)
+
+    def _begin(self, container: PooledContainer, on_cancel) -> str:
+        """Start a run in container; on_cancel registers its kill switch.
+
+        Cancelling removes the container, which ends the exec or the
+        harness request, and the run then discards it (see _end). A
+        cancel arriving after the run ended does nothing, as the container
+        may already be serving another run.
+        """
+        run_id = uuid.uuid4().hex[:12]
+        container.run_id = run_id
+        if on_cancel is not None:
+            on_cancel(lambda: self._cancel(container, run_id))
+        return run_id
+
+    def _cancel(self, container: PooledContainer, run_id: str):
+        with self._cond:
+            if container.run_id != run_id:
+                return
+            container.cancelled = True
+        subprocess.run([self._engine, "rm", "-f", container.name],
+                       capture_output=True, timeout=30)
+
+    def _end(self, container: PooledContainer) -> bool:
+        """Mark container's run over; returns whether it was cancelled."""
+        with self._cond:
+            container.run_id = None
+            return container.cancelled
+
+    def warm_in_background(self, image: str, harness: str = None, flags=None):
+        """Fill the pool for image on a daemon thread, ignoring failures."""
+        if flags is not None:
+            self._flags[image] = tuple(flags)
+
+        def target():
+            try:
+                self.warm(image, harness)
+            except Exception:
+                pass
+
+        threading.Thread(target=target, daemon=True).start()
+
+    def run(self, image: str, test_command: str, files: dict,
+            timeout: int = 10, harness: str = None,
+            test_file: str = "test_solution.py", on_output=None,
+            case: str = None, on_cancel=None) -> dict:
+        """Run test_command in a warm container against the given files.
+
+        files maps file names to contents; they are written (or, with the
+        stdin transport, unpacked) into a fresh run directory that becomes
+        the working directory of the exec. Exec
+        output is passed line by line to on_output if given; harness runs
+        deliver their output in one piece when they finish. case names a
+        single test case for the harness to run; exec runs select cases
+        through test_command instead. on_cancel, such as a drb.jobs Job's,
+        is given a callback that stops the run and frees its slot (see
+        _begin).
+        Returns dict with 'passed' (bool) and 'output' (str).
+        Raises HarnessError if a harness container fails; the caller should
+        fall back to a plain test_command run.
+        """
+        self._register_harness(image, harness)
+        container = self._acquire(image)
+        run_id = self._begin(container, on_cancel)
+        archive = None
+        run_dir = None
+        if container.host_dir is None:
+            archive = pack_files(files)
+        else:
+            run_dir = os.path.join(container.host_dir, run_id)
+            os.makedirs(run_dir)
+            write_files(run_dir, files)
+
+        if container.process is not None:
+            result = self._run_harness(container, run_id, run_dir, archive,
+                                       test_file, timeout, case)
+            if on_output is not None and result["output"]:
+                on_output(result["output"] + "\n")
+            return result
+
+        # The container's cgroup outlives this run, so its memory peak would
+        # not be this run's; CPU time and OOM kills still are.
+        command = with_stats(test_command, peak=False)
+        if archive is None:
+            cmd = [
+                self._engine, "exec", "-w", f"/pool/{run_id}",
+                container.name, "sh", "-c", command,
+            ]
+        else:
+            cmd = [
+                self._engine, "exec", "-i", "-w", "/pool",
+                container.name, "sh", "-c", STDIN_RUN_SCRIPT, "sh",
+                command, run_id,
+            ]
+        started = time.monotonic()
+        try:
+            returncode, output = stream_process(
+                cmd, timeout, hide_stats(on_output) or (lambda line: None), input=archive,
+            )
+        finally:
+            if run_dir:
+                shutil.rmtree(run_dir, ignore_errors=True)
+
+        recycle = self._end(container)
+        if recycle:
+            output += "\n" + CANCELLED_MESSAGE
+        elif returncode is None:
+            # The exec client is gone but the tests may still be spinning
+            # inside the container, so it has to go.
+            output += "\n" + TIMEOUT_MESSAGE.format(timeout=timeout)
+            recycle = True
+        elif returncode not in (0, 1):
+            recycle = not self._healthy(container)
+
+        container.runs += 1
+        if recycle or container.runs >= self._max_runs:
+            self._discard(container)
+        else:
+            self._release(container)
+
+        return finish_run(returncode, output, started)
+
+    def check(self, image: str, command: str, files: dict, timeout: int = 5):
+        """Run a quick command against files in an idle container for image.
+
+        Meant for checks that are only worth it when no container has to
+        start, so it returns None at once if none is idle. Harness
+        containers are exec'd into like the others. Returns (returncode,
+        output); returncode is None if the command timed out.
+        """
+        with self._cond:
+            idle = self._idle.get(image)
+            if self._closed or not idle:
+                return None
+            container = idle.pop()
+        try:
+            return self._exec([
+                self._engine, "exec", "-i", "-w", "/pool", container.name,
+                "sh", "-c", STDIN_RUN_SCRIPT, "sh", command, uuid.uuid4().hex[:12],
+            ], timeout, input=pack_files(files))
+        finally:
+            self._release(container)
+
+    def _exec(self, cmd: list, timeout: int, input: bytes = None):
+        try:
+            if input is None:
+                result = subprocess.run(
+                    cmd, capture_output=True, text=True, timeout=timeout,
+                )
+                return result.returncode, result.stdout + result.stderr
+            result = subprocess.run(
+                cmd, input=input, capture_output=True, timeout=timeout,
+            )
+        except subprocess.TimeoutExpired:
+            return None, ""
+        return result.returncode, (result.stdout + result.stderr).decode(errors="replace")
+
+    def _run_harness(self, container: PooledContainer, run_id: str,
+                     run_dir: str, archive: bytes, test_file: str,
+                     timeout: int, case: str = None) -> dict:
+        head, tail = output_limits()
+        request = {"dir": f"/pool/{run_id}", "test_file": test_file, "timeout": timeout,
+                   "output_head": head, "output_tail": tail}
+        if case is not None:
+            request["case"] = case
+        started = time.monotonic()
+        reply = None
+        try:
+            if archive is not None:
+                self._unpack(container, run_id, archive)
+            container.process.stdin.write(json.dumps(request).encode() + b"\n")
+            container.process.stdin.flush()
+            reply = self._read_reply(container, timeout + HARNESS_GRACE)
+        except (OSError, HarnessError):
+            pass
+        finally:
+            if run_dir:
+                shutil.rmtree(run_dir, ignore_errors=True)
+        if self._end(container):
+            self._discard(container)
+            return {"passed": False, "output": CANCELLED_MESSAGE}
+        if reply is None:
+            self._discard(container)
+            raise HarnessError(f"Harness in {container.name} failed.")
+        if archive is not None:
+            self._remove_run_dir(container, run_id)
+
+        container.runs += 1
+        if container.runs >= self._max_runs:
+            self._discard(container)
+        else:
+            self._release(container)
+
+        if reply.get("timed_out"):
+            output = TIMEOUT_MESSAGE.format(timeout=timeout)
+            return {"passed": False, "output": output}
+        result = {
+            "passed": reply.get("returncode") == 0,
+            "output": str(reply.get("output", "")).strip(),
+        }
+        if abnormal_exit(reply.get("returncode")):
+            result["exit_code"] = reply["returncode"]
+        dropped = dropped_bytes(result["output"])
+        if dropped:
+            result["dropped_bytes"] = dropped
+        if isinstance(reply.get("resources"), dict):
+            result["resources"] = dict(
+                reply["resources"], wall_ms=round((time.monotonic() - started) * 1000),
+            )
+        return result
+
+    def _unpack(self, container: PooledContainer, run_id: str, archive: bytes):
+        """Unpack a run's files into /pool/<run_id> ahead of a harness request."""
+        returncode, output = self._exec([
+            self._engine, "exec", "-i", "-w", "/pool", container.name,
+            "sh", "-c", 'mkdir "$1" && tar -xf - -C "$1"', "sh", run_id,
+        ], 30, input=archive)
+        if returncode != 0:
+            raise HarnessError(f"Could not copy files into {container.name}: {output.strip()}")
+
+    def _remove_run_dir(self, container: PooledContainer, run_id: str):
+        """Delete a harness run's directory without holding up the result."""
+        cmd = [self._engine, "exec", "-w", "/pool", container.name, "rm", "-rf", run_id]
+        threading.Thread(target=self._exec, args=(cmd, 30), daemon=True).start()
+
+    def shutdown(self):
+        """Stop and remove every container owned by the pool."""
+        with self._cond:
+            self._closed = True
+            containers = [c for idle in self._idle.values() for c in idle]
+            self._idle = {}
+            self._cond.notify_all()
+        for container in containers:
+            self._remove(container)
+
+
+def create_pool(config: dict, state_dir: str):
+    """Build a ContainerPool from config.json settings, or None if disabled.
+
+    The pool is enabled by setting "pool_size" to a positive number (the
+    native engine has no containers to pool); runs per
+    container before recycling default to 50 ("pool_max_runs"). "transport"
+    selects how run files reach the containers (see resolve_transport).
+    """
+    size = int(config.get("pool_size", 0) or 0)
+    engine = config.get("engine", "docker")
+    if size <= 0 or engine == "native":
+        return None
+    return ContainerPool(
+        engine,
+        os.path.join(state_dir, "pool"),
+        size=size,
+        max_runs=int(config.get("pool_max_runs", 50)),
+        transport=resolve_transport(config, engine),
+    )
@@ -0,0 +1,108 @@
+import json
+import re
+import shlex
+import xml.etree.ElementTree as ET
+
+from drb.container import REPORT_MARKER
+
+STATUSES = ("passed", "failed", "error", "skipped")
+JEST_STATUSES = {"passed": "passed", "failed": "failed", "pending": "skipped",
+                 "skipped": "skipped", "todo": "skipped", "disabled": "skipped"}
+
+
+def with_report(test_command: str, report: dict) -> str:
+    """Wrap test_command so the pack's report file follows its output.
+
+    report is the pack's "report" entry: "command" is a template placing
+    the reporter options around {command}, and "file" the report it
+    writes. The file is printed after a REPORT_MARKER line, which reaches
+    the host through every transport that carries output. drb.runner
+    turns it into the result's 'tests', a list of {name, status,
+    duration_ms, message} records, and keeps 'output' either way. Harness
+    runs do not produce reports.
+    """
+    command = report.get("command", "{command}").replace("{command}", test_command)
+    return (f"{command}; r=$?; printf '\\n{REPORT_MARKER}\\n'; "
+            f"cat {shlex.quote(report['file'])} 2>/dev/null; exit $r")
+
+
+def extract_report(output: str):
+    """Split the with_report block off output; returns (output, raw or None).
+
+    The marker may end the output: with no report file written, nothing
+    follows it, and the run's trailing newline has been stripped.
+    """
+    match = None
+    for match in re.finditer(r"(?:^|\n)" + re.escape(REPORT_MARKER) + r"(?:\n|$)", output):
+        pass
+    if match is None:
+        return output, None
+    return output[:match.start()].rstrip("\n"), output[match.end():]
+
+
+def parse_report(raw: str, fmt: str):
+    """Parse a report into [{name, status, duration_ms, message}, ...].
+
+    Returns None if the report is empty or unreadable, e.g. because the
+    run was killed before the reporter wrote it.
+    """
+    if not raw.strip():
+        return None
+    parser = {"junit": parse_junit, "jest": parse_jest, "json": parse_json}.get(fmt)
+    if parser is None:
+        raise ValueError(f"Unknown report format '{fmt}'")
+    try:
+        return parser(raw)
+    except (ValueError, KeyError, TypeError, ET.ParseError):
+        return None
+
+
+def _record(name, status, seconds, message) -> dict:
+    return {
+        "name": name,
+        "status": status,
+        "duration_ms": None if seconds is None else round(float(seconds) * 1000),
+        "message": message or None,
+    }
+
+
+def parse_junit(raw: str) -> list:
+    """JUnit XML, as written by pytest --junitxml."""
+    tests = []
+    for case in ET.fromstring(raw).iter("testcase"):
+        status, message = "passed", None
+        for tag in ("failure", "error", "skipped"):
+            element = case.find(tag)
+            if element is not None:
+                status = "failed" if tag == "failure" else tag
+                message = element.get("message") or (element.text or "").strip()
+                break
+        tests.append(_record(case.get("name"), status, case.get("time"), message))
+    return tests
+
+
+def parse_jest(raw: str) -> list:
+    """jest --json output."""
+    tests = []
+    for suite in json.loads(raw)["testResults"]:
+        for result in suite["assertionResults"]:
+            duration = result.get("duration")
+            tests.append(_record(
+                result.get("fullName") or result["title"],
+                JEST_STATUSES.get(result["status"], "failed"),
+                None if duration is None else duration / 1000,
+                "\n".join(result.get("failureMessages") or []),
+            ))
+    return tests
+
+
+def parse_json(raw: str) -> list:
+    """drb's own JSON report: {"tests": [records]}, e.g. from the minitest plugin."""
+    tests = []
+    for test in json.loads(raw)["tests"]:
+        status = test["status"] if test["status"] in STATUSES else "failed"
+        duration = test.get("duration_ms")
+        tests.append(_record(test["name"], status,
+                             None if duration is None else duration / 1000,
+                             test.get("message")))
+    return tests
@@ -1,18 +1,333 @@
-import os
 import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-from drb.container import run_in_container
+from drb.cache import cache_key
+from drb.cases import case_command as fill_case_command
+from drb.container import (
+    RESOURCE_FLAGS, cache_flags, is_timeout, resolve_image_id, resolve_transport,
+    run_in_container, run_with_stdin, write_files,
+)
+from drb.fixtures import fixture_flags, prepare_fixtures
+from drb.limits import limit_flags, resolve_limits
+from drb.native import NATIVE_ENGINE, native_command, native_flags, run_native
+from drb.pool import HarnessError
+from drb.reports import extract_report, parse_report, with_report
+from drb.syntax import check_syntax
+
+
+def pack_run_options(pack: dict, problem: dict, config: dict, state_dir: str,
+                     pack_dir: str = None, private_caches: bool = False) -> dict:
+    """run_tests arguments for one of pack's problems under config.
+
+    Resolves the problem's limits and the pack's cache volumes (see
+    drb.container.cache_flags) and, for the native engine, the pack's host
+    commands, limits, cache directories and reporter. "syntax_check": false
+    in config turns the syntax precheck off. Packs with fixtures get them
+    mounted from state_dir (see drb.fixtures); given pack_dir, the
+    problem's fixtures are prepared for the run first. private_caches
+    keeps runs from writing to the shared caches, for code that must not
+    leave artifacts behind for later runs. With problem None, the
+    resource flags are the ones to start pool containers with. engine,
+    pool, cache and name are left to the caller.
+    """
+    engine = config.get("engine", "docker")
+    limits = resolve_limits(pack, problem, config)
+    image = pack.get("image", "python:3.12-slim")
+    options = {
+        "image": image,
+        "test_command": pack.get("test_command", "pytest test_solution.py --tb=short -q"),
+        "timeout": limits["timeout"],
+        "solution_file": pack.get("solution_file", "solution.py"),
+        "test_file": pack.get("test_file", "test_solution.py"),
+        "harness": pack.get("harness"),
+        "transport": resolve_transport(config, engine),
+        "resource_flags": limit_flags(limits),
+        "report": pack.get("report"),
+        "syntax_check": pack.get("syntax_check") if config.get("syntax_check", True) else None,
+    }
+    if engine == NATIVE_ENGINE:
+        options["test_command"] = native_command(pack)
+        options["resource_flags"] = native_flags(limits, pack, state_dir, private_caches)
+        # A reporter that lives in the image is not on the host.
+        options["report"] = (pack.get("native") or {}).get("report", options["report"]) or None
+    else:
+        options["resource_flags"] += cache_flags(engine, image, pack.get("caches"), private_caches)
+        options["resource_flags"] += fixture_flags(pack, state_dir)
+    if problem and pack_dir:
+        prepare_fixtures(pack, problem, pack_dir, state_dir)
+    return options
 
 
 def run_tests(user_code: str, test_code: str, engine: str, image: str,
               test_command: str, timeout: int = 10,
               solution_file: str = "solution.py",
-              test_file: str = "test_solution.py") -> dict:
-    """Run user code against test code in a container."""
-    with tempfile.TemporaryDirectory() as tmpdir:
-        with open(os.path.join(tmpdir, solution_file), "w") as f:
-            f.write(user_code)
-        with open(os.path.join(tmpdir, test_file), "w") as f:
-            f.write(test_code)
+              test_file: str = "test_solution.py",
+              pool=None, harness: str = None, name: str = None,
+              on_output=None, cache=None, transport: str = "mount",
+              resource_flags=None, report: dict = None,
+              syntax_check: str = None, should_cache=None, on_cancel=None) -> dict:
+    """Run user code against test code in a container.
+
+    The run goes to a warm container from pool, a fresh container or the
+    native sandbox (see _execute); on_output receives its output lines as
+    they come. With a ResultCache, an unchanged run returns the stored
+    result with 'cached' set (see _lookup and, for should_cache,
+    _cacheable). Results have 'passed',
+    'output' and 'phases' (see _with_phases), plus 'resources',
+    'tests' (see drb.reports.with_report) and 'syntax_error' (see
+    _precheck) when they apply. on_cancel lets pool runs be stopped (see
+    drb.pool.ContainerPool.run).
+    """
+    started = time.monotonic()
+    failed = _precheck(user_code, solution_file, syntax_check, image, pool, started)
+    if failed is not None:
+        return failed
+    checked = time.monotonic() if syntax_check else None
+    if report:
+        test_command = with_report(test_command, report)
+    key, hit = _lookup(cache, engine, image, user_code, test_code,
+                       _cache_command(test_command, timeout, resource_flags))
+    looked_up = time.monotonic()
+    if hit is not None:
+        return _with_phases(hit, started, looked_up, checked)
+
+    result = _execute(user_code, test_code, engine, image, test_command,
+                      timeout, solution_file, test_file, pool, harness,
+                      name, on_output, transport, resource_flags=resource_flags,
+                      on_cancel=on_cancel)
+    _attach_tests(result, report)
+    if key is not None and _cacheable([result], should_cache):
+        cache.put(key, _without_phases(result))
+    return _with_phases(result, started, looked_up, checked)
+
+
+def run_cases(user_code: str, test_code: str, engine: str, image: str,
+              case_command: str, cases: list, timeout: int = 10,
+              solution_file: str = "solution.py",
+              test_file: str = "test_solution.py",
+              pool=None, harness: str = None, name: str = None,
+              workers: int = 4, on_output=None, cache=None,
+              transport: str = "mount", resource_flags=None,
+              report: dict = None, syntax_check: str = None,
+              should_cache=None, on_cancel=None) -> dict:
+    """Run each test case separately, several at a time, and merge the results.
+
+    case_command is the pack's command template with a {case} placeholder.
+    Every case gets its own run (a pooled container if a pool is given,
+    otherwise a fresh container named <name>-<index>), so one slow case
+    only holds up itself. on_output receives each case's report as it
+    finishes. The merged result adds 'cases', a list of dicts with 'name',
+    'passed', 'duration_ms', 'output' and, if reported, 'resources', in
+    source order, plus 'tests' from every case if each one produced a
+    report (see run_tests). User code that fails syntax_check is not run,
+    and should_cache and on_cancel work, as with run_tests.
+    """
+    started = time.monotonic()
+    failed = _precheck(user_code, solution_file, syntax_check, image, pool, started)
+    if failed is not None:
+        return failed
+    checked = time.monotonic() if syntax_check else None
+    if report:
+        case_command = with_report(case_command, report)
+    key, hit = _lookup(cache, engine, image, user_code, test_code,
+                       "cases:" + _cache_command(case_command, timeout, resource_flags))
+    looked_up = time.monotonic()
+    if hit is not None:
+        return _with_phases(hit, started, looked_up, checked)
+
+    def run_case(index):
+        case = cases[index]
+        start = time.monotonic()
+        result = _execute(user_code, test_code, engine, image,
+                          fill_case_command(case_command, test_file, case),
+                          timeout, solution_file, test_file, pool, harness,
+                          f"{name}-{index}" if name else None, None,
+                          transport, case=case, resource_flags=resource_flags,
+                          on_cancel=on_cancel)
+        _attach_tests(result, report)
+        case_report = {
+            "name": case,
+            "passed": result["passed"],
+            "duration_ms": round((time.monotonic() - start) * 1000),
+            "output": result["output"],
+        }
+        for field in ("resources", "tests", "phases", "exit_code"):
+            if field in result:
+                case_report[field] = result[field]
+        return case_report
+
+    start = time.monotonic()
+    reports = [None] * len(cases)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {executor.submit(run_case, i): i for i in range(len(cases))}
+        for future in as_completed(futures):
+            case_report = future.result()
+            reports[futures[future]] = case_report
+            if on_output is not None:
+                on_output(_format_case(case_report) + "\n")
+    elapsed = round((time.monotonic() - start) * 1000)
+
+    passed = sum(1 for r in reports if r["passed"])
+    summary = f"{passed}/{len(reports)} cases passed in {elapsed} ms"
+    result = {
+        "passed": passed == len(reports),
+        "output": "\n".join([_format_case(r) for r in reports] + [summary]),
+        "cases": reports,
+    }
+    if all("tests" in r for r in reports):
+        result["tests"] = [test for r in reports for test in r["tests"]]
+    if key is not None and _cacheable(reports, should_cache):
+        cache.put(key, result)
+    return _with_phases(result, started, looked_up, checked)
+
+
+def _precheck(user_code, solution_file, syntax_check, image, pool, started):
+    """The failed result for user code with a syntax error, else None.
+
+    syntax_check is the pack's "syntax_check" (see
+    drb.syntax.check_syntax). Code that fails it is not run at all: the
+    result's 'syntax_error' holds the file, line and message, and its
+    phases are just 'check' and 'total'.
+    """
+    if not syntax_check:
+        return None
+    error = check_syntax(user_code, solution_file, syntax_check, image=image, pool=pool)
+    if error is None:
+        return None
+    elapsed = round((time.monotonic() - started) * 1000)
+    return {
+        "passed": False,
+        "output": (f"{error['output']}\n\nSyntax error in {error['file']} "
+                   f"on line {error['line']}; tests were not run."),
+        "syntax_error": {k: error[k] for k in ("file", "line", "message")},
+        "phases": {"check": elapsed, "total": elapsed},
+    }
+
+
+def _with_phases(result: dict, started: float, looked_up: float,
+                 checked: float = None) -> dict:
+    """Add the runner's own phases around the engine's.
+
+    'phases' is the run's wall time in ms split into 'check' (syntax
+    check, if any), 'lookup' (cache and image ID), 'prepare' (run files,
+    pool checkout), the engine's 'start', 'test' and 'teardown' (see
+    drb.container.run_phases) and 'total'. Runs that cannot time their
+    own phases report 'execute' instead of the last four; cache hits
+    only 'lookup' and 'total'.
+    """
+    now = time.monotonic()
+    engine_phases = result.get("phases") or {}
+    phases = {}
+    if checked is not None:
+        phases["check"] = round((checked - started) * 1000)
+    phases["lookup"] = round((looked_up - (checked or started)) * 1000)
+    if not result.get("cached"):
+        execute = round((now - looked_up) * 1000)
+        if engine_phases:
+            phases["prepare"] = max(0, execute - sum(engine_phases.values()))
+            phases.update(engine_phases)
+        else:
+            phases["execute"] = execute
+    phases["total"] = round((now - started) * 1000)
+    return dict(result, phases=phases)
+
 
-        return run_in_container(engine, image, test_command, tmpdir, timeout)
+def _cacheable(results: list, should_cache) -> bool:
+    """Whether results say something about the code worth storing.
+
+    Timeouts, engine failures and killed runs do not, nor does a run for
+    which should_cache returns False afterwards, e.g. a cancelled one.
+    """
+    if should_cache is not None and not should_cache():
+        return False
+    return not any(is_timeout(r) or "exit_code" in r for r in results)
+
+
+def _without_phases(result: dict) -> dict:
+    return {k: v for k, v in result.items() if k != "phases"}
+
+
+def _attach_tests(result: dict, report: dict):
+    """Move a with_report block out of result's output into 'tests'."""
+    if not report:
+        return
+    result["output"], raw = extract_report(result["output"])
+    tests = parse_report(raw, report["format"]) if raw is not None else None
+    if tests is not None:
+        result["tests"] = tests
+
+
+def _format_case(report: dict) -> str:
+    status = "PASS" if report["passed"] else "FAIL"
+    header = f"--- {report['name']}: {status} ({report['duration_ms']} ms) ---"
+    return f"{header}\n{report['output']}" if report["output"] else header
+
+
+def _cache_command(command: str, timeout, resource_flags) -> str:
+    """The command plus the limits it ran under; tighter limits can fail it."""
+    flags = " ".join(resource_flags or RESOURCE_FLAGS)
+    return f"{command} timeout={timeout} {flags}"
+
+
+def _lookup(cache, engine, image, user_code, test_code, command):
+    """Return (key, cached result) for a run; both are None without a cache.
+
+    The key covers the code, tests, command (with its limits) and image
+    ID. Native runs have no image ID to key them on and go uncached.
+    """
+    if cache is None or engine == NATIVE_ENGINE:
+        return None, None
+    image_id = resolve_image_id(engine, image)
+    if not image_id:
+        return None, None
+    key = cache_key(user_code, test_code, command, image_id)
+    hit = cache.get(key)
+    return key, (dict(hit, cached=True) if hit is not None else None)
+
+
+def _limits_only(flags) -> tuple:
+    """Flags minus cache mounts, which change how fast a run is, not its result."""
+    return tuple(flag for flag in flags
+                 if not flag.startswith(("--volume=", "--env=", "--tmpfs=")))
+
+
+def _execute(user_code, test_code, engine, image, test_command, timeout,
+             solution_file, test_file, pool, harness, name, on_output,
+             transport="mount", case=None, resource_flags=None,
+             on_cancel=None) -> dict:
+    """Run once, in the native sandbox, a warm pool container or a fresh one.
+
+    Pool runs go to the pack's harness if it has one; should the harness
+    fail, the run falls back to a fresh container started under name.
+    Runs whose resource_flags (see drb.limits.limit_flags) differ from the
+    pool's for image also use a fresh container, since running containers
+    keep theirs. With transport "stdin", fresh containers receive the
+    files as a tar stream instead of a bind-mounted temp directory.
+    """
+    files = {solution_file: user_code, test_file: test_code}
+    if engine == NATIVE_ENGINE:
+        return run_native(test_command, files, timeout, name=name,
+                          on_output=on_output, resource_flags=resource_flags or ())
+    pool_fits = pool is not None and (
+        resource_flags is None
+        or _limits_only(resource_flags) == _limits_only(pool.flags_for(image)))
+    if pool_fits:
+        try:
+            return pool.run(image, test_command, files, timeout,
+                            harness=harness, test_file=test_file,
+                            on_output=on_output, case=case, on_cancel=on_cancel)
+        except HarnessError:
+            pass
+
+    resource_flags = tuple(resource_flags or RESOURCE_FLAGS)
+    if transport == "stdin":
+        return run_with_stdin(engine, image, test_command, files, timeout,
+                              name=name, on_output=on_output,
+                              resource_flags=resource_flags)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        write_files(tmpdir, files)
+        return run_in_container(engine, image, test_command, tmpdir, timeout,
+                                name=name, on_output=on_output,
+                                resource_flags=resource_flags)
@@ -0,0 +1,100 @@
+import json
+import math
+import os
+import threading
+import time
+
+RUNS_LOG = "runs.jsonl"
+MAX_LOG_BYTES = 1024 * 1024  # past this the log is cut back to its newer half
+PERCENTILES = (50, 95, 99)
+PHASE_ORDER = ("check", "lookup", "prepare", "start", "test", "teardown", "execute", "total")
+
+_log_lock = threading.Lock()
+
+
+def record_run(state_dir: str, result: dict, pack: str, problem: str, engine: str):
+    """Append a run's phase timings to the rolling runs.jsonl in state_dir."""
+    if not result.get("phases"):
+        return
+    record = {
+        "time": round(time.time(), 3),
+        "pack": pack,
+        "problem": problem,
+        "engine": engine,
+        "passed": bool(result.get("passed")),
+        "cached": bool(result.get("cached")),
+        "phases": result["phases"],
+    }
+    path = os.path.join(state_dir, RUNS_LOG)
+    with _log_lock:
+        os.makedirs(state_dir, exist_ok=True)
+        with open(path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+        if os.path.getsize(path) > MAX_LOG_BYTES:
+            _truncate(path)
+
+
+def _truncate(path: str):
+    with open(path) as f:
+        lines = f.readlines()
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        f.writelines(lines[len(lines) // 2:])
+    os.replace(tmp, path)
+
+
+def load_runs(state_dir: str) -> list:
+    """Read runs.jsonl, skipping lines a crash left half-written."""
+    runs = []
+    try:
+        with open(os.path.join(state_dir, RUNS_LOG)) as f:
+            for line in f:
+                try:
+                    runs.append(json.loads(line))
+                except ValueError:
+                    continue
+    except OSError:
+        pass
+    return runs
+
+
+def percentile(values: list, p: float):
+    """Nearest-rank percentile of values (None if there are none)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def summarize(runs: list) -> dict:
+    """{pack: {phase: {"n", "p50", "p95", "p99"}}} over runs' phase timings."""
+    samples = {}
+    for run in runs:
+        phases = samples.setdefault(run.get("pack") or "?", {})
+        for phase, ms in (run.get("phases") or {}).items():
+            phases.setdefault(phase, []).append(ms)
+    summary = {}
+    for pack, phases in samples.items():
+        summary[pack] = {}
+        for phase in sorted(phases, key=_phase_rank):
+            values = phases[phase]
+            entry = {"n": len(values)}
+            for p in PERCENTILES:
+                entry[f"p{p}"] = percentile(values, p)
+            summary[pack][phase] = entry
+    return summary
+
+
+def _phase_rank(phase: str):
+    return (PHASE_ORDER.index(phase) if phase in PHASE_ORDER else len(PHASE_ORDER), phase)
+
+
+def format_summary(summary: dict) -> str:
+    lines = []
+    for pack in sorted(summary):
+        lines.append(f"{pack}:")
+        lines.append(f"  {'phase':<10} {'n':>6}" + "".join(f"{f'p{p}':>9}" for p in PERCENTILES))
+        for phase, entry in summary[pack].items():
+            lines.append(f"  {phase:<10} {entry['n']:>6}"
+                         + "".join(f"{entry[f'p{p}']:>6} ms" for p in PERCENTILES))
+    return "\n".join(lines)
@@ -0,0 +1,111 @@
+import os
+import re
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
+import traceback
+
+# A pack's "syntax_check" value that means Python's own compile(), run in
+# this process rather than as a command.
+COMPILE_CHECK = "compile"
+# compile() only speaks the host's Python; one older than the python pack's
+# image would report newer syntax (match, PEP 695 generics) as errors, so
+# such hosts ask the image's Python instead.
+COMPILE_MIN_VERSION = (3, 12)
+COMPILE_FALLBACK = "python -m py_compile {file}"
+CHECK_TIMEOUT = 5
+NOT_FOUND = 127  # sh's exit status for a missing command
+
+
+def check_syntax(code: str, filename: str, command: str, image: str = None,
+                 pool=None) -> dict:
+    """Look for a syntax error in code before it is sent off to run.
+
+    command is the pack's "syntax_check": "compile" for Python's compile(),
+    or a command line with a {file} placeholder, such as "node --check
+    {file}", that exits non-zero and names the file and line on a syntax
+    error. The command runs on the host if its program is installed there,
+    otherwise in an idle container from pool for image; if neither is at
+    hand, the check is skipped. On hosts older than COMPILE_MIN_VERSION,
+    "compile" becomes COMPILE_FALLBACK, run only in a container.
+
+    Returns None if code looks fine or could not be checked, else a dict
+    with 'file', 'line', 'message' and the checker's 'output'. Errors the
+    checker reports without a line number count as could-not-check, so a
+    misbehaving checker never blocks a run.
+    """
+    on_host = True
+    if command == COMPILE_CHECK:
+        if sys.version_info >= COMPILE_MIN_VERSION:
+            return _compile(code, filename)
+        command, on_host = COMPILE_FALLBACK, False
+    argv = shlex.split(command.replace("{file}", shlex.quote(filename)))
+    if not argv:
+        return None
+    if on_host and shutil.which(argv[0]):
+        returncode, output = _run_on_host(argv, code, filename)
+    elif pool is not None and image:
+        checked = pool.check(image, shlex.join(argv), {filename: code}, CHECK_TIMEOUT)
+        if checked is None:
+            return None
+        returncode, output = checked
+    else:
+        return None
+    if returncode in (None, 0, NOT_FOUND):
+        return None
+    return _parse(output, filename)
+
+
+def _compile(code: str, filename: str):
+    try:
+        compile(code, filename, "exec", dont_inherit=True)
+    except SyntaxError as exc:
+        return {
+            "file": filename,
+            "line": exc.lineno,
+            "message": exc.msg,
+            "output": "".join(traceback.format_exception_only(type(exc), exc)).rstrip(),
+        }
+    except ValueError:
+        pass  # null bytes; let the real run report them
+    return None
+
+
+def _run_on_host(argv: list, code: str, filename: str):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        with open(os.path.join(tmpdir, filename), "w") as f:
+            f.write(code)
+        try:
+            result = subprocess.run(argv, cwd=tmpdir, capture_output=True,
+                                    text=True, timeout=CHECK_TIMEOUT)
+        except (OSError, subprocess.TimeoutExpired):
+            return None, ""
+    return result.returncode, result.stdout + result.stderr
+
+
+def _parse(output: str, filename: str):
+    """The first file:line the checker reports, with paths trimmed off.
+
+    Python's traceback form, File "solution.py", line 3, counts too.
+    """
+    name = re.escape(filename)
+    output = re.sub(r"[^\s:'\"]*/" + name, filename, output).strip()
+    match = re.search(name + r'(?::|", line )(\d+)', output)
+    if not match:
+        return None
+    message = ""
+    for line in output.splitlines():
+        if re.search(r"error", line, re.IGNORECASE):
+            message = line
+            break
+    if not message:
+        message = output[match.start():].splitlines()[0]
+    message = re.sub(r"^.*?" + name + r":\d+:(\d+:)?\s*", "", message).strip()
+    return {
+        "file": filename,
+        "line": int(match.group(1)),
+        "message": message,
+        "output": output,
+    }
@@ -0,0 +1,114 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import zip_longest
+
+from drb.container import is_timeout
+from drb.problems import load_pack, load_problem
+from drb.runner import pack_run_options, run_tests
+
+SLOW_FRACTION = 0.5  # a reference using more of its timeout than this is flagged
+
+
+def verify_packs(packs_dir: str, pack_names: list, config: dict, state_dir: str,
+                 workers: int = None, on_result=None) -> list:
+    """Check every problem of the given packs against its own tests.
+
+    Each problem's reference_solution must pass its test_code and its
+    skeleton must fail it; both runs for all problems of all packs share
+    one pool of workers. Runs bypass the result cache so their times are
+    real. on_result(row) is called as each problem finishes. Returns rows
+    with 'pack', 'problem', 'reference' and 'skeleton' ("passed",
+    "failed", "timeout" or None when the problem has none), 'reference_ms',
+    'skeleton_ms', 'timeout', 'ok', 'slow' and 'errors'.
+    """
+    engine = config.get("engine", "docker")
+    problems = []
+    for pack_name in pack_names:
+        pack = load_pack(packs_dir, pack_name)
+        for problem_id in pack.get("problems", []):
+            problems.append((pack_name, pack, load_problem(packs_dir, pack_name, problem_id)))
+
+    def check(index, kind, options):
+        _, _, problem = problems[index]
+        code = problem.get(kind)
+        if not code:
+            return None, None
+        started = time.monotonic()
+        result = run_tests(code, problem["test_code"], engine=engine,
+                           name=f"drb-verify-{os.getpid()}-{index}-{kind}", **options)
+        return result, round((time.monotonic() - started) * 1000)
+
+    def verify(index):
+        pack_name, pack, problem = problems[index]
+        try:
+            options = pack_run_options(pack, problem, config, state_dir,
+                                       os.path.join(packs_dir, pack_name), private_caches=True)
+        except (OSError, ValueError) as e:
+            row = verify_row(pack_name, problem, None, None, None, None, None,
+                             error=f"Error: {e}")
+        else:
+            reference, reference_ms = check(index, "reference_solution", options)
+            skeleton, skeleton_ms = check(index, "skeleton", options)
+            row = verify_row(pack_name, problem, reference, reference_ms, skeleton,
+                             skeleton_ms, options["timeout"])
+        if on_result is not None:
+            on_result(row)
+        return row
+
+    # Interleave the packs so every pack's image is busy from the start.
+    by_pack = {}
+    for index, (pack_name, _, _) in enumerate(problems):
+        by_pack.setdefault(pack_name, []).append(index)
+    order = [i for group in zip_longest(*by_pack.values()) for i in group if i is not None]
+    rows = [None] * len(problems)
+    workers = max(1, min(workers or os.cpu_count() or 2, len(problems) or 1))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for index, row in zip(order, executor.map(verify, order)):
+            rows[index] = row
+    return rows
+
+
+def _outcome(result):
+    if result is None:
+        return None
+    if is_timeout(result):
+        return "timeout"
+    return "passed" if result["passed"] else "failed"
+
+
+def verify_row(pack_name: str, problem: dict, reference, reference_ms,
+               skeleton, skeleton_ms, timeout: int, error: str = None) -> dict:
+    """Judge one problem's reference and skeleton runs (see verify_packs).
+
+    error is why the problem could not be run at all, such as limits in
+    the pack or config that do not parse; the row then fails.
+    """
+    errors = [error] if error else []
+    if reference is not None and not reference["passed"]:
+        errors.append("reference solution fails its tests:\n" + reference["output"][-1000:])
+    if skeleton is not None and skeleton["passed"]:
+        errors.append("skeleton passes the tests, so they check nothing")
+    return {
+        "pack": pack_name,
+        "problem": problem["id"],
+        "reference": _outcome(reference),
+        "reference_ms": reference_ms,
+        "skeleton": _outcome(skeleton),
+        "skeleton_ms": skeleton_ms,
+        "timeout": timeout,
+        "ok": not errors,
+        "slow": reference_ms is not None and reference_ms > timeout * 1000 * SLOW_FRACTION,
+        "errors": errors,
+    }
+
+
+def format_row(row: dict) -> str:
+    status = "ok" if row["ok"] else "FAIL"
+    reference = row["reference"] or "no reference"
+    time_ms = f"{row['reference_ms']} ms" if row["reference_ms"] is not None else "-"
+    line = (f"  {status:<4} {row['pack'] + '/' + row['problem']:<45} "
+            f"reference {reference:<12} {time_ms:>9}  skeleton {row['skeleton'] or '-'}")
+    if row["slow"]:
+        line += f"  (slow: over {SLOW_FRACTION:.0%} of its {row['timeout']}s timeout)"
+    return line
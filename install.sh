@@ -70,32 +70,9 @@ with open('$DRB_HOME/config.json', 'w') as f:
     json.dump({'engine': '$ENGINE'}, f, indent=2)
 "
 
-# Build default container image
-DEFAULT_IMAGE=$("$VENV_PYTHON" -c "
-import json
-with open('$DRB_HOME/packs/python/pack.json') as f:
-    print(json.load(f)['image'])
-")
-info "Building container image: ${DEFAULT_IMAGE}..."
-$ENGINE build -t "$DEFAULT_IMAGE" "$DRB_HOME/packs/python/"
-
-# Build JavaScript container image
-JS_IMAGE=$("$VENV_PYTHON" -c "
-import json
-with open('$DRB_HOME/packs/javascript/pack.json') as f:
-    print(json.load(f)['image'])
-")
-info "Building container image: ${JS_IMAGE}..."
-$ENGINE build -t "$JS_IMAGE" "$DRB_HOME/packs/javascript/"
-
-# Build Ruby container image
-RUBY_IMAGE=$("$VENV_PYTHON" -c "
-import json
-with open('$DRB_HOME/packs/ruby/pack.json') as f:
-    print(json.load(f)['image'])
-")
-info "Building container image: ${RUBY_IMAGE}..."
-$ENGINE build -t "$RUBY_IMAGE" "$DRB_HOME/packs/ruby/"
+# Build every pack's container image in parallel
+info "Building container images..."
+PYTHONPATH="$DRB_HOME" "$VENV_PYTHON" -m drb.cli packs prepare --all
 
 # Create bin symlink
 BIN_DIR="${HOME}/.local/bin"
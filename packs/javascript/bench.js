@@ -0,0 +1,62 @@
+// Benchmark driver for drb's Benchmark action.
+//
+// Reads bench.json from the working directory and, for each listed module,
+// calls its exported entry function on every case, printing one marker line
+// per size as soon as it is measured: __DRB_BENCH__ {module, n, seconds}.
+'use strict';
+
+const fs = require('fs');
+const path = require('path');
+const { performance } = require('perf_hooks');
+
+const MARKER = '__DRB_BENCH__';
+
+function emit(record) {
+  process.stdout.write(MARKER + ' ' + JSON.stringify(record) + '\n');
+}
+
+function timeCalls(fn, args, number) {
+  const copies = [];
+  for (let i = 0; i < number; i++) copies.push(JSON.parse(JSON.stringify(args)));
+  const start = performance.now();
+  for (const callArgs of copies) fn(...callArgs);
+  return (performance.now() - start) / 1000;
+}
+
+function measure(moduleName, spec) {
+  let fn;
+  try {
+    fn = require(path.resolve(moduleName))[spec.entry];
+    if (typeof fn !== 'function') throw new Error(`${spec.entry} is not exported`);
+  } catch (e) {
+    emit({ module: moduleName, error: String(e && e.message ? e.message : e) });
+    return;
+  }
+  for (const c of spec.cases) {
+    let best;
+    try {
+      // Call often enough per sample to rise well above timer noise.
+      let number = 1;
+      let elapsed;
+      for (;;) {
+        elapsed = timeCalls(fn, c.args, number);
+        if (elapsed >= spec.min_time || elapsed > spec.budget
+            || number * c.n >= spec.max_elements) break;
+        number *= 10;
+      }
+      best = elapsed / number;
+      for (let i = 1; i < spec.repeat && elapsed <= spec.budget; i++) {
+        elapsed = timeCalls(fn, c.args, number);
+        best = Math.min(best, elapsed / number);
+      }
+    } catch (e) {
+      emit({ module: moduleName, error: `n=${c.n}: ${e && e.message ? e.message : e}` });
+      return;
+    }
+    emit({ module: moduleName, n: c.n, seconds: best });
+    if (best > spec.budget) return;
+  }
+}
+
+const spec = JSON.parse(fs.readFileSync('bench.json', 'utf8'));
+for (const moduleName of spec.modules) measure(moduleName, spec);
@@ -0,0 +1,79 @@
+// Fuzz driver for drb's Fuzz action.
+//
+// Reads fuzz.json from the working directory and calls the exported entry
+// function of the reference and of the solution on every case, stopping at
+// the first case where they disagree. Prints one marker line when done:
+// __DRB_FUZZ__ {checked, skipped} plus, on a mismatch, index, expected and
+// actual, each {value} or {error}.
+'use strict';
+
+const fs = require('fs');
+const path = require('path');
+
+const MARKER = '__DRB_FUZZ__';
+const write = process.stdout.write.bind(process.stdout);
+
+function emit(record) {
+  write(MARKER + ' ' + JSON.stringify(record) + '\n');
+}
+
+// value with every array sorted, for results whose order does not matter.
+function canonical(value) {
+  if (!Array.isArray(value)) return value;
+  const items = value.map(canonical);
+  const keys = items.map(v => JSON.stringify(v));
+  return items.map((v, i) => [keys[i], v])
+    .sort((a, b) => (a[0] < b[0] ? -1 : a[0] > b[0] ? 1 : 0))
+    .map(pair => pair[1]);
+}
+
+function outcome(fn, args, compare) {
+  args = JSON.parse(JSON.stringify(args));
+  let value;
+  // The solution's own console output would drown the report.
+  process.stdout.write = () => true;
+  try {
+    value = fn(...args);
+  } catch (e) {
+    return { error: String(e && e.message ? `${e.name}: ${e.message}` : e) };
+  } finally {
+    process.stdout.write = write;
+  }
+  if (compare === 'args') value = args;
+  else if (compare === 'unordered') value = canonical(value);
+  return { value: value === undefined ? null : value };
+}
+
+function load(name, entry) {
+  const fn = require(path.resolve(name))[entry];
+  if (typeof fn !== 'function') throw new Error(`${entry} is not exported from ${name}`);
+  return fn;
+}
+
+const spec = JSON.parse(fs.readFileSync('fuzz.json', 'utf8'));
+let reference;
+let solution;
+try {
+  reference = load('reference', spec.entry);
+  solution = load('solution', spec.entry);
+} catch (e) {
+  emit({ checked: 0, skipped: 0, error: String(e && e.message ? e.message : e) });
+  process.exit(0);
+}
+let checked = 0;
+let skipped = 0;
+let mismatch = null;
+for (let index = 0; index < spec.cases.length && !mismatch; index++) {
+  const expected = outcome(reference, spec.cases[index], spec.compare);
+  if ('error' in expected) {
+    skipped++;
+    continue;
+  }
+  const actual = outcome(solution, spec.cases[index], spec.compare);
+  if (JSON.stringify(actual) !== JSON.stringify(expected)) {
+    mismatch = { index, expected, actual };
+  } else {
+    checked++;
+  }
+}
+emit(Object.assign({ checked, skipped }, mismatch || {}));
@@ -0,0 +1,171 @@
+// Long-lived jest preforkserver for warm drb containers.
+//
+// Node cannot fork a warm process, so the harness keeps one spare worker
+// that has already loaded jest. Each request on stdin (one JSON line) is
+// handed to the spare, a new spare is started right away, and the answer is
+// written as one JSON line on stdout: {returncode, output, timed_out,
+// resources}. An optional "case" in the request limits the run to the test
+// of that name; "output_head" and "output_tail" bound the output kept.
+'use strict';
+
+const { fork } = require('child_process');
+const fs = require('fs');
+const readline = require('readline');
+
+const OOM_COUNTERS = ['/sys/fs/cgroup/memory.events', '/sys/fs/cgroup/memory/memory.oom_control'];
+
+// The container cgroup's OOM-kill counter, or null if unavailable.
+function oomKills() {
+  for (const path of OOM_COUNTERS) {
+    try {
+      const line = fs.readFileSync(path, 'utf8').split('\n').find((l) => l.startsWith('oom_kill '));
+      if (line) return Number(line.split(' ')[1]);
+    } catch (e) {
+      // try the next cgroup layout
+    }
+  }
+  return null;
+}
+
+// The first `head` and last `tail` bytes of a run's output, as drb keeps them.
+function outputClip(head, tail) {
+  const headParts = [];
+  let headLength = 0;
+  const tailParts = [];
+  let tailLength = 0;
+  let dropped = 0;
+  return {
+    write(data) {
+      if (headLength < head) {
+        const taken = data.subarray(0, head - headLength);
+        headParts.push(taken);
+        headLength += taken.length;
+        data = data.subarray(taken.length);
+      }
+      tailParts.push(data);
+      tailLength += data.length;
+      while (tailLength > tail) {
+        const excess = Math.min(tailLength - tail, tailParts[0].length);
+        tailParts[0] = tailParts[0].subarray(excess);
+        if (!tailParts[0].length) tailParts.shift();
+        tailLength -= excess;
+        dropped += excess;
+      }
+    },
+    text() {
+      let text = Buffer.concat(headParts).toString();
+      if (dropped) text += `\n[drb: ${dropped} bytes of output dropped]\n`;
+      return text + Buffer.concat(tailParts).toString();
+    },
+  };
+}
+
+if (process.argv[2] === '--worker') {
+  const { runCLI } = require('jest');
+  process.once('message', async (request) => {
+    process.chdir(request.dir);
+    const testFile = request.test_file || 'test_solution.js';
+    const argv = {
+      _: [],
+      $0: 'jest',
+      config: JSON.stringify({ testMatch: [`**/${testFile}`] }),
+      verbose: true,
+      runInBand: true,
+      watchman: false,
+    };
+    if (request.case) {
+      const escaped = request.case.replace(/[.*+?^${}()|[\]\\]/g, '\\$&');
+      argv.testNamePattern = '^' + escaped + '$';
+    }
+    let code = 1;
+    try {
+      const { results } = await runCLI(
+        argv,
+        [request.dir],
+      );
+      code = results.success ? 0 : 1;
+    } catch (e) {
+      process.stderr.write(`harness: ${e && e.stack ? e.stack : e}\n`);
+    }
+    process.send({ usage: process.resourceUsage() }, () => process.exit(code));
+  });
+  process.send({ ready: true });
+  return;
+}
+
+function spawnWorker() {
+  const child = fork(__filename, ['--worker'], { stdio: ['ignore', 'pipe', 'pipe', 'ipc'] });
+  child.ready = new Promise((resolve) => child.once('message', resolve));
+  return child;
+}
+
+function handle(worker, request) {
+  return new Promise((resolve) => {
+    const output = outputClip(Number(request.output_head || 65536), Number(request.output_tail || 65536));
+    const oomBefore = oomKills();
+    let usage = null;
+    let timedOut = false;
+    worker.on('message', (m) => { if (m && m.usage) usage = m.usage; });
+    worker.stdout.on('data', (d) => output.write(d));
+    worker.stderr.on('data', (d) => output.write(d));
+    const timer = setTimeout(() => {
+      timedOut = true;
+      worker.kill('SIGKILL');
+    }, Number(request.timeout || 10) * 1000);
+    worker.on('close', (code, signal) => {
+      clearTimeout(timer);
+      const oomAfter = oomKills();
+      resolve({
+        returncode: code === null ? -(require('os').constants.signals[signal] || 9) : code,
+        output: output.text(),
+        timed_out: timedOut,
+        resources: {
+          cpu_ms: usage ? Math.round((usage.userCPUTime + usage.systemCPUTime) / 1000) : null,
+          peak_memory_bytes: usage ? usage.maxRSS * 1024 : null,
+          oom_killed: oomBefore === null || oomAfter === null ? null : oomAfter > oomBefore,
+        },
+      });
+    });
+    worker.ready.then(() => worker.send(request));
+  });
+}
+
+async function main() {
+  let spare = spawnWorker();
+  await spare.ready;
+  process.stdout.write(JSON.stringify({ ready: true }) + '\n');
+
+  const queue = [];
+  let busy = false;
+  const drain = async () => {
+    if (busy) return;
+    busy = true;
+    while (queue.length) {
+      const line = queue.shift();
+      let response;
+      try {
+        const worker = spare;
+        spare = spawnWorker();
+        response = await handle(worker, JSON.parse(line));
+      } catch (e) {
+        response = { returncode: 1, output: `harness error: ${e}`, timed_out: false };
+      }
+      process.stdout.write(JSON.stringify(response) + '\n');
+    }
+    busy = false;
+  };
+
+  const rl = readline.createInterface({ input: process.stdin });
+  rl.on('line', (line) => {
+    if (!line.trim()) return;
+    queue.push(line);
+    drain();
+  });
+  rl.on('close', () => {
+    const finish = () => { spare.kill(); process.exit(0); };
+    if (!busy) finish();
+    else setInterval(() => { if (!busy) finish(); }, 50);
+  });
+}
+
+main();
@@ -0,0 +1,70 @@
+"""Benchmark driver for drb's Benchmark action.
+
+Reads bench.json from the working directory and, for each listed module,
+calls its entry function on every case, printing one marker line per size
+as soon as it is measured: __DRB_BENCH__ {"module", "n", "seconds"}.
+"""
+import copy
+import importlib
+import json
+import sys
+import time
+
+MARKER = "__DRB_BENCH__"
+
+
+def emit(record):
+    sys.stdout.write(MARKER + " " + json.dumps(record) + "\n")
+    sys.stdout.flush()
+
+
+def time_calls(fn, args, number):
+    """Seconds taken by number calls, each on a fresh copy of args."""
+    copies = [copy.deepcopy(args) for _ in range(number)]
+    start = time.perf_counter()
+    for call_args in copies:
+        fn(*call_args)
+    return time.perf_counter() - start
+
+
+def measure(module_name, spec):
+    try:
+        fn = getattr(importlib.import_module(module_name), spec["entry"])
+    except Exception as e:
+        emit({"module": module_name, "error": f"{type(e).__name__}: {e}"})
+        return
+    for case in spec["cases"]:
+        try:
+            # Call often enough per sample to rise well above timer noise.
+            number = 1
+            while True:
+                elapsed = time_calls(fn, case["args"], number)
+                if (elapsed >= spec["min_time"] or elapsed > spec["budget"]
+                        or number * case["n"] >= spec["max_elements"]):
+                    break
+                number *= 10
+            best = elapsed / number
+            for _ in range(spec["repeat"] - 1):
+                if elapsed > spec["budget"]:
+                    break
+                elapsed = time_calls(fn, case["args"], number)
+                best = min(best, elapsed / number)
+        except Exception as e:
+            emit({"module": module_name, "error": f"n={case['n']}: {type(e).__name__}: {e}"})
+            return
+        emit({"module": module_name, "n": case["n"], "seconds": best})
+        if best > spec["budget"]:
+            return
+
+
+def main():
+    sys.path.insert(0, ".")
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 10000))
+    with open("bench.json") as f:
+        spec = json.load(f)
+    for module_name in spec["modules"]:
+        measure(module_name, spec)
+
+
+if __name__ == "__main__":
+    main()
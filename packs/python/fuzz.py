@@ -0,0 +1,75 @@
+"""Fuzz driver for drb's Fuzz action.
+
+Reads fuzz.json from the working directory and calls the entry function of
+the reference and of the solution on every case, stopping at the first
+case where they disagree. Prints one marker line when done:
+__DRB_FUZZ__ {"checked", "skipped"} plus, on a mismatch, "index",
+"expected" and "actual", each {"value"} or {"error"}.
+"""
+import contextlib
+import copy
+import importlib
+import io
+import json
+import sys
+
+MARKER = "__DRB_FUZZ__"
+
+
+def emit(record):
+    sys.stdout.write(MARKER + " " + json.dumps(record, default=repr) + "\n")
+    sys.stdout.flush()
+
+
+def canonical(value):
+    """value with every list sorted, for results whose order does not matter."""
+    if isinstance(value, (list, tuple)):
+        return sorted((canonical(v) for v in value), key=lambda v: json.dumps(v, default=repr))
+    return value
+
+
+def outcome(fn, args, compare):
+    args = copy.deepcopy(args)
+    try:
+        # The solution's own prints would drown the report.
+        with contextlib.redirect_stdout(io.StringIO()):
+            value = fn(*args)
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {e}"}
+    if compare == "args":
+        value = args
+    elif compare == "unordered":
+        value = canonical(value)
+    elif isinstance(value, tuple):
+        value = list(value)
+    return {"value": value}
+
+
+def main():
+    sys.path.insert(0, ".")
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 10000))
+    with open("fuzz.json") as f:
+        spec = json.load(f)
+    try:
+        reference = getattr(importlib.import_module("reference"), spec["entry"])
+        solution = getattr(importlib.import_module("solution"), spec["entry"])
+    except Exception as e:
+        emit({"checked": 0, "skipped": 0, "error": f"{type(e).__name__}: {e}"})
+        return
+    checked = skipped = 0
+    for index, args in enumerate(spec["cases"]):
+        expected = outcome(reference, args, spec["compare"])
+        if "error" in expected:
+            skipped += 1
+            continue
+        actual = outcome(solution, args, spec["compare"])
+        if actual != expected:
+            emit({"checked": checked, "skipped": skipped, "index": index,
+                  "expected": expected, "actual": actual})
+            return
+        checked += 1
+    emit({"checked": checked, "skipped": skipped})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""Long-lived pytest forkserver for warm drb containers.
+
+Reads one JSON request per line on stdin, forks a child per request that
+runs pytest in the requested directory, and answers with one JSON line on
+stdout: {"returncode": int, "output": str, "timed_out": bool, "resources":
+{...}}. An optional "case" in the request limits the run to that one test
+function; "output_head" and "output_tail" bound the output kept.
+"""
+import json
+import os
+import select
+import signal
+import sys
+import time
+
+import pytest
+
+PYTEST_ARGS = ["--tb=short", "-q", "-s", "-p", "no:cacheprovider"]
+OOM_COUNTERS = ("/sys/fs/cgroup/memory.events", "/sys/fs/cgroup/memory/memory.oom_control")
+
+
+def oom_kills():
+    """The container cgroup's OOM-kill counter, or None if unavailable."""
+    for path in OOM_COUNTERS:
+        try:
+            with open(path) as f:
+                for line in f:
+                    if line.startswith("oom_kill "):
+                        return int(line.split()[1])
+        except (OSError, ValueError):
+            continue
+    return None
+
+
+class OutputClip:
+    """The first head and last tail bytes of a run's output, as drb keeps them."""
+
+    def __init__(self, head, tail):
+        self.head_size, self.tail_size = head, tail
+        self.head, self.tail = bytearray(), bytearray()
+        self.dropped = 0
+
+    def write(self, data):
+        room = self.head_size - len(self.head)
+        if room > 0:
+            self.head += data[:room]
+            data = data[room:]
+        self.tail += data
+        excess = len(self.tail) - self.tail_size
+        if excess > 0:
+            del self.tail[:excess]
+            self.dropped += excess
+
+    def text(self):
+        text = self.head.decode(errors="replace")
+        if self.dropped:
+            text += f"\n[drb: {self.dropped} bytes of output dropped]\n"
+        return text + self.tail.decode(errors="replace")
+
+
+def warm_up():
+    """Run pytest once so plugins and assertion rewriting are imported."""
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    saved = os.dup(1), os.dup(2)
+    os.dup2(devnull, 1)
+    os.dup2(devnull, 2)
+    try:
+        pytest.main(["--collect-only", "-q", "-p", "no:cacheprovider", os.devnull])
+    except BaseException:
+        pass
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.dup2(saved[0], 1)
+        os.dup2(saved[1], 2)
+        os.close(devnull)
+
+
+def run_child(request, write_fd):
+    os.setsid()
+    os.dup2(write_fd, 1)
+    os.dup2(write_fd, 2)
+    os.chdir(request["dir"])
+    sys.path.insert(0, request["dir"])
+    target = request.get("test_file", "test_solution.py")
+    if request.get("case"):
+        target += "::" + request["case"]
+    try:
+        code = pytest.main([target] + PYTEST_ARGS)
+    except BaseException as e:
+        print(f"harness: {e!r}")
+        code = 1
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os._exit(int(code))
+
+
+def handle(request):
+    oom_before = oom_kills()
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        run_child(request, write_fd)
+    os.close(write_fd)
+
+    deadline = time.monotonic() + float(request.get("timeout", 10))
+    output = OutputClip(int(request.get("output_head", 65536)),
+                        int(request.get("output_tail", 65536)))
+    timed_out = False
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            timed_out = True
+            break
+        ready, _, _ = select.select([read_fd], [], [], remaining)
+        if not ready:
+            continue
+        data = os.read(read_fd, 65536)
+        if not data:
+            break
+        output.write(data)
+    os.close(read_fd)
+
+    if timed_out:
+        try:
+            os.killpg(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+    _, status, usage = os.wait4(pid, 0)
+    returncode = os.waitstatus_to_exitcode(status)
+    oom_after = oom_kills()
+    return {
+        "returncode": returncode,
+        "output": output.text(),
+        "timed_out": timed_out,
+        "resources": {
+            "cpu_ms": round((usage.ru_utime + usage.ru_stime) * 1000),
+            "peak_memory_bytes": usage.ru_maxrss * 1024,
+            "oom_killed": None if oom_before is None or oom_after is None
+            else oom_after > oom_before,
+        },
+    }
+
+
+def main():
+    warm_up()
+    out = sys.stdout
+    out.write(json.dumps({"ready": True}) + "\n")
+    out.flush()
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        try:
+            response = handle(json.loads(line))
+        except Exception as e:
+            response = {"returncode": 1, "output": f"harness error: {e!r}", "timed_out": False}
+        out.write(json.dumps(response) + "\n")
+        out.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# Benchmark driver for drb's Benchmark action.
+#
+# Reads bench.json from the working directory and, for each listed module,
+# calls its entry method on every case, printing one marker line per size
+# as soon as it is measured: __DRB_BENCH__ {"module", "n", "seconds"}.
+# Each file is evaluated into its own anonymous module so the solution and
+# the reference can define methods of the same name.
+require 'json'
+
+MARKER = '__DRB_BENCH__'
+
+def emit(record)
+  $stdout.write("#{MARKER} #{JSON.generate(record)}\n")
+  $stdout.flush
+end
+
+def load_target(name)
+  mod = Module.new
+  mod.module_eval(File.read("#{name}.rb"), "#{name}.rb")
+  Object.new.extend(mod)
+end
+
+def time_calls(target, entry, args, number)
+  copies = Array.new(number) { Marshal.load(Marshal.dump(args)) }
+  start = Process.clock_gettime(Process::CLOCK_MONOTONIC)
+  copies.each { |call_args| target.send(entry, *call_args) }
+  Process.clock_gettime(Process::CLOCK_MONOTONIC) - start
+end
+
+def measure(name, spec)
+  begin
+    target = load_target(name)
+  rescue StandardError, ScriptError => e
+    emit(module: name, error: "#{e.class}: #{e.message}")
+    return
+  end
+  spec['cases'].each do |c|
+    begin
+      # Call often enough per sample to rise well above timer noise.
+      number = 1
+      elapsed = nil
+      loop do
+        elapsed = time_calls(target, spec['entry'], c['args'], number)
+        break if elapsed >= spec['min_time'] || elapsed > spec['budget'] ||
+                 number * c['n'] >= spec['max_elements']
+
+        number *= 10
+      end
+      best = elapsed / number
+      (spec['repeat'] - 1).times do
+        break if elapsed > spec['budget']
+
+        elapsed = time_calls(target, spec['entry'], c['args'], number)
+        best = [best, elapsed / number].min
+      end
+    rescue StandardError => e
+      emit(module: name, error: "n=#{c['n']}: #{e.class}: #{e.message}")
+      return
+    end
+    emit(module: name, n: c['n'], seconds: best)
+    return if best > spec['budget']
+  end
+end
+
+spec = JSON.parse(File.read('bench.json'))
+spec['modules'].each { |name| measure(name, spec) }
@@ -0,0 +1,72 @@
+# Fuzz driver for drb's Fuzz action.
+#
+# Reads fuzz.json from the working directory and calls the entry method of
+# the reference and of the solution on every case, stopping at the first
+# case where they disagree. Prints one marker line when done:
+# __DRB_FUZZ__ {"checked", "skipped"} plus, on a mismatch, "index",
+# "expected" and "actual", each {"value"} or {"error"}. Each file is
+# evaluated into its own anonymous module, as in bench.rb.
+require 'json'
+require 'stringio'
+
+MARKER = '__DRB_FUZZ__'
+
+def emit(record)
+  $stdout.write("#{MARKER} #{JSON.generate(record)}\n")
+  $stdout.flush
+end
+
+def load_target(name)
+  mod = Module.new
+  mod.module_eval(File.read("#{name}.rb"), "#{name}.rb")
+  Object.new.extend(mod)
+end
+
+# value with every array sorted, for results whose order does not matter.
+def canonical(value)
+  return value unless value.is_a?(Array)
+
+  value.map { |v| canonical(v) }.sort_by { |v| JSON.generate(v) }
+end
+
+def outcome(target, entry, args, compare)
+  args = Marshal.load(Marshal.dump(args))
+  stdout = $stdout
+  begin
+    # The solution's own prints would drown the report.
+    $stdout = StringIO.new
+    value = target.send(entry, *args)
+  rescue StandardError, SystemStackError => e
+    return { 'error' => "#{e.class}: #{e.message}" }
+  ensure
+    $stdout = stdout
+  end
+  value = args if compare == 'args'
+  value = canonical(value) if compare == 'unordered'
+  { 'value' => value }
+end
+
+spec = JSON.parse(File.read('fuzz.json'))
+begin
+  reference = load_target('reference')
+  solution = load_target('solution')
+rescue StandardError, ScriptError => e
+  emit(checked: 0, skipped: 0, error: "#{e.class}: #{e.message}")
+  exit
+end
+checked = 0
+skipped = 0
+spec['cases'].each_with_index do |args, index|
+  expected = outcome(reference, spec['entry'], args, spec['compare'])
+  if expected.key?('error')
+    skipped += 1
+    next
+  end
+  actual = outcome(solution, spec['entry'], args, spec['compare'])
+  if actual != expected
+    emit(checked: checked, skipped: skipped, index: index, expected: expected, actual: actual)
+    exit
+  end
+  checked += 1
+end
+emit(checked: checked, skipped: skipped)
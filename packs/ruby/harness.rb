@@ -0,0 +1,140 @@
+# Long-lived minitest forkserver for warm drb containers.
+#
+# Reads one JSON request per line on stdin, forks a child per request that
+# loads the test file in the requested directory, and answers with one JSON
+# line on stdout: {"returncode": int, "output": str, "timed_out": bool,
+# "resources": {...}}. An optional "case" in the request limits the run to
+# that one test method; "output_head" and "output_tail" bound the output kept.
+require 'json'
+require 'minitest'
+
+OOM_COUNTERS = ['/sys/fs/cgroup/memory.events', '/sys/fs/cgroup/memory/memory.oom_control'].freeze
+
+# The container cgroup's OOM-kill counter, or nil if unavailable.
+def oom_kills
+  OOM_COUNTERS.each do |path|
+    line = File.foreach(path).find { |l| l.start_with?('oom_kill ') }
+    return line.split[1].to_i if line
+  rescue SystemCallError
+    next
+  end
+  nil
+end
+
+# The first head and last tail bytes of a run's output, as drb keeps them.
+class OutputClip
+  def initialize(head, tail)
+    @head_size = head
+    @tail_size = tail
+    @head = String.new(encoding: Encoding::BINARY)
+    @tail = String.new(encoding: Encoding::BINARY)
+    @dropped = 0
+  end
+
+  def <<(data)
+    room = @head_size - @head.bytesize
+    if room.positive?
+      @head << data.byteslice(0, room)
+      data = data.byteslice(room..) || ''
+    end
+    @tail << data
+    excess = @tail.bytesize - @tail_size
+    if excess.positive?
+      @tail = @tail.byteslice(excess..)
+      @dropped += excess
+    end
+    self
+  end
+
+  def text
+    text = @head.dup
+    text << "\n[drb: #{@dropped} bytes of output dropped]\n" if @dropped.positive?
+    (text << @tail).force_encoding('UTF-8').scrub
+  end
+end
+
+def child_cpu_seconds
+  times = Process.times
+  times.cutime + times.cstime
+end
+
+def run_child(request, writer)
+  Process.setsid
+  $stdout.reopen(writer)
+  $stderr.reopen(writer)
+  $stdout.sync = true
+  Dir.chdir(request['dir'])
+  $LOAD_PATH.unshift(request['dir'])
+  ARGV.clear
+  ARGV.push('-n', request['case']) if request['case']
+  # minitest/autorun installs an at_exit hook that runs the suite and sets
+  # the exit status, so loading the test file and exiting is enough.
+  load File.join(request['dir'], request.fetch('test_file', 'test_solution.rb'))
+  exit 0
+rescue StandardError, ScriptError => e
+  warn "#{e.class}: #{e.message}"
+  warn e.backtrace.first(5).join("\n") if e.backtrace
+  exit! 1
+end
+
+def handle(request)
+  oom_before = oom_kills
+  cpu_before = child_cpu_seconds
+  reader, writer = IO.pipe
+  pid = fork do
+    reader.close
+    run_child(request, writer)
+  end
+  writer.close
+
+  deadline = Process.clock_gettime(Process::CLOCK_MONOTONIC) + request.fetch('timeout', 10).to_f
+  output = OutputClip.new(request.fetch('output_head', 65_536).to_i,
+                          request.fetch('output_tail', 65_536).to_i)
+  timed_out = false
+  loop do
+    remaining = deadline - Process.clock_gettime(Process::CLOCK_MONOTONIC)
+    if remaining <= 0
+      timed_out = true
+      break
+    end
+    next unless IO.select([reader], nil, nil, remaining)
+
+    begin
+      output << reader.readpartial(65_536)
+    rescue EOFError
+      break
+    end
+  end
+  reader.close
+
+  if timed_out
+    begin
+      Process.kill('KILL', -pid)
+    rescue Errno::ESRCH
+      nil
+    end
+  end
+  _, status = Process.wait2(pid)
+  returncode = status.exitstatus || -(status.termsig || 1)
+  oom_after = oom_kills
+  resources = {
+    cpu_ms: ((child_cpu_seconds - cpu_before) * 1000).round,
+    peak_memory_bytes: nil,
+    oom_killed: oom_before && oom_after ? oom_after > oom_before : nil
+  }
+  { returncode: returncode, output: output.text, timed_out: timed_out,
+    resources: resources }
+end
+
+$stdout.sync = true
+puts JSON.generate(ready: true)
+$stdin.each_line do |line|
+  next if line.strip.empty?
+
+  response = begin
+    handle(JSON.parse(line))
+  rescue StandardError => e
+    { returncode: 1, output: "harness error: #{e.message}", timed_out: false }
+  end
+  puts JSON.generate(response)
+end
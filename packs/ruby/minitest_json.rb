@@ -0,0 +1,40 @@
+# Minitest plugin that writes one record per test to a JSON report, for
+# drb's structured results. Loaded with RUBYOPT so test files need no
+# changes; the report path comes from DRB_REPORT.
+require 'json'
+require 'minitest'
+
+module Minitest
+  class DrbJsonReporter < AbstractReporter
+    def initialize(path)
+      super()
+      @path = path
+      @tests = []
+    end
+
+    def record(result)
+      status = if result.skipped? then 'skipped'
+               elsif result.error? then 'error'
+               elsif result.passed? then 'passed'
+               else 'failed'
+               end
+      @tests << {
+        name: result.name,
+        status: status,
+        duration_ms: (result.time * 1000).round,
+        message: result.failure && result.failure.message,
+      }
+    end
+
+    def report
+      File.write(@path, JSON.generate(tests: @tests))
+    end
+  end
+
+  def self.plugin_drb_json_init(_options)
+    reporter << DrbJsonReporter.new(ENV.fetch('DRB_REPORT', '.drb-report.json'))
+  end
+
+  load_plugins
+  extensions << 'drb_json'
+end
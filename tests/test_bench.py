@@ -0,0 +1,144 @@
+import json
+import os
+import subprocess
+import sys
+from unittest.mock import patch
+
+import pytest
+
+from drb.bench import (
+    RESULT_MARKER, fit_complexity, generate_inputs, parse_results, run_benchmark,
+)
+from drb.problems import load_pack, load_problem
+
+PACKS = os.path.join(os.path.dirname(__file__), "..", "packs")
+
+
+def marker(**record):
+    return f"{RESULT_MARKER} {json.dumps(record)}"
+
+
+def test_generate_inputs_is_deterministic():
+    gen = "def generate(n, rng):\n    return [[rng.randint(0, 9) for _ in range(n)]]\n"
+    first = generate_inputs(gen, [5, 10])
+    assert first == generate_inputs(gen, [5, 10])
+    assert [c["n"] for c in first] == [5, 10]
+    assert len(first[1]["args"][0]) == 10
+
+
+def test_generate_inputs_has_no_imports():
+    with pytest.raises(ImportError):
+        generate_inputs("import os\ndef generate(n, rng):\n    return []\n", [1])
+
+
+@pytest.mark.parametrize("label,f", [
+    ("O(n)", lambda n: 3e-8 * n),
+    ("O(n log n)", lambda n: 2e-8 * n * (n.bit_length())),
+    ("O(n^2)", lambda n: 1e-9 * n * n),
+])
+def test_fit_complexity(label, f):
+    sizes = [100, 1000, 10000, 100000]
+    assert fit_complexity([(n, f(n)) for n in sizes]) == label
+
+
+def test_fit_complexity_needs_three_sizes():
+    assert fit_complexity([(100, 0.1), (1000, 1.0)]) is None
+
+
+def test_parse_results():
+    output = "\n".join([
+        "some print from the solution",
+        marker(module="reference", n=100, seconds=0.001),
+        marker(module="solution", n=100, seconds=0.002),
+        marker(module="solution", error="n=1000: ValueError: boom"),
+    ])
+    results = parse_results(output)
+    assert results["reference"] == {"timings": [[100, 0.001]], "error": None}
+    assert results["solution"]["timings"] == [[100, 0.002]]
+    assert results["solution"]["error"] == "n=1000: ValueError: boom"
+
+
+def test_run_benchmark_reports_against_reference():
+    pack = load_pack(PACKS, "python")
+    problem = load_problem(PACKS, "python", "two_sum")
+    seen = {}
+
+    def fake_container(engine, image, cmd, work_dir, timeout, **kwargs):
+        seen["files"] = sorted(os.listdir(work_dir))
+        with open(os.path.join(work_dir, "bench.json")) as f:
+            seen["spec"] = json.load(f)
+        seen["flags"] = kwargs["extra_flags"]
+        lines = []
+        for n in (100, 1000, 10000):
+            lines.append(marker(module="reference", n=n, seconds=1e-7 * n))
+            lines.append(marker(module="solution", n=n, seconds=1e-9 * n * n))
+        for line in lines:
+            kwargs["on_output"](line + "\n")
+        return {"passed": True, "output": "\n".join(lines)}
+
+    progress = []
+    with patch("drb.bench.run_in_container", side_effect=fake_container):
+        result = run_benchmark("def two_sum(nums, target): pass", problem, pack,
+                               os.path.join(PACKS, "python"), "docker", "drb-python",
+                               cpuset="2", on_output=progress.append)
+    assert seen["files"] == ["bench.json", "bench.py", "reference.py", "solution.py"]
+    assert seen["spec"]["entry"] == "two_sum"
+    assert seen["spec"]["modules"] == ["reference", "solution"]
+    assert seen["flags"] == ["--cpuset-cpus=2"]
+    assert result["passed"] is True
+    assert result["benchmark"]["solution"]["complexity"] == "O(n^2)"
+    assert result["benchmark"]["reference"]["complexity"] == "O(n)"
+    assert "solution takes 100.0x the reference's time" in result["output"]
+    assert progress[0] == "reference: n=100 0.010 ms\n"
+
+
+def test_run_benchmark_over_stdin():
+    pack = load_pack(PACKS, "python")
+    problem = load_problem(PACKS, "python", "two_sum")
+    with patch("drb.bench.run_in_container") as mount, \
+         patch("drb.bench.run_with_stdin", return_value={
+             "passed": True, "output": marker(module="solution", n=100, seconds=0.001)}) as stdin:
+        result = run_benchmark("", problem, pack, os.path.join(PACKS, "python"),
+                               "podman", "drb-python", cpuset="1", transport="stdin")
+    mount.assert_not_called()
+    assert sorted(stdin.call_args[0][3]) == ["bench.json", "bench.py", "reference.py",
+                                             "solution.py"]
+    assert stdin.call_args[1]["extra_flags"] == ["--cpuset-cpus=1"]
+    assert result["benchmark"]["solution"]["timings"] == [[100, 0.001]]
+
+
+def test_run_benchmark_timeout_keeps_partial_timings():
+    pack = load_pack(PACKS, "python")
+    problem = load_problem(PACKS, "python", "two_sum")
+    output = marker(module="solution", n=100, seconds=0.5) + \
+        "\nTimeout: tests did not complete within 5 seconds."
+    with patch("drb.bench.run_in_container",
+               return_value={"passed": False, "output": output}):
+        result = run_benchmark("", problem, pack, os.path.join(PACKS, "python"),
+                               "docker", "img", timeout=5)
+    assert result["passed"] is False
+    assert result["benchmark"]["solution"]["timings"] == [[100, 0.5]]
+    assert "Timed out after 5 seconds" in result["output"]
+
+
+def test_run_benchmark_without_spec():
+    pack = load_pack(PACKS, "python")
+    problem = load_problem(PACKS, "python", "fizzbuzz")
+    result = run_benchmark("", problem, pack, PACKS, "docker", "img")
+    assert result == {"passed": False, "output": "This problem has no benchmark."}
+
+
+def test_python_driver_emits_timings(tmp_path):
+    with open(os.path.join(PACKS, "python", "bench.py")) as f:
+        (tmp_path / "bench.py").write_text(f.read())
+    (tmp_path / "solution.py").write_text("def total(nums):\n    return sum(nums)\n")
+    (tmp_path / "bench.json").write_text(json.dumps({
+        "entry": "total", "modules": ["solution", "missing"],
+        "cases": [{"n": 10, "args": [list(range(10))]}, {"n": 100, "args": [list(range(100))]}],
+        "budget": 1.0, "repeat": 2, "min_time": 0.001, "max_elements": 10000,
+    }))
+    out = subprocess.run([sys.executable, "bench.py"], cwd=tmp_path,
+                         capture_output=True, text=True, timeout=30).stdout
+    results = parse_results(out)
+    assert [n for n, _ in results["solution"]["timings"]] == [10, 100]
+    assert "ModuleNotFoundError" in results["missing"]["error"]
@@ -0,0 +1,49 @@
+import os
+import time
+
+from drb.cache import ResultCache, cache_key, create_result_cache
+
+
+def test_cache_key_depends_on_every_part():
+    base = cache_key("code", "tests", "pytest", "sha256:abc")
+    assert base == cache_key("code", "tests", "pytest", "sha256:abc")
+    assert base != cache_key("code2", "tests", "pytest", "sha256:abc")
+    assert base != cache_key("code", "tests2", "pytest", "sha256:abc")
+    assert base != cache_key("code", "tests", "pytest -x", "sha256:abc")
+    assert base != cache_key("code", "tests", "pytest", "sha256:def")
+
+
+def test_put_and_get(tmp_path):
+    cache = ResultCache(str(tmp_path / "results"))
+    assert cache.get("k") is None
+    cache.put("k", {"passed": True, "output": "1 passed"})
+    assert cache.get("k") == {"passed": True, "output": "1 passed"}
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache_dir = tmp_path / "results"
+    cache = ResultCache(str(cache_dir), max_bytes=300)
+    payload = {"passed": True, "output": "x" * 60}
+    cache.put("a", payload)
+    cache.put("b", payload)
+    old = time.time() - 100
+    os.utime(cache_dir / "a.json", (old, old))
+    os.utime(cache_dir / "b.json", (old + 1, old + 1))
+    cache.get("a")  # bump a so b is now the oldest
+    cache.put("c", payload)
+    cache.put("d", payload)
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+    assert cache.get("d") is not None
+
+
+def test_corrupt_entry_is_a_miss(tmp_path):
+    cache_dir = tmp_path / "results"
+    cache_dir.mkdir()
+    (cache_dir / "k.json").write_text("{not json")
+    assert ResultCache(str(cache_dir)).get("k") is None
+
+
+def test_create_result_cache(tmp_path):
+    assert isinstance(create_result_cache({}, str(tmp_path)), ResultCache)
+    assert create_result_cache({"result_cache_mb": 0}, str(tmp_path)) is None
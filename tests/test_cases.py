@@ -0,0 +1,63 @@
+import json
+import os
+
+from drb.cases import case_command, case_filter, discover_cases
+
+PACKS = os.path.join(os.path.dirname(__file__), "..", "packs")
+
+
+def load_test_code(pack, problem):
+    with open(os.path.join(PACKS, pack, f"{problem}.json")) as f:
+        return json.load(f)["test_code"]
+
+
+def test_discover_python_cases():
+    code = load_test_code("python", "two_sum")
+    assert discover_cases(code, "test_solution.py") == ["test_basic", "test_middle", "test_negative"]
+
+
+def test_discover_ruby_cases():
+    code = load_test_code("ruby", "two_sum")
+    assert discover_cases(code, "test_solution.rb") == ["test_basic", "test_middle", "test_negative"]
+
+
+def test_discover_javascript_cases():
+    code = load_test_code("javascript", "two_sum")
+    assert discover_cases(code, "test_solution.js") == ["basic", "middle", "negative"]
+    code = 'it("handles (empty) input", () => {});\ntest(`x`, () => {});'
+    assert discover_cases(code, "test_solution.js") == ["handles (empty) input", "x"]
+
+
+def test_discover_go_cases():
+    code = load_test_code("go", "two_sum")
+    assert discover_cases(code, "solution_test.go") == ["TestBasic", "TestMiddle", "TestNegative"]
+
+
+def test_python_helpers_and_nested_defs_ignored():
+    code = "def helper():\n    pass\n\ndef test_one():\n    def test_inner():\n        pass\n"
+    assert discover_cases(code, "test_solution.py") == ["test_one"]
+
+
+def test_unknown_file_type_has_no_cases():
+    assert discover_cases("fn test_x() {}", "test_solution.rs") == []
+
+
+def test_every_pack_problem_splits():
+    for pack, test_file in (("python", "test_solution.py"),
+                            ("javascript", "test_solution.js"),
+                            ("ruby", "test_solution.rb"),
+                            ("go", "solution_test.go")):
+        with open(os.path.join(PACKS, pack, "pack.json")) as f:
+            problems = json.load(f)["problems"]
+        for problem in problems:
+            assert discover_cases(load_test_code(pack, problem), test_file), f"{pack}/{problem}"
+
+
+def test_case_filter_and_command():
+    assert case_filter("test_solution.py", "test_basic") == "test_basic"
+    assert case_filter("test_solution.js", "adds (a+b)") == r"^adds\ \(a\+b\)$"
+    assert case_filter("solution_test.go", "TestBasic") == "^TestBasic$"
+    assert case_command("pytest test_solution.py::{case} -q", "test_solution.py",
+                        "test_basic") == "pytest test_solution.py::test_basic -q"
+    assert case_command("jest -t {case}", "test_solution.js", "it's") == \
+        "jest -t '^it'\"'\"'s$'"
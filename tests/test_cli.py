@@ -227,3 +227,241 @@ def test_tutor_on_requires_key(tmp_path):
     with patch("drb.cli.DEFAULT_STATE_DIR", state_dir):
         with pytest.raises(SystemExit):
             main(["tutor", "on"])
+
+
+def test_packs_use_builds_in_daemon_when_running(tmp_path, capsys):
+    """With the daemon up, packs use hands the build off and returns."""
+    state_dir = str(tmp_path / "state")
+    pack_dir = os.path.join(state_dir, "packs", "testpack")
+    os.makedirs(pack_dir)
+    with open(os.path.join(pack_dir, "pack.json"), "w") as f:
+        json.dump({"name": "testpack", "image": "drb-test", "problems": []}, f)
+
+    real_isdir = os.path.isdir
+
+    def fake_isdir(path):
+        if "drb" in path and path.endswith("packs") and "state" not in path:
+            return False
+        return real_isdir(path)
+
+    with patch("drb.cli.DEFAULT_STATE_DIR", state_dir), \
+         patch("drb.cli.os.path.isdir", side_effect=fake_isdir), \
+         patch("drb.cli.is_daemon_running", return_value=True), \
+         patch("drb.cli.send_to_daemon", return_value={"status": "ok", "state": "building"}) as mock_send, \
+         patch("drb.container.ensure_image") as mock_ensure:
+        main(["packs", "use", "testpack"])
+
+    mock_ensure.assert_not_called()
+    assert mock_send.call_args[0][1] == "build_image"
+    assert mock_send.call_args[1]["image"] == "drb-test"
+    out = capsys.readouterr().out
+    assert "Switched to pack: testpack" in out
+    assert "in the background" in out
+
+
+def test_packs_prepare_all(tmp_path, capsys):
+    state_dir = str(tmp_path / "state")
+    for name in ("alpha", "beta"):
+        pack_dir = os.path.join(state_dir, "packs", name)
+        os.makedirs(pack_dir)
+        with open(os.path.join(pack_dir, "pack.json"), "w") as f:
+            json.dump({"name": name, "image": f"drb-{name}", "problems": []}, f)
+
+    real_isdir = os.path.isdir
+
+    def fake_isdir(path):
+        if "drb" in path and path.endswith("packs") and "state" not in path:
+            return False
+        return real_isdir(path)
+
+    def fake_prepare(registry, engine, targets, workers=3, on_output=None):
+        on_output("alpha", "Step 1/3\n")
+        return [
+            {"pack": name, "image": image, "state": "ready", "seconds": 1.5,
+             "size": 120_000_000, "error": None}
+            for name, image, _ in targets
+        ]
+
+    with patch("drb.cli.DEFAULT_STATE_DIR", state_dir), \
+         patch("drb.cli.os.path.isdir", side_effect=fake_isdir), \
+         patch("drb.images.prepare_images", side_effect=fake_prepare) as mock_prepare:
+        main(["packs", "prepare", "--all", "--workers", "4"])
+
+    targets = mock_prepare.call_args[0][2]
+    assert [t[1] for t in targets] == ["drb-alpha", "drb-beta"]
+    assert mock_prepare.call_args[1]["workers"] == 2
+    out = capsys.readouterr().out
+    assert "[alpha] Step 1/3" in out
+    assert "120.0 MB" in out
+
+
+@pytest.mark.parametrize("sub", ["prepare", "verify"])
+def test_packs_rejects_bad_workers(capsys, sub):
+    with pytest.raises(SystemExit) as exc:
+        main(["packs", sub, "--all", "--workers", "0"])
+    assert exc.value.code == 2
+    assert "expected a positive integer" in capsys.readouterr().err
+
+
+def test_stats_runs_prints_percentiles(tmp_path, capsys):
+    from drb.stats import record_run
+
+    for ms in (10, 20, 30):
+        record_run(str(tmp_path), {"passed": True, "phases": {"lookup": 1, "total": ms}},
+                   "python", "two_sum", "docker")
+    record_run(str(tmp_path), {"passed": True, "phases": {"total": 5}}, "ruby", "two_sum", "docker")
+    with patch("drb.cli.DEFAULT_STATE_DIR", str(tmp_path)):
+        main(["stats", "runs", "--pack", "python"])
+    out = capsys.readouterr().out
+    assert "python:" in out
+    assert "ruby:" not in out
+    total = next(line for line in out.splitlines() if line.strip().startswith("total"))
+    assert total.split()[1:] == ["3", "20", "ms", "30", "ms", "30", "ms"]
+
+
+def test_stats_runs_empty(tmp_path, capsys):
+    with patch("drb.cli.DEFAULT_STATE_DIR", str(tmp_path)):
+        main(["stats", "runs"])
+    assert "No runs recorded yet." in capsys.readouterr().out
+
+
+def grade_env(tmp_path):
+    """A state dir with a one-problem python pack and one submission to grade."""
+    state_dir = str(tmp_path / "state")
+    pack_dir = os.path.join(state_dir, "packs", "python")
+    os.makedirs(pack_dir)
+    with open(os.path.join(pack_dir, "pack.json"), "w") as f:
+        json.dump({"name": "python", "image": "drb-python", "problems": ["add"]}, f)
+    with open(os.path.join(pack_dir, "add.json"), "w") as f:
+        json.dump({"id": "add", "test_code": "tests"}, f)
+    subs = tmp_path / "subs"
+    subs.mkdir()
+    (subs / "add.py").write_text("def add(a, b): return a + b")
+    real_isdir = os.path.isdir
+
+    def fake_isdir(path):
+        if "drb" in path and path.endswith("packs") and "state" not in path:
+            return False
+        return real_isdir(path)
+
+    return state_dir, str(subs), fake_isdir
+
+
+def test_grade_writes_report(tmp_path, capsys):
+    state_dir, subs, fake_isdir = grade_env(tmp_path)
+    report = str(tmp_path / "report.json")
+    with patch("drb.cli.DEFAULT_STATE_DIR", state_dir), \
+         patch("drb.cli.os.path.isdir", side_effect=fake_isdir), \
+         patch("drb.container.ensure_image") as mock_ensure, \
+         patch("drb.grade.run_tests", return_value={"passed": True, "output": "ok"}):
+        main(["grade", subs, "--pack", "python", "--no-pool", "--output", report])
+
+    mock_ensure.assert_called_once()
+    out = capsys.readouterr().out
+    assert "PASS  add" in out
+    assert "1/1 passed" in out
+    with open(report) as f:
+        assert json.load(f)[0]["problem"] == "add"
+
+
+def test_grade_uses_each_pool_container_once(tmp_path, capsys):
+    state_dir, subs, fake_isdir = grade_env(tmp_path)
+    with patch("drb.cli.DEFAULT_STATE_DIR", state_dir), \
+         patch("drb.cli.os.path.isdir", side_effect=fake_isdir), \
+         patch("drb.container.ensure_image"), \
+         patch("drb.runner.pack_run_options", return_value={"resource_flags": ()}), \
+         patch("drb.pool.create_pool") as mock_pool, \
+         patch("drb.grade.run_tests", return_value={"passed": True, "output": "ok"}):
+        main(["grade", subs, "--pack", "python", "--workers", "3"])
+
+    config = mock_pool.call_args[0][0]
+    assert (config["pool_size"], config["pool_max_runs"]) == (1, 1)
+    mock_pool.return_value.shutdown.assert_called_once()
+
+
+@pytest.mark.parametrize("workers", ["0", "-2", "many"])
+def test_grade_rejects_bad_workers(tmp_path, capsys, workers):
+    with pytest.raises(SystemExit) as exc:
+        main(["grade", str(tmp_path), "--workers", workers])
+    assert exc.value.code == 2
+    assert "expected a positive integer" in capsys.readouterr().err
+
+
+def test_packs_verify_exits_nonzero_on_failure(tmp_path, capsys):
+    state_dir = str(tmp_path / "state")
+    pack_dir = os.path.join(state_dir, "packs", "alpha")
+    os.makedirs(pack_dir)
+    with open(os.path.join(pack_dir, "pack.json"), "w") as f:
+        json.dump({"name": "alpha", "image": "drb-alpha", "problems": ["one"]}, f)
+    with open(os.path.join(pack_dir, "one.json"), "w") as f:
+        json.dump({"id": "one", "skeleton": "s", "reference_solution": "r",
+                   "test_code": "t"}, f)
+    real_isdir = os.path.isdir
+
+    def fake_isdir(path):
+        if "drb" in path and path.endswith("packs") and "state" not in path:
+            return False
+        return real_isdir(path)
+
+    with patch("drb.cli.DEFAULT_STATE_DIR", state_dir), \
+         patch("drb.cli.os.path.isdir", side_effect=fake_isdir), \
+         patch("drb.container.ensure_image"), \
+         patch("drb.verify.run_tests", return_value={"passed": False, "output": "boom"}):
+        with pytest.raises(SystemExit) as exc:
+            main(["packs", "verify", "alpha"])
+
+    assert exc.value.code == 1
+    out = capsys.readouterr().out
+    assert "FAIL alpha/one" in out
+    assert "reference solution fails its tests" in out
+    assert "0/1 problems verified" in out
+
+
+def test_packs_prune_caches_removes_pack_volumes(tmp_path, capsys):
+    state_dir = str(tmp_path / "state")
+    pack_dir = os.path.join(state_dir, "packs", "go")
+    os.makedirs(pack_dir)
+    with open(os.path.join(pack_dir, "pack.json"), "w") as f:
+        json.dump({"name": "go", "image": "drb-go", "problems": [],
+                   "caches": [{"name": "go-build", "path": "/cache/go-build"}]}, f)
+    real_isdir = os.path.isdir
+
+    def fake_isdir(path):
+        if "drb" in path and path.endswith("packs") and "state" not in path:
+            return False
+        return real_isdir(path)
+
+    with patch("drb.cli.DEFAULT_STATE_DIR", state_dir), \
+         patch("drb.cli.os.path.isdir", side_effect=fake_isdir), \
+         patch("drb.container.list_cache_volumes",
+               return_value=["drb-cache-drb-go_abc_go-build", "drb-cache-drb-x_y_z"]), \
+         patch("drb.container.remove_cache_volumes",
+               side_effect=lambda engine, names: list(names)) as mock_remove:
+        main(["packs", "prune-caches", "go"])
+
+    mock_remove.assert_called_once_with("docker", ["drb-cache-drb-go_abc_go-build"])
+    assert "Removed 1 build cache(s)." in capsys.readouterr().out
+
+
+def test_packs_prune_caches_native_uses_state_dir(tmp_path, capsys):
+    state_dir = tmp_path / "state"
+    pack_dir = state_dir / "packs" / "go"
+    pack_dir.mkdir(parents=True)
+    (pack_dir / "pack.json").write_text(json.dumps({
+        "name": "go", "image": "drb-go", "problems": [],
+        "caches": [{"name": "go-build", "path": "/cache/go-build"}]}))
+    (state_dir / "config.json").write_text(json.dumps({"engine": "native"}))
+    (state_dir / "cache" / "go" / "go-build").mkdir(parents=True)
+    real_isdir = os.path.isdir
+
+    def fake_isdir(path):
+        if "drb" in path and path.endswith("packs") and "state" not in path:
+            return False
+        return real_isdir(path)
+
+    with patch("drb.cli.DEFAULT_STATE_DIR", str(state_dir)), \
+         patch("drb.cli.os.path.isdir", side_effect=fake_isdir):
+        main(["packs", "prune-caches", "go"])
+
+    assert not (state_dir / "cache" / "go" / "go-build").exists()
+    assert "Removed 1 build cache(s)." in capsys.readouterr().out
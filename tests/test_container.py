@@ -1,8 +1,18 @@
 import json
+import os
+import sys
+import time
 import pytest
 import subprocess as subprocess_mod
 from unittest.mock import patch
-from drb.container import detect_engine, ensure_image, run_in_container, load_config, save_config
+from drb.container import (
+    detect_engine, ensure_image, run_in_container, load_config, save_config,
+    remove_container, stream_process, pack_files, resolve_transport,
+    run_with_stdin, with_stats, extract_stats, hide_stats, STATS_MARKER,
+    run_phases, finish_run, cache_volume, cache_flags, list_cache_volumes,
+    trim_cache_volumes, remove_cache_volumes, write_files, content_mtime,
+    reap_orphans, OutputBuffer, configure_output, output_limits,
+)
 
 
 def test_detect_engine_podman_preferred():
@@ -62,11 +72,26 @@ def test_ensure_image_builds_from_dockerfile(tmp_path):
     assert not any("pull" in cmd for cmd in cmds)
 
 
+def streamed(run):
+    """A stream_process stand-in answering with what run(cmd) returns."""
+    def stream(cmd, timeout, on_output, on_timeout=None, input=None):
+        try:
+            result = run(cmd, input=input)
+        except subprocess_mod.TimeoutExpired:
+            if on_timeout is not None:
+                on_timeout()
+            return None, ""
+        output = result.stdout + result.stderr
+        return result.returncode, output.decode() if isinstance(output, bytes) else output
+    return stream
+
+
 def test_run_in_container_passing(tmp_path):
     def mock_run(cmd, **kwargs):
         return type("R", (), {"returncode": 0, "stdout": "1 passed", "stderr": ""})()
 
-    with patch("subprocess.run", side_effect=mock_run):
+    with patch("subprocess.run", side_effect=mock_run), \
+         patch("drb.container.stream_process", side_effect=streamed(mock_run)):
         result = run_in_container("docker", "python:3.12-slim",
                                   "pytest test_solution.py", str(tmp_path), timeout=10)
     assert result["passed"] is True
@@ -77,7 +102,8 @@ def test_run_in_container_failing(tmp_path):
     def mock_run(cmd, **kwargs):
         return type("R", (), {"returncode": 1, "stdout": "FAILED", "stderr": ""})()
 
-    with patch("subprocess.run", side_effect=mock_run):
+    with patch("subprocess.run", side_effect=mock_run), \
+         patch("drb.container.stream_process", side_effect=streamed(mock_run)):
         result = run_in_container("docker", "python:3.12-slim",
                                   "pytest test_solution.py", str(tmp_path), timeout=10)
     assert result["passed"] is False
@@ -87,7 +113,8 @@ def test_run_in_container_timeout(tmp_path):
     def mock_run(cmd, **kwargs):
         raise subprocess_mod.TimeoutExpired(cmd=cmd, timeout=2)
 
-    with patch("subprocess.run", side_effect=mock_run):
+    with patch("subprocess.run", side_effect=mock_run), \
+         patch("drb.container.stream_process", side_effect=streamed(mock_run)):
         result = run_in_container("docker", "python:3.12-slim",
                                   "pytest test_solution.py", str(tmp_path), timeout=2)
     assert result["passed"] is False
@@ -100,7 +127,8 @@ def test_run_in_container_command_structure(tmp_path):
         captured_cmd.extend(cmd)
         return type("R", (), {"returncode": 0, "stdout": "", "stderr": ""})()
 
-    with patch("subprocess.run", side_effect=mock_run):
+    with patch("subprocess.run", side_effect=mock_run), \
+         patch("drb.container.stream_process", side_effect=streamed(mock_run)):
         run_in_container("docker", "python:3.12-slim",
                          "pytest test_solution.py", str(tmp_path), timeout=10)
 
@@ -121,3 +149,490 @@ def test_load_config_missing(tmp_path):
     config_path = str(tmp_path / "config.json")
     config = load_config(config_path)
     assert config == {}
+
+
+def test_run_in_container_named(tmp_path):
+    captured_cmd = []
+    def mock_run(cmd, **kwargs):
+        captured_cmd.extend(cmd)
+        return type("R", (), {"returncode": 0, "stdout": "", "stderr": ""})()
+
+    with patch("subprocess.run", side_effect=mock_run), \
+         patch("drb.container.stream_process", side_effect=streamed(mock_run)):
+        run_in_container("docker", "python:3.12-slim",
+                         "pytest test_solution.py", str(tmp_path), timeout=10,
+                         name="drb-run-abc")
+
+    assert captured_cmd[captured_cmd.index("--name") + 1] == "drb-run-abc"
+
+
+def test_run_in_container_names_and_labels_every_run(tmp_path):
+    cmds = []
+
+    def mock_run(cmd, **kwargs):
+        cmds.append(cmd)
+        return type("R", (), {"returncode": 0, "stdout": "", "stderr": ""})()
+
+    with patch("subprocess.run", side_effect=mock_run), \
+         patch("drb.container.stream_process", side_effect=streamed(mock_run)):
+        for _ in range(2):
+            run_in_container("docker", "img", "pytest", str(tmp_path), timeout=10)
+    names = [cmd[cmd.index("--name") + 1] for cmd in cmds]
+    assert names[0].startswith(f"drb-run-{os.getpid()}-") and names[0] != names[1]
+    label = next(flag for flag in cmds[0] if flag.startswith("--label=drb.run="))
+    assert 0 < int(label.rpartition("=")[2]) - time.time() <= 10 + 30
+
+
+def test_run_in_container_timeout_removes_container(tmp_path):
+    cmds = []
+
+    def mock_run(cmd, **kwargs):
+        cmds.append(cmd)
+        if cmd[1] == "run":
+            raise subprocess_mod.TimeoutExpired(cmd=cmd, timeout=2)
+
+    with patch("subprocess.run", side_effect=mock_run), \
+         patch("drb.container.stream_process", side_effect=streamed(mock_run)):
+        result = run_in_container("docker", "img", "pytest", str(tmp_path),
+                                  timeout=2, name="drb-run-t")
+    assert result["passed"] is False
+    assert cmds[-1] == ["docker", "rm", "-f", "drb-run-t"]
+
+
+def test_run_with_stdin_interrupt_removes_container():
+    cmds = []
+
+    def mock_run(cmd, **kwargs):
+        cmds.append(cmd)
+        if cmd[1] == "run":
+            raise KeyboardInterrupt
+
+    with patch("subprocess.run", side_effect=mock_run), \
+         patch("drb.container.stream_process", side_effect=streamed(mock_run)):
+        with pytest.raises(KeyboardInterrupt):
+            run_with_stdin("podman", "img", "pytest", {"a.py": ""}, name="drb-run-i")
+    assert cmds[-1] == ["podman", "rm", "-f", "drb-run-i"]
+
+
+def test_reap_orphans_removes_overdue_runs_and_ownerless_pools():
+    cmds = []
+    inspected = "\n".join([
+        f"/drb-run-overdue\t{int(time.time()) - 1}\t",
+        f"/drb-run-busy\t{int(time.time()) + 60}\t",
+        "/drb-pool-orphan\t\t999999999",
+        f"/drb-pool-live\t\t{os.getpid()}",
+        "/drb-other\t\t",
+    ])
+
+    def mock_run(cmd, **kwargs):
+        cmds.append(cmd)
+        stdout = {"ps": "a\nb\nc\nd\ne\n", "inspect": inspected}.get(cmd[1], "")
+        return subprocess_mod.CompletedProcess(cmd, 0, stdout, "")
+
+    with patch("subprocess.run", side_effect=mock_run):
+        assert reap_orphans("docker") == ["drb-run-overdue", "drb-pool-orphan"]
+    assert "label=" not in " ".join(cmds[0]) and "name=drb-" in cmds[0]
+    assert cmds[1][-5:] == ["a", "b", "c", "d", "e"]
+    assert cmds[2:] == [["docker", "rm", "-f", "drb-run-overdue"],
+                        ["docker", "rm", "-f", "drb-pool-orphan"]]
+
+
+def test_reap_orphans_without_containers():
+    with patch("subprocess.run") as mock_run:
+        mock_run.return_value.stdout = ""
+        assert reap_orphans("podman") == []
+    assert mock_run.call_count == 1
+
+
+def test_remove_container():
+    with patch("subprocess.run") as mock_run:
+        remove_container("podman", "drb-run-abc")
+    assert mock_run.call_args[0][0] == ["podman", "rm", "-f", "drb-run-abc"]
+
+
+GO_CACHES = [{"name": "go-build", "path": "/cache/go-build", "max_mb": 1}]
+
+
+def test_cache_volume_names_and_flags():
+    assert cache_volume("ghcr.io/x/drb-go:1.2", "sha256:0123456789abcdef", GO_CACHES[0]) == \
+        "drb-cache-ghcr.io-x-drb-go-1.2_0123456789ab_go-build"
+    caches = [dict(GO_CACHES[0], env="GOCACHE")]
+    with patch("drb.container.resolve_image_id", return_value="sha256:0123456789abcdef"):
+        assert cache_flags("docker", "drb-go", caches) == (
+            "--volume=drb-cache-drb-go_0123456789ab_go-build:/cache/go-build",
+            "--env=GOCACHE=/cache/go-build",
+        )
+        assert cache_flags("docker", "drb-python", None) == ()
+
+
+def test_cache_flags_without_image_id():
+    with patch("drb.container.resolve_image_id", return_value=None):
+        assert cache_flags("docker", "drb-go", GO_CACHES) == ()
+
+
+def test_private_cache_flags_never_mount_writable_volumes():
+    caches = [dict(GO_CACHES[0], env="GOCACHE", read_only_ok=True),
+              {"name": "jest", "path": "/cache/jest", "max_mb": 128}]
+    with patch("drb.container.resolve_image_id", return_value="sha256:0123456789abcdef"), \
+         patch("drb.container.list_cache_volumes",
+               return_value=["drb-cache-drb-go_0123456789ab_go-build"]):
+        assert cache_flags("docker", "drb-go", caches, private=True) == (
+            "--volume=drb-cache-drb-go_0123456789ab_go-build:/cache/go-build:ro",
+            "--env=GOCACHE=/cache/go-build",
+            "--tmpfs=/cache/jest:size=128m",
+        )
+    with patch("drb.container.resolve_image_id", return_value=None):
+        assert cache_flags("docker", "drb-go", caches, private=True) == (
+            "--tmpfs=/cache/go-build:size=1m",
+            "--env=GOCACHE=/cache/go-build",
+            "--tmpfs=/cache/jest:size=128m",
+        )
+
+
+def test_private_cache_flags_keep_cold_read_only_caches_private():
+    caches = [dict(GO_CACHES[0], env="GOCACHE", read_only_ok=True)]
+    with patch("drb.container.resolve_image_id", return_value="sha256:0123456789abcdef"), \
+         patch("drb.container.list_cache_volumes", return_value=[]):
+        assert cache_flags("docker", "drb-go", caches, private=True) == (
+            "--tmpfs=/cache/go-build:size=1m",
+            "--env=GOCACHE=/cache/go-build",
+        )
+
+
+def test_list_cache_volumes():
+    with patch("subprocess.run") as mock_run:
+        mock_run.return_value.stdout = "drb-cache-drb-go_abc_go-build\nother\n"
+        assert list_cache_volumes("docker") == ["drb-cache-drb-go_abc_go-build"]
+    assert "name=drb-cache-" in mock_run.call_args[0][0]
+
+
+def test_trim_cache_volumes_empties_oversized():
+    calls = []
+
+    def mock_run(cmd, **kwargs):
+        calls.append(cmd)
+        stdout = "drb-cache-drb-go_0123456789ab_go-build\n" if cmd[1] == "volume" else "0\n"
+        return subprocess_mod.CompletedProcess(cmd, 0, stdout, "")
+
+    with patch("drb.container.resolve_image_id", return_value="sha256:0123456789abcdef"), \
+         patch("subprocess.run", side_effect=mock_run):
+        assert trim_cache_volumes("docker", "drb-go", GO_CACHES) == \
+            ["drb-cache-drb-go_0123456789ab_go-build"]
+    cmd = calls[1]
+    assert "--volume=drb-cache-drb-go_0123456789ab_go-build:/drb-cache-0" in cmd
+    assert cmd[cmd.index("drb-go") + 1:cmd.index("drb-go") + 3] == ["sh", "-c"]
+    assert "-gt 1024 ]" in cmd[-1] and "find /drb-cache-0 -mindepth 1 -delete" in cmd[-1]
+    assert calls[2:] == [["docker", "volume", "rm", "drb-cache-drb-go_0123456789ab_go-build"]]
+
+
+def test_trim_cache_volumes_drops_earlier_builds():
+    calls = []
+
+    def mock_run(cmd, **kwargs):
+        calls.append(cmd)
+        stdout = ("drb-cache-drb-go_000000000000_go-build\ndrb-cache-drb-gopher_1_x\n"
+                  if cmd[1:3] == ["volume", "ls"] else "")
+        return subprocess_mod.CompletedProcess(cmd, 0, stdout, "")
+
+    with patch("drb.container.resolve_image_id", return_value="sha256:0123456789abcdef"), \
+         patch("subprocess.run", side_effect=mock_run):
+        assert trim_cache_volumes("docker", "drb-go", GO_CACHES) == \
+            ["drb-cache-drb-go_000000000000_go-build"]
+    assert calls[1:] == [["docker", "volume", "rm", "drb-cache-drb-go_000000000000_go-build"]]
+
+
+def test_trim_cache_volumes_skips_missing_volumes():
+    with patch("drb.container.resolve_image_id", return_value="sha256:0123456789abcdef"), \
+         patch("subprocess.run") as mock_run:
+        mock_run.return_value.stdout = ""
+        assert trim_cache_volumes("docker", "drb-go", GO_CACHES) == []
+    assert mock_run.call_count == 1  # no container started for volumes that do not exist
+
+
+def test_remove_cache_volumes_keeps_busy_ones():
+    def mock_run(cmd, **kwargs):
+        return subprocess_mod.CompletedProcess(cmd, 1 if cmd[-1] == "busy" else 0, "", "")
+
+    with patch("subprocess.run", side_effect=mock_run):
+        assert remove_cache_volumes("podman", ["idle", "busy"]) == ["idle"]
+
+
+def test_stream_process_merges_lines_in_order():
+    lines = []
+    returncode, output = stream_process(
+        ["sh", "-c", "echo one; echo two >&2; echo three; exit 3"], 5, lines.append,
+    )
+    assert lines == ["one\n", "two\n", "three\n"]
+    assert output == "one\ntwo\nthree\n"
+    assert returncode == 3
+
+
+def test_stream_process_timeout():
+    lines = []
+    killed = []
+    returncode, output = stream_process(
+        ["sh", "-c", "echo started; exec sleep 5"], 0.3, lines.append,
+        on_timeout=lambda: killed.append(True),
+    )
+    assert returncode is None
+    assert lines == ["started\n"]
+    assert killed == [True]
+
+
+def test_stream_process_keeps_head_and_tail():
+    lines = []
+    with patch("drb.container._output_limits", [100, 200]):
+        returncode, output = stream_process(
+            ["sh", "-c", "i=0; while [ $i -lt 5000 ]; do echo line $i; i=$((i+1)); done"],
+            10, lines.append,
+        )
+    assert returncode == 0
+    assert len(lines) == 5000  # on_output still sees every line
+    head, notice, tail = output.partition("\n[drb: ")
+    assert len(head) == 100 and head.startswith("line 0\n")
+    assert tail.endswith("line 4999\n")
+    total = sum(len(line) for line in lines)
+    assert notice and f"{total - 300} bytes of output dropped]" in tail
+
+
+def test_stream_process_splits_endless_lines():
+    lines = []
+    returncode, output = stream_process(
+        [sys.executable, "-c", "print('x' * 200000, end='')"], 10, lines.append,
+    )
+    assert "".join(lines) == "x" * 200000
+    assert len(lines) > 1
+
+
+def test_output_buffer_counts_dropped_bytes():
+    buffer = OutputBuffer(head=4, tail=6)
+    for chunk in (b"abc", b"defghij", b"klm\r\n", b"nop"):
+        buffer.write(chunk)
+    assert buffer.dropped == 8
+    assert buffer.getvalue() == "abcd\n[drb: 8 bytes of output dropped]\nm\nnop"
+    small = OutputBuffer(head=4, tail=6)
+    small.write(b"tiny")
+    assert small.getvalue() == "tiny" and small.dropped == 0
+
+
+def test_finish_run_reports_dropped_bytes():
+    buffer = OutputBuffer(head=2, tail=2)
+    buffer.write(b"1234567")
+    result = finish_run(0, buffer.getvalue(), 0.0)
+    assert result["dropped_bytes"] == 3
+    assert "dropped_bytes" not in finish_run(0, "all there", 0.0)
+
+
+def test_configure_output():
+    saved = output_limits()
+    try:
+        configure_output({"output_head_kb": 1, "output_tail_kb": 0.5})
+        assert output_limits() == (1024, 512)
+        assert OutputBuffer().head_size == 1024
+        configure_output({})
+        assert output_limits() == (64 * 1024, 64 * 1024)
+    finally:
+        configure_output({"output_head_kb": saved[0] / 1024, "output_tail_kb": saved[1] / 1024})
+
+
+def test_run_in_container_streaming(tmp_path):
+    seen = []
+    def fake_stream(cmd, timeout, on_output, on_timeout=None):
+        on_output("collected 1 item\n")
+        return 0, "collected 1 item\n1 passed\n"
+
+    with patch("drb.container.stream_process", side_effect=fake_stream):
+        result = run_in_container("docker", "python:3.12-slim",
+                                  "pytest test_solution.py", str(tmp_path),
+                                  timeout=10, on_output=seen.append)
+    assert seen == ["collected 1 item\n"]
+    assert result == {"passed": True, "output": "collected 1 item\n1 passed"}
+
+
+def test_run_in_container_streaming_timeout_kills_named_container(tmp_path):
+    def fake_stream(cmd, timeout, on_output, on_timeout=None):
+        on_timeout()
+        return None, "partial\n"
+
+    with patch("drb.container.stream_process", side_effect=fake_stream), \
+         patch("subprocess.run") as mock_run:
+        result = run_in_container("docker", "img", "pytest", str(tmp_path),
+                                  timeout=2, name="drb-run-x", on_output=lambda l: None)
+    assert result["passed"] is False
+    assert result["output"].startswith("partial")
+    assert "timeout" in result["output"].lower()
+    assert mock_run.call_args[0][0] == ["docker", "rm", "-f", "drb-run-x"]
+
+
+def test_resolve_image_id_is_memoized():
+    from drb import container
+
+    container._image_ids.clear()
+    with patch("subprocess.run") as mock_run:
+        mock_run.return_value = type("R", (), {"returncode": 0, "stdout": "sha256:abc\n", "stderr": ""})()
+        assert container.resolve_image_id("docker", "drb-python") == "sha256:abc"
+        assert container.resolve_image_id("docker", "drb-python") == "sha256:abc"
+    assert mock_run.call_count == 1
+    container._image_ids.clear()
+
+
+def test_resolve_image_id_missing_image():
+    from drb import container
+
+    container._image_ids.clear()
+    with patch("subprocess.run") as mock_run:
+        mock_run.return_value = type("R", (), {"returncode": 1, "stdout": "", "stderr": "no such image"})()
+        assert container.resolve_image_id("docker", "drb-python") is None
+    assert container._image_ids == {}
+
+
+def test_pack_files_round_trips():
+    import io
+    import tarfile
+    data = pack_files({"solution.py": "x = 1", "test_solution.py": "y = 2"})
+    with tarfile.open(fileobj=io.BytesIO(data)) as tar:
+        assert sorted(tar.getnames()) == ["solution.py", "test_solution.py"]
+        assert tar.extractfile("solution.py").read() == b"x = 1"
+        assert tar.getmember("solution.py").mtime == content_mtime(b"x = 1")
+
+
+def test_write_files_stamps_content_mtime(tmp_path):
+    write_files(str(tmp_path), {"solution.py": "x = 1"})
+    path = tmp_path / "solution.py"
+    assert path.read_text() == "x = 1"
+    assert path.stat().st_mtime == content_mtime(b"x = 1")
+    assert content_mtime(b"x = 1") != content_mtime(b"x = 2")
+
+
+def test_resolve_transport():
+    assert resolve_transport({}, "docker") == "mount"
+    assert resolve_transport({"transport": "stdin"}, "docker") == "stdin"
+    per_engine = {"transport": {"podman": "stdin"}}
+    assert resolve_transport(per_engine, "podman") == "stdin"
+    assert resolve_transport(per_engine, "docker") == "mount"
+    with pytest.raises(ValueError, match="Unknown transport"):
+        resolve_transport({"transport": "carrier-pigeon"}, "docker")
+
+
+def test_run_with_stdin_pipes_tar_without_mount():
+    with patch("subprocess.run") as mock_run, \
+         patch("drb.container.stream_process", side_effect=streamed(mock_run)):
+        mock_run.return_value = type("R", (), {"returncode": 0, "stdout": b"1 passed", "stderr": b""})()
+        result = run_with_stdin("podman", "drb-python", "pytest -q",
+                                {"solution.py": "x = 1"}, timeout=5)
+    assert result == {"passed": True, "output": "1 passed"}
+    cmd = mock_run.call_args[0][0]
+    assert "-i" in cmd and "-v" not in cmd
+    assert "--tmpfs" in cmd
+    assert cmd[-1].startswith("tar -xf - && ")
+    assert "sh -c 'pytest -q'" in cmd[-1]
+    assert mock_run.call_args[1]["input"] == pack_files({"solution.py": "x = 1"})
+
+
+def test_run_with_stdin_streaming(tmp_path):
+    script = "import sys, tarfile; t = tarfile.open(fileobj=sys.stdin.buffer, mode='r|'); print(*[m.name for m in t])"
+    with patch("drb.container.RESOURCE_FLAGS", ()):
+        real_popen = subprocess_mod.Popen
+        with patch("subprocess.Popen", side_effect=lambda cmd, **kw: real_popen(
+                [sys.executable, "-c", script], **kw)):
+            lines = []
+            result = run_with_stdin("docker", "img", "true", {"a.py": "1", "b.py": "2"},
+                                    timeout=5, on_output=lines.append)
+    assert result == {"passed": True, "output": "a.py b.py"}
+    assert lines == ["a.py b.py\n"]
+
+
+def test_with_stats_reports_cpu_and_exit_code():
+    script = with_stats("echo hello; i=0; while [ $i -lt 20000 ]; do i=$((i+1)); done; exit 3")
+    result = subprocess_mod.run(["sh", "-c", script], capture_output=True, text=True, timeout=30)
+    assert result.returncode == 3
+    output, resources = extract_stats(result.stdout, wall_ms=12)
+    assert output.strip() == "hello"
+    assert resources["wall_ms"] == 12
+    assert resources["cpu_ms"] is not None
+
+
+def test_extract_stats_parses_cgroup_values():
+    output = (
+        "1 passed\n\n"
+        f"{STATS_MARKER} oom_before=0 oom_after=1 peak=251658240 limit=268435456\n"
+        "0m0.01s 0m0.00s\n0m1.20s 0m0.10s\n"
+    )
+    output, resources = extract_stats(output, wall_ms=1500)
+    assert output.strip() == "1 passed"
+    assert resources == {
+        "wall_ms": 1500,
+        "cpu_ms": 1300,
+        "peak_memory_bytes": 251658240,
+        "memory_limit_bytes": 268435456,
+        "oom_killed": True,
+    }
+
+
+def test_extract_stats_unknown_values():
+    output = f"{STATS_MARKER} oom_before= oom_after= peak= limit=max\n"
+    _, resources = extract_stats(output, wall_ms=5)
+    assert resources["peak_memory_bytes"] is None
+    assert resources["memory_limit_bytes"] is None
+    assert resources["oom_killed"] is None
+    assert resources["cpu_ms"] is None
+    assert extract_stats("no stats here", 5) == ("no stats here", None)
+
+
+def test_with_stats_records_timestamps():
+    result = subprocess_mod.run(["sh", "-c", with_stats("true")],
+                                capture_output=True, text=True, timeout=30)
+    marker = next(line for line in result.stdout.splitlines() if line.startswith(STATS_MARKER))
+    fields = dict(part.split("=", 1) for part in marker.split()[1:])
+    assert int(fields["started"]) <= int(fields["ended"])
+
+
+def test_run_phases_splits_wall_time():
+    offset = 1_000_000.0
+    with patch("drb.container.time.time", return_value=offset + 10.0), \
+         patch("drb.container.time.monotonic", return_value=10.0):
+        phases = run_phases({"started": str(int((offset + 2.1) * 1e9)),
+                             "ended": str(int((offset + 2.4) * 1e9))},
+                            started=2.0, finished=2.45)
+    assert phases == {"start": 100, "test": 300, "teardown": 50}
+    assert run_phases({"started": "", "ended": ""}, 0, 1) is None
+
+
+def test_finish_run_flags_abnormal_exits():
+    assert finish_run(125, "Error: no such image", 0.0)["exit_code"] == 125
+    assert finish_run(137, "", 0.0)["exit_code"] == 137
+    assert finish_run(-9, "", 0.0)["exit_code"] == -9
+    assert "exit_code" not in finish_run(1, "1 failed", 0.0)
+    assert "exit_code" not in finish_run(None, "", 0.0)
+
+
+def test_finish_run_without_timestamps_has_no_phases():
+    output = f"ok\n{STATS_MARKER} oom_before= oom_after= peak= limit=\n"
+    result = finish_run(0, output, started=0)
+    assert result["output"] == "ok"
+    assert "resources" in result
+    assert "phases" not in result
+
+
+def test_hide_stats_drops_stats_block():
+    lines = []
+    forward = hide_stats(lines.append)
+    for line in ["a\n", f"{STATS_MARKER} oom_before=0\n", "0m0s 0m0s\n"]:
+        forward(line)
+    assert lines == ["a\n"]
+
+
+def test_run_in_container_attaches_resources(tmp_path):
+    stats = f"\n{STATS_MARKER} oom_before=0 oom_after=0 peak=1048576 limit=268435456\n0m0s 0m0s\n0m0.5s 0m0s\n"
+
+    def mock_run(cmd, **kwargs):
+        assert STATS_MARKER in cmd[-1]
+        return type("R", (), {"returncode": 0, "stdout": "1 passed" + stats, "stderr": ""})()
+
+    with patch("subprocess.run", side_effect=mock_run), \
+         patch("drb.container.stream_process", side_effect=streamed(mock_run)):
+        result = run_in_container("docker", "img", "pytest", str(tmp_path))
+    assert result["output"] == "1 passed"
+    assert result["resources"]["cpu_ms"] == 500
+    assert result["resources"]["peak_memory_bytes"] == 1048576
+    assert result["resources"]["oom_killed"] is False
@@ -4,6 +4,7 @@ import socket
 import threading
 import time
 import pytest
+from unittest.mock import patch
 from drb.daemon import DaemonServer
 
 
@@ -83,3 +84,53 @@ def test_pidfile_created(daemon_dir):
         assert os.path.isfile(os.path.join(daemon_dir, "daemon.pid"))
     finally:
         server.shutdown()
+
+
+def test_image_commands(daemon_dir):
+    server = DaemonServer(daemon_dir, headless=True)
+
+    class FakeRegistry:
+        def build_async(self, image, dockerfile_dir=None):
+            return {"image": image, "state": "building", "progress": []}
+
+        def status(self, image, dockerfile_dir=None):
+            return {"image": image, "state": "ready", "id": "sha256:1"}
+
+    server._images = FakeRegistry()
+    t = threading.Thread(target=server.serve_forever, daemon=True)
+    t.start()
+    time.sleep(0.2)
+
+    try:
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        client.connect(server.sock_path)
+        client.sendall(json.dumps({"command": "build_image", "image": "drb-python"}).encode() + b"\n")
+        resp = json.loads(client.recv(4096).decode())
+        client.close()
+        assert resp["status"] == "ok"
+        assert resp["state"] == "building"
+
+        assert server._handle_command("image_status", {"image": "drb-python"})["id"] == "sha256:1"
+        assert server._handle_command("image_status", {})["status"] == "error"
+    finally:
+        server.shutdown()
+
+
+def test_reaper_sweeps_until_shutdown(daemon_dir):
+    with open(os.path.join(daemon_dir, "config.json"), "w") as f:
+        json.dump({"engine": "podman", "reap_interval": 0.05}, f)
+    server = DaemonServer(daemon_dir, headless=True)
+    swept = threading.Semaphore(0)
+    with patch("drb.container.reap_orphans", side_effect=lambda engine: swept.release()) as mock_reap:
+        thread = server.start_reaper()
+        assert swept.acquire(timeout=5) and swept.acquire(timeout=5)
+        server.shutdown()
+        thread.join(timeout=5)
+    assert not thread.is_alive()
+    mock_reap.assert_called_with("podman")
+
+
+def test_reaper_off(daemon_dir):
+    with open(os.path.join(daemon_dir, "config.json"), "w") as f:
+        json.dump({"reap_interval": 0}, f)
+    assert DaemonServer(daemon_dir, headless=True).start_reaper() is None
@@ -0,0 +1,298 @@
+import io
+import json
+import os
+import re
+import shutil
+import socketserver
+import struct
+import tarfile
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+from unittest.mock import patch
+
+import pytest
+
+from drb import engine_api
+from drb.container import (
+    STATS_MARKER, image_size, remove_container, resolve_image_id, run_in_container,
+    run_with_stdin,
+)
+from drb.engine_api import EngineAPIError, EngineClient, configure
+
+STATS = f"\n{STATS_MARKER} oom_before=0 oom_after=0 peak=1048576 limit=268435456\n" \
+        "0m0.00s 0m0.00s\n0m0.20s 0m0.05s\n"
+
+
+class FakeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def _reply(self, status, body=None, content_type="application/json"):
+        data = b"" if body is None else (
+            body if isinstance(body, bytes) else json.dumps(body).encode())
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self):
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def _route(self, method):
+        fake = self.server.fake
+        path, _, query = self.path.partition("?")
+        assert path.startswith("/v1.41/")
+        path = path[len("/v1.41"):]
+        fake.requests.append((method, path, query))
+        body = self._body()
+        if path == "/_ping":
+            return self._reply(200, b"OK", "text/plain")
+        match = re.fullmatch(r"/images/(.+)/json", path)
+        if match:
+            if match.group(1) not in fake.images:
+                return self._reply(404, {"message": "No such image"})
+            return self._reply(200, fake.images[match.group(1)])
+        if path == "/containers/create":
+            spec = json.loads(body)
+            if spec["Image"] not in fake.images:
+                return self._reply(404, {"message": "No such image"})
+            cid = f"c{len(fake.containers) + 1}"
+            fake.containers[cid] = {"spec": spec, "query": query, "files": {}}
+            fake.created.append(fake.containers[cid])
+            return self._reply(201, {"Id": cid})
+        match = re.fullmatch(r"/containers/(\w+)(/\w+)?", path)
+        cid, action = match.group(1), match.group(2)
+        if cid not in fake.containers:
+            return self._reply(404, {"message": "No such container"})
+        container = fake.containers[cid]
+        if action == "/archive":
+            with tarfile.open(fileobj=io.BytesIO(body)) as tar:
+                for member in tar.getmembers():
+                    container["files"][member.name] = tar.extractfile(member).read().decode()
+            return self._reply(200)
+        if action == "/start":
+            return self._reply(204)
+        if action == "/logs":
+            return self._logs(container)
+        if action == "/wait":
+            return self._reply(200, {"StatusCode": fake.exit_code})
+        if action is None and method == "DELETE":
+            del fake.containers[cid]
+            fake.removed.append(cid)
+            return self._reply(204)
+        return self._reply(404, {"message": "unexpected"})
+
+    def _logs(self, container):
+        fake = self.server.fake
+        self.send_response(200)
+        self.send_header("Content-Type", "application/vnd.docker.raw-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for text in fake.output:
+            data = text.encode()
+            frame = struct.pack(">BxxxL", 1, len(data)) + data
+            self.wfile.write(f"{len(frame):x}\r\n".encode() + frame + b"\r\n")
+            self.wfile.flush()
+        time.sleep(fake.hang)
+        self.wfile.write(b"0\r\n\r\n")
+
+    def do_GET(self):
+        self._route("GET")
+
+    def do_POST(self):
+        self._route("POST")
+
+    def do_PUT(self):
+        self._route("PUT")
+
+    def do_DELETE(self):
+        self._route("DELETE")
+
+
+class FakeEngineAPI(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path):
+        super().__init__(path, FakeHandler)
+        self.fake = self
+        self.connections = 0
+        self.requests = []
+        self.images = {"drb-python": {"Id": "sha256:abc", "Size": 123456}}
+        self.containers = {}
+        self.created = []
+        self.removed = []
+        self.output = ["1 passed\n", STATS]
+        self.exit_code = 0
+        self.hang = 0
+
+
+@pytest.fixture
+def fake_api():
+    tmpdir = tempfile.mkdtemp(prefix="drb-api-")
+    server = FakeEngineAPI(os.path.join(tmpdir, "engine.sock"))
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    client = configure({"engine": "docker", "engine_api": server.server_address})
+    assert client is not None
+    yield server
+    configure({"engine": "docker"})
+    server.shutdown()
+    server.server_close()
+    shutil.rmtree(tmpdir)
+
+
+def wait_removed(server, count=1):
+    deadline = time.monotonic() + 2
+    while len(server.removed) < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_run_in_container_uses_api(fake_api, tmp_path):
+    with patch("subprocess.run") as mock_run, patch("subprocess.Popen") as mock_popen:
+        result = run_in_container("docker", "drb-python", "pytest -q", str(tmp_path),
+                                  timeout=5, name="drb-run-1",
+                                  extra_flags=["--cpuset-cpus=0"])
+    mock_run.assert_not_called()
+    mock_popen.assert_not_called()
+    assert result["passed"] is True
+    assert result["output"] == "1 passed"
+    assert result["resources"]["cpu_ms"] == 250
+    assert result["resources"]["peak_memory_bytes"] == 1048576
+    wait_removed(fake_api)
+    assert fake_api.removed == ["c1"]
+
+
+def test_container_spec(fake_api, tmp_path):
+    run_in_container("docker", "drb-python", "pytest -q", str(tmp_path), timeout=5,
+                     name="drb-run-2", resource_flags=("--memory=512m", "--cpus=0.5",
+                                                       "--pids-limit=64"))
+    created = fake_api.created[0]
+    assert created["query"] == "name=drb-run-2"
+    spec = created["spec"]
+    assert spec["Cmd"][:2] == ["sh", "-c"] and "pytest -q" in spec["Cmd"][2]
+    assert spec["WorkingDir"] == "/work"
+    assert spec["HostConfig"] == {
+        "Memory": 512 * 1024 ** 2, "NanoCpus": 500000000, "PidsLimit": 64,
+        "Binds": [f"{tmp_path}:/work"],
+    }
+    assert int(spec["Labels"]["drb.run"]) > time.time() + 5
+
+
+def test_cache_volumes_become_binds(fake_api, tmp_path):
+    run_in_container("docker", "drb-python", "go test", str(tmp_path), timeout=5,
+                     resource_flags=("--memory=512m", "--volume=drb-cache-drb-go-go-build:/cache"))
+    assert fake_api.created[0]["spec"]["HostConfig"]["Binds"] == [
+        "drb-cache-drb-go-go-build:/cache", f"{tmp_path}:/work"]
+
+
+def test_env_flags_go_to_the_container(fake_api, tmp_path):
+    run_in_container("docker", "drb-python", "pytest -q", str(tmp_path), timeout=5,
+                     resource_flags=("--memory=512m", "--env=PYTHONPYCACHEPREFIX=/cache/pycache"))
+    spec = fake_api.created[0]["spec"]
+    assert spec["Env"] == ["PYTHONPYCACHEPREFIX=/cache/pycache"]
+    assert spec["HostConfig"]["Memory"] == 512 * 1024 * 1024
+
+
+def test_requests_share_one_connection(fake_api, tmp_path):
+    for _ in range(3):
+        run_in_container("docker", "drb-python", "pytest -q", str(tmp_path), timeout=5)
+    wait_removed(fake_api, 3)
+    # One keep-alive connection for short requests plus one per log stream.
+    assert fake_api.connections == 1 + 3
+
+
+def test_run_with_stdin_uploads_archive(fake_api):
+    lines = []
+    fake_api.output = ["line one\nline ", "two\n", STATS]
+    result = run_with_stdin("docker", "drb-python", "pytest -q",
+                            {"solution.py": "x = 1", "test_solution.py": "assert True"},
+                            timeout=5, on_output=lines.append)
+    assert result["output"] == "line one\nline two"
+    assert lines == ["line one\n", "line two\n", "\n"]
+    uploads = [r for r in fake_api.requests if r[1].endswith("/archive")]
+    assert uploads == [("PUT", "/containers/c1/archive", "path=%2Fwork")]
+    assert fake_api.created[0]["files"] == {"solution.py": "x = 1",
+                                            "test_solution.py": "assert True"}
+    assert "Binds" not in fake_api.created[0]["spec"]["HostConfig"]
+
+
+def test_failing_run(fake_api, tmp_path):
+    fake_api.output = ["1 failed\n", STATS]
+    fake_api.exit_code = 1
+    result = run_in_container("docker", "drb-python", "pytest -q", str(tmp_path), timeout=5)
+    assert result["passed"] is False
+    assert result["output"] == "1 failed"
+
+
+def test_timeout_removes_container(fake_api, tmp_path):
+    fake_api.output = ["partial\n"]
+    fake_api.hang = 2
+    result = run_in_container("docker", "drb-python", "sleep 10", str(tmp_path), timeout=0.3)
+    assert result["passed"] is False
+    assert "did not complete within 0.3 seconds" in result["output"]
+    assert result["output"].startswith("partial")
+    wait_removed(fake_api)
+    assert fake_api.removed == ["c1"]
+
+
+def test_missing_image_falls_back_to_cli(fake_api, tmp_path):
+    with patch("drb.container.stream_process", return_value=(0, "ok")) as mock_run:
+        result = run_in_container("docker", "drb-ruby", "ruby t.rb", str(tmp_path), timeout=5)
+    assert mock_run.call_args[0][0][:2] == ["docker", "run"]
+    assert result["passed"] is True
+
+
+def test_unmapped_flag_falls_back_to_cli(fake_api, tmp_path):
+    with patch("drb.container.stream_process", return_value=(0, "ok")) as mock_run:
+        run_in_container("docker", "drb-python", "pytest", str(tmp_path), timeout=5,
+                         extra_flags=["--security-opt=no-new-privileges"])
+    mock_run.assert_called_once()
+    assert not any(r[1] == "/containers/create" for r in fake_api.requests)
+
+
+def test_image_queries_use_api(fake_api):
+    with patch("subprocess.run") as mock_run:
+        assert resolve_image_id("docker", "drb-python", refresh=True) == "sha256:abc"
+        assert resolve_image_id("docker", "drb-missing", refresh=True) is None
+        assert image_size("docker", "drb-python") == 123456
+    mock_run.assert_not_called()
+
+
+def test_remove_container_uses_api(fake_api):
+    fake_api.containers["c9"] = {"spec": {}, "query": "", "files": {}}
+    with patch("subprocess.run") as mock_run:
+        remove_container("docker", "c9")
+        remove_container("docker", "gone")  # 404 is not an error
+    mock_run.assert_not_called()
+    assert fake_api.removed == ["c9"]
+
+
+def test_client_error_status(fake_api):
+    client = EngineClient(fake_api.server_address)
+    with pytest.raises(EngineAPIError) as excinfo:
+        client.inspect_image("nope")
+    assert excinfo.value.status == 404
+
+
+def test_configure_without_socket():
+    assert configure({"engine": "docker", "engine_api": "/nonexistent/engine.sock"}) is None
+    assert engine_api.client_for("docker") is None
+    assert configure({"engine": "docker"}) is None
+
+
+def test_find_socket_prefers_docker_host(tmp_path):
+    sock = tmp_path / "d.sock"
+    sock.touch()
+    with patch.dict(os.environ, {"DOCKER_HOST": f"unix://{sock}"}):
+        assert engine_api.find_socket("docker") == str(sock)
+    with patch.dict(os.environ, {"DOCKER_HOST": "", "CONTAINER_HOST": ""}), \
+         patch("os.path.exists", return_value=False):
+        assert engine_api.find_socket("podman") is None
@@ -0,0 +1,63 @@
+import gzip
+import os
+from unittest.mock import patch
+
+import pytest
+
+from drb.fixtures import add_fixture, fixture_digest, fixture_flags, prepare_fixtures
+
+PACK = {"name": "python", "fixtures": True}
+
+
+@pytest.fixture
+def state_dir(tmp_path):
+    return str(tmp_path / "state")
+
+
+def test_add_fixture_is_content_addressed(tmp_path):
+    source = tmp_path / "nums.txt"
+    source.write_text("1\n2\n3\n")
+    digest = add_fixture(str(tmp_path / "pack"), str(source), ".gz")
+    assert digest == fixture_digest(str(source))
+    stored = tmp_path / "pack" / "fixtures" / f"{digest}.gz"
+    assert gzip.decompress(stored.read_bytes()) == b"1\n2\n3\n"
+    assert add_fixture(str(tmp_path / "pack"), str(source), ".gz") == digest
+    with pytest.raises(ValueError):
+        add_fixture(str(tmp_path / "pack"), str(source), ".zip")
+
+
+def test_prepare_links_expanded_fixture_into_view(tmp_path, state_dir):
+    source = tmp_path / "nums.txt"
+    source.write_bytes(b"x" * 100000)
+    digest = add_fixture(str(tmp_path / "pack"), str(source), ".xz")
+    problem = {"fixtures": {"big.txt": digest}}
+    assert prepare_fixtures(PACK, problem, str(tmp_path / "pack"), state_dir) == ["big.txt"]
+    entry = tmp_path / "state" / "fixtures" / "packs" / "python" / "big.txt"
+    blob = tmp_path / "state" / "fixtures" / "blobs" / digest
+    assert entry.read_bytes() == b"x" * 100000
+    assert os.path.samefile(entry, blob)
+    assert not os.access(blob, os.W_OK) or os.geteuid() == 0
+    # Already in place: nothing is expanded again.
+    with patch("drb.fixtures.lzma.open", side_effect=AssertionError):
+        prepare_fixtures(PACK, problem, str(tmp_path / "pack"), state_dir)
+
+
+def test_prepare_rejects_bad_fixtures(tmp_path, state_dir):
+    (tmp_path / "pack" / "fixtures").mkdir(parents=True)
+    (tmp_path / "pack" / "fixtures" / ("0" * 64)).write_text("not what the name says")
+    pack_dir = str(tmp_path / "pack")
+    with pytest.raises(ValueError):
+        prepare_fixtures(PACK, {"fixtures": {"a.txt": "0" * 64}}, pack_dir, state_dir)
+    with pytest.raises(FileNotFoundError):
+        prepare_fixtures(PACK, {"fixtures": {"a.txt": "1" * 64}}, pack_dir, state_dir)
+    with pytest.raises(ValueError):
+        prepare_fixtures(PACK, {"fixtures": {"../a.txt": "0" * 64}}, pack_dir, state_dir)
+    assert not list((tmp_path / "state" / "fixtures" / "blobs").iterdir())
+
+
+def test_fixture_flags_mount_view_read_only(tmp_path, state_dir):
+    assert fixture_flags({"name": "python"}, state_dir) == ()
+    view = tmp_path / "state" / "fixtures" / "packs" / "python"
+    assert fixture_flags(PACK, state_dir) == (f"--volume={view}:/fixtures:ro",
+                                   "--env=DRB_FIXTURES=/fixtures")
+    assert view.is_dir()
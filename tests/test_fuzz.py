@@ -0,0 +1,127 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+from unittest.mock import patch
+
+import pytest
+
+from drb.fuzz import RESULT_MARKER, generate_cases, parse_results, run_fuzz
+from drb.problems import load_pack, load_problem
+
+PACKS = os.path.join(os.path.dirname(__file__), "..", "packs")
+FUZZED = [(pack, problem) for pack in ("python", "javascript", "ruby")
+          for problem in load_pack(PACKS, pack)["problems"]
+          if "fuzz" in load_problem(PACKS, pack, problem)]
+
+
+def marker(**record):
+    return f"{RESULT_MARKER} {json.dumps(record)}"
+
+
+def test_generate_cases_distinct_and_smallest_first():
+    generator = "def generate(n, rng):\n    return [[rng.randint(0, 9) for _ in range(n)]]\n"
+    cases = generate_cases(generator, count=300, seed=3)
+    encoded = [json.dumps(c) for c in cases]
+    assert len(set(encoded)) == len(cases) == 300
+    assert [len(e) for e in encoded] == sorted(len(e) for e in encoded)
+    assert cases[0] == [[]]
+    assert generate_cases(generator, count=300, seed=3) == cases
+
+
+def test_generate_cases_skips_sizes_the_generator_rejects():
+    generator = "def generate(n, rng):\n    return [rng.sample(range(5), n)]\n"
+    assert all(len(args[0]) <= 5 for args in generate_cases(generator, count=50))
+
+
+def test_parse_results_takes_last_marker():
+    output = "noise\n" + marker(checked=1, skipped=0) + "\n" + marker(checked=5, skipped=2)
+    assert parse_results(output) == {"checked": 5, "skipped": 2}
+    assert parse_results("Traceback ...") == {}
+
+
+def test_run_fuzz_reports_counterexample():
+    pack = load_pack(PACKS, "python")
+    problem = load_problem(PACKS, "python", "maximum_subarray")
+    seen = {}
+
+    def fake_container(engine, image, cmd, work_dir, timeout, **kwargs):
+        seen["files"] = sorted(os.listdir(work_dir))
+        with open(os.path.join(work_dir, "fuzz.json")) as f:
+            seen["spec"] = json.load(f)
+        output = marker(checked=7, skipped=0, index=7,
+                        expected={"value": -1}, actual={"value": 0})
+        return {"passed": True, "output": output}
+
+    with patch("drb.fuzz.run_in_container", side_effect=fake_container):
+        result = run_fuzz("def max_sub_array(nums): return 0", problem, pack,
+                          os.path.join(PACKS, "python"), "docker", "drb-python",
+                          count=100, seed=5)
+    assert seen["files"] == ["fuzz.json", "fuzz.py", "reference.py", "solution.py"]
+    assert seen["spec"]["entry"] == "max_sub_array"
+    assert seen["spec"]["compare"] == "returned"
+    assert len(seen["spec"]["cases"]) == 100
+    assert result["passed"] is False
+    counterexample = result["fuzz"]["counterexample"]
+    assert counterexample["args"] == seen["spec"]["cases"][7]
+    assert "expected (returned): -1" in result["output"]
+    assert "seed 5" in result["output"]
+
+
+def test_run_fuzz_over_stdin():
+    pack = load_pack(PACKS, "python")
+    problem = load_problem(PACKS, "python", "maximum_subarray")
+    with patch("drb.fuzz.run_in_container") as mount, \
+         patch("drb.fuzz.run_with_stdin",
+               return_value={"passed": True, "output": marker(checked=10, skipped=0)}) as stdin:
+        result = run_fuzz("", problem, pack, os.path.join(PACKS, "python"),
+                          "podman", "drb-python", count=10, transport="stdin")
+    mount.assert_not_called()
+    assert stdin.call_args[0][2] == "python fuzz.py"
+    assert sorted(stdin.call_args[0][3]) == ["fuzz.json", "fuzz.py", "reference.py",
+                                             "solution.py"]
+    assert result["passed"] is True
+
+
+def test_run_fuzz_timeout():
+    pack = load_pack(PACKS, "python")
+    problem = load_problem(PACKS, "python", "maximum_subarray")
+    with patch("drb.fuzz.run_in_container", return_value={
+            "passed": False, "output": "Timeout: tests did not complete within 5 seconds."}):
+        result = run_fuzz("", problem, pack, os.path.join(PACKS, "python"),
+                          "docker", "img", timeout=5, count=10)
+    assert result["passed"] is False
+    assert "Timed out after 5 seconds" in result["output"]
+
+
+def test_run_fuzz_without_spec():
+    pack = load_pack(PACKS, "python")
+    problem = load_problem(PACKS, "python", "reverse_linked_list")
+    result = run_fuzz("", problem, pack, PACKS, "docker", "img")
+    assert result == {"passed": False, "output": "This problem has no fuzz test."}
+
+
+@pytest.mark.parametrize("pack_name,problem_id", FUZZED)
+def test_fuzz_generators_build_json_cases(pack_name, problem_id):
+    problem = load_problem(PACKS, pack_name, problem_id)
+    cases = generate_cases(problem["fuzz"]["generator"], count=50)
+    assert cases and json.loads(json.dumps(cases)) == cases
+
+
+def test_python_driver_finds_first_mismatch(tmp_path):
+    shutil.copy(os.path.join(PACKS, "python", "fuzz.py"), tmp_path / "fuzz.py")
+    (tmp_path / "reference.py").write_text("def sort_in_place(a):\n    a.sort()\n")
+    (tmp_path / "solution.py").write_text(
+        "def sort_in_place(a):\n    print('noise')\n    a[:2] = sorted(a[:2])\n")
+    (tmp_path / "fuzz.json").write_text(json.dumps({
+        "entry": "sort_in_place", "compare": "args",
+        "cases": [[[1]], [[2, 1]], [[3, 1, 2]], [[3, 2, 1]]],
+    }))
+    out = subprocess.run([sys.executable, "fuzz.py"], cwd=tmp_path,
+                         capture_output=True, text=True, timeout=30).stdout
+    assert "noise" not in out
+    assert parse_results(out) == {
+        "checked": 2, "skipped": 0, "index": 2,
+        "expected": {"value": [[1, 2, 3]]}, "actual": {"value": [[1, 3, 2]]},
+    }
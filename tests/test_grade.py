@@ -0,0 +1,130 @@
+import csv
+import json
+import os
+from unittest.mock import patch
+
+import pytest
+
+from drb.grade import find_submissions, format_row, grade, report_row, write_report
+
+
+@pytest.fixture
+def pack_env(tmp_path):
+    packs_dir = tmp_path / "packs"
+    pack_dir = packs_dir / "python"
+    pack_dir.mkdir(parents=True)
+    (pack_dir / "pack.json").write_text(json.dumps({
+        "name": "python", "image": "drb-python", "solution_file": "solution.py",
+        "test_command": "pytest -q", "problems": ["add", "sub"],
+        "limits": {"timeout": 7},
+    }))
+    for name, op in (("add", "+"), ("sub", "-")):
+        (pack_dir / f"{name}.json").write_text(json.dumps({
+            "id": name, "test_code": f"from solution import {name}\n"
+                                     f"def test(): assert {name}(3, 1) == 3 {op} 1\n",
+        }))
+    return str(packs_dir)
+
+
+def write(path, text=""):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def test_find_submissions_layouts(tmp_path):
+    root = str(tmp_path)
+    write(os.path.join(root, "add.py"))
+    write(os.path.join(root, "alice", "sub.py"))
+    write(os.path.join(root, "bob", "add", "solution.py"))
+    write(os.path.join(root, "bob", "notes.py"))
+    write(os.path.join(root, "bob", "add.js"))
+    write(os.path.join(root, ".git", "add.py"))
+    pack = {"solution_file": "solution.py", "problems": ["add", "sub"]}
+
+    found = [(s["submitter"], s["problem"], os.path.relpath(s["path"], root))
+             for s in find_submissions(root, pack)]
+    assert found == [
+        ("", "add", "add.py"),
+        ("alice", "sub", os.path.join("alice", "sub.py")),
+        ("bob", "add", os.path.join("bob", "add", "solution.py")),
+    ]
+
+
+def test_grade_runs_each_submission(pack_env, tmp_path):
+    write(str(tmp_path / "subs" / "add.py"), "def add(a, b): return a + b")
+    write(str(tmp_path / "subs" / "sub.py"), "def sub(a, b): return a + b")
+    subs = find_submissions(str(tmp_path / "subs"), {"problems": ["add", "sub"]})
+
+    def fake_run(code, test_code, **kwargs):
+        return {"passed": "add" in test_code, "output": "out",
+                "phases": {"lookup": 0, "test": 4, "total": 9}}
+
+    seen = []
+    with patch("drb.grade.run_tests", side_effect=fake_run) as mock_run:
+        rows = grade(subs, pack_env, "python", {"engine": "docker"}, str(tmp_path), workers=2,
+                     on_result=seen.append)
+
+    assert [(r["problem"], r["passed"]) for r in rows] == [("add", True), ("sub", False)]
+    assert len(seen) == 2
+    assert rows[0]["total_ms"] == 9 and rows[0]["test_ms"] == 4
+    assert rows[0]["error"] is None and rows[1]["error"] == "out"
+    kwargs = mock_run.call_args[1]
+    assert kwargs["timeout"] == 7
+    assert kwargs["image"] == "drb-python"
+    assert kwargs["resource_flags"] == ("--memory=256m", "--cpus=1")
+    names = {call[1]["name"] for call in mock_run.call_args_list}
+    assert len(names) == 2
+
+
+def test_grade_records_a_failing_submission_and_goes_on(pack_env, tmp_path):
+    write(str(tmp_path / "subs" / "add.py"), "def add(a, b): return a + b")
+    write(str(tmp_path / "subs" / "sub.py"), "def sub(a, b): return a - b")
+    subs = find_submissions(str(tmp_path / "subs"), {"problems": ["add", "sub"]})
+
+    def fake_run(code, test_code, **kwargs):
+        if "add" in code:
+            raise RuntimeError("Container pool is shut down.")
+        return {"passed": True, "output": ""}
+
+    with patch("drb.grade.run_tests", side_effect=fake_run):
+        rows = grade(subs, pack_env, "python", {"engine": "docker"}, str(tmp_path))
+    assert [r["passed"] for r in rows] == [False, True]
+    assert rows[0]["error"] == "Error: Container pool is shut down."
+
+
+def test_grade_gives_runs_private_caches(pack_env, tmp_path):
+    write(str(tmp_path / "subs" / "add.py"), "def add(a, b): return a + b")
+    subs = find_submissions(str(tmp_path / "subs"), {"problems": ["add", "sub"]})
+    with patch("drb.grade.pack_run_options", return_value={}) as mock_options, \
+         patch("drb.grade.run_tests", return_value={"passed": True, "output": ""}):
+        grade(subs, pack_env, "python", {"engine": "docker"}, str(tmp_path))
+    assert mock_options.call_args[1]["private_caches"] is True
+
+
+def test_report_row_counts_tests():
+    tests = [{"status": "passed"}, {"status": "failed"}, {"status": "passed"}]
+    row = report_row({"submitter": "", "problem": "add", "path": "add.py"},
+                     {"passed": False, "output": "x" * 1000, "tests": tests,
+                      "resources": {"cpu_ms": 12}}, elapsed_ms=30)
+    assert (row["tests_passed"], row["tests_total"]) == (2, 3)
+    assert row["total_ms"] == 30
+    assert row["cpu_ms"] == 12
+    assert len(row["error"]) == 500
+    assert format_row(row) == "FAIL  add 2/3 tests 30 ms"
+
+
+def test_write_report_csv_and_json(tmp_path):
+    row = report_row({"submitter": "alice", "problem": "add", "path": "add.py"},
+                     {"passed": True, "output": "ok", "cached": True}, elapsed_ms=5)
+    write_report([row], str(tmp_path / "r.csv"))
+    with open(tmp_path / "r.csv") as f:
+        records = list(csv.DictReader(f))
+    assert records[0]["submitter"] == "alice"
+    assert records[0]["passed"] == "True"
+    assert records[0]["tests_total"] == ""
+
+    write_report([row], str(tmp_path / "r.json"))
+    assert json.loads((tmp_path / "r.json").read_text()) == [row]
+    with pytest.raises(ValueError):
+        write_report([row], str(tmp_path / "r.txt"), fmt="xml")
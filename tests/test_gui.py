@@ -163,3 +163,170 @@ def test_hint_history_resets_on_navigation(setup_env):
 
     pw.next_problem()
     assert pw._hint_history == []
+
+
+def test_api_run_tests_returns_job_id(setup_env):
+    state_dir, packs_dir = setup_env
+    pw = PracticeWindow(state_dir=state_dir, packs_dir=packs_dir, headless=True)
+
+    with patch("drb.runner.run_in_container") as mock_container:
+        mock_container.return_value = {"passed": True, "output": "1 passed"}
+        resp = pw.api.run_tests("def add(a, b):\n    return a + b")
+        pw.jobs.get(resp["job_id"]).done.wait(5)
+
+    result = pw.api.get_run_result(resp["job_id"])
+    assert result["status"] == "done"
+    assert result["result"]["passed"] is True
+    assert mock_container.call_args[1]["name"] == f"drb-run-{resp['job_id']}"
+    assert pw.state.current_code == "def add(a, b):\n    return a + b"
+
+
+def test_api_run_tests_parallel_cases(setup_env):
+    state_dir, packs_dir = setup_env
+    pack_path = os.path.join(packs_dir, "python", "pack.json")
+    with open(pack_path) as f:
+        pack = json.load(f)
+    pack["case_command"] = "pytest test_solution.py::{case} -q"
+    with open(pack_path, "w") as f:
+        json.dump(pack, f)
+    with open(os.path.join(packs_dir, "python", "add.json")) as f:
+        problem = json.load(f)
+    problem["test_code"] += "def test_add_negative():\n    assert add(-1,-2)==-3\n"
+    with open(os.path.join(packs_dir, "python", "add.json"), "w") as f:
+        json.dump(problem, f)
+    os.makedirs(state_dir, exist_ok=True)
+    with open(os.path.join(state_dir, "config.json"), "w") as f:
+        json.dump({"parallel_cases": True, "result_cache_mb": 0}, f)
+
+    pw = PracticeWindow(state_dir=state_dir, packs_dir=packs_dir, headless=True)
+    with patch("drb.runner.run_in_container") as mock_container:
+        mock_container.return_value = {"passed": True, "output": "1 passed"}
+        resp = pw.api.run_tests("def add(a, b):\n    return a + b")
+        pw.jobs.get(resp["job_id"]).done.wait(5)
+
+    result = pw.api.get_run_result(resp["job_id"])["result"]
+    assert [c["name"] for c in result["cases"]] == ["test_add", "test_add_negative"]
+    commands = sorted(call[0][2] for call in mock_container.call_args_list)
+    assert commands == ["pytest test_solution.py::test_add -q",
+                        "pytest test_solution.py::test_add_negative -q"]
+
+
+def test_api_run_tests_applies_problem_limits(setup_env):
+    state_dir, packs_dir = setup_env
+    problem_path = os.path.join(packs_dir, "python", "add.json")
+    with open(problem_path) as f:
+        problem = json.load(f)
+    problem["limits"] = {"timeout": 5, "memory": "128m", "pids": 32}
+    with open(problem_path, "w") as f:
+        json.dump(problem, f)
+
+    pw = PracticeWindow(state_dir=state_dir, packs_dir=packs_dir, headless=True)
+    with patch("drb.runner.run_in_container") as mock_container:
+        mock_container.return_value = {"passed": True, "output": "1 passed"}
+        resp = pw.api.run_tests("def add(a, b):\n    return a + b")
+        pw.jobs.get(resp["job_id"]).done.wait(5)
+
+    assert mock_container.call_args[0][4] == 5
+    assert mock_container.call_args[1]["resource_flags"] == (
+        "--memory=128m", "--cpus=1", "--pids-limit=32")
+
+
+def test_api_run_tests_native_engine(setup_env):
+    state_dir, packs_dir = setup_env
+    pack_path = os.path.join(packs_dir, "python", "pack.json")
+    with open(pack_path) as f:
+        pack = json.load(f)
+    pack["native"] = {"test_command": "python3 -m pytest test_solution.py -q"}
+    with open(pack_path, "w") as f:
+        json.dump(pack, f)
+    os.makedirs(state_dir, exist_ok=True)
+    with open(os.path.join(state_dir, "config.json"), "w") as f:
+        json.dump({"engine": "native"}, f)
+
+    pw = PracticeWindow(state_dir=state_dir, packs_dir=packs_dir, headless=True)
+    with patch("drb.runner.run_native") as mock_native:
+        mock_native.return_value = {"passed": True, "output": "1 passed"}
+        resp = pw.api.run_tests("def add(a, b):\n    return a + b")
+        pw.jobs.get(resp["job_id"]).done.wait(5)
+
+    assert pw.api.get_run_result(resp["job_id"])["result"]["passed"] is True
+    args, kwargs = mock_native.call_args
+    assert args[0] == "python3 -m pytest test_solution.py -q"
+    assert kwargs["resource_flags"] == ("--ulimit=as=268435456", "--ulimit=cpu=31")
+
+
+def test_api_run_tests_records_phases(setup_env):
+    from drb.stats import load_runs
+
+    state_dir, packs_dir = setup_env
+    pw = PracticeWindow(state_dir=state_dir, packs_dir=packs_dir, headless=True)
+    with patch("drb.runner.run_in_container") as mock_container:
+        mock_container.return_value = {"passed": True, "output": "1 passed"}
+        resp = pw.api.run_tests("def add(a, b):\n    return a + b")
+        pw.jobs.get(resp["job_id"]).done.wait(5)
+
+    runs = load_runs(state_dir)
+    assert len(runs) == 1
+    assert runs[0]["pack"] == "python"
+    assert runs[0]["passed"] is True
+    assert set(runs[0]["phases"]) == {"lookup", "execute", "total"}
+
+
+def test_api_get_run_result_unknown(setup_env):
+    state_dir, packs_dir = setup_env
+    pw = PracticeWindow(state_dir=state_dir, packs_dir=packs_dir, headless=True)
+    assert pw.api.get_run_result("missing")["status"] == "unknown"
+
+
+def test_output_stream_batches_lines():
+    from drb.gui import OutputStream
+
+    class FakeWindow:
+        def __init__(self):
+            self.scripts = []
+
+        def eval_js(self, script):
+            self.scripts.append(script)
+
+    window = FakeWindow()
+    stream = OutputStream(window, "job1")
+    stream.write("first\n")
+    stream.write("second\n")
+    stream.write("third\n")
+    stream.flush()
+    stream.flush()
+    assert len(window.scripts) == 2
+    assert window.scripts[0] == 'onRunOutput("job1", "first\\n")'
+    assert window.scripts[1] == 'onRunOutput("job1", "second\\nthird\\n")'
+
+
+def test_output_stream_stops_at_limit():
+    from drb.gui import OutputStream
+
+    class FakeWindow:
+        def __init__(self):
+            self.scripts = []
+
+        def eval_js(self, script):
+            self.scripts.append(script)
+
+    window = FakeWindow()
+    stream = OutputStream(window, "job1", limit=10)
+    for _ in range(100):
+        stream.write("line\n")
+    stream.flush()
+    sent = "".join(window.scripts)
+    assert sent.count("line") == 2
+    assert sent.count("more output follows") == 1
+
+
+def test_api_benchmark_without_spec(setup_env):
+    state_dir, packs_dir = setup_env
+    pw = PracticeWindow(state_dir=state_dir, packs_dir=packs_dir, headless=True)
+    assert pw.api.benchmark("def add(a, b): pass") == {"error": "This problem has no benchmark."}
+
+
+def test_api_fuzz_without_spec(setup_env):
+    state_dir, packs_dir = setup_env
+    pw = PracticeWindow(state_dir=state_dir, packs_dir=packs_dir, headless=True)
+    assert pw.api.fuzz("def add(a, b): pass") == {"error": "This problem has no fuzz test."}
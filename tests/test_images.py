@@ -0,0 +1,168 @@
+import json
+import os
+import threading
+from unittest.mock import patch
+
+from drb import container
+from drb.images import ImageRegistry, context_hash
+
+
+def make_pack(tmp_path, dockerfile="FROM python:3.12-slim\nCOPY harness.py /opt/drb/harness.py\n"):
+    pack_dir = tmp_path / "pack"
+    pack_dir.mkdir()
+    (pack_dir / "Dockerfile").write_text(dockerfile)
+    (pack_dir / "harness.py").write_text("print('v1')\n")
+    (pack_dir / "two_sum.json").write_text("{}")
+    return pack_dir
+
+
+class FakeBuilds:
+    """Stands in for stream_process and image inspect."""
+
+    def __init__(self, returncode=0):
+        self.builds = []
+        self.returncode = returncode
+        self.release = threading.Event()
+        self.release.set()
+
+    def stream(self, cmd, timeout, on_output, on_timeout=None):
+        self.builds.append(cmd)
+        on_output("Step 1/2 : FROM python:3.12-slim\n")
+        self.release.wait(5)
+        return self.returncode, ""
+
+    def inspect(self, cmd, **kwargs):
+        ok = bool(self.builds) and self.returncode == 0
+        return type("R", (), {
+            "returncode": 0 if ok else 1,
+            "stdout": f"sha256:{len(self.builds)}\n" if ok else "",
+            "stderr": "",
+        })()
+
+
+def new_registry(state_dir):
+    container._image_ids.clear()
+    return ImageRegistry(str(state_dir), "docker")
+
+
+def test_context_hash_tracks_copied_files_only(tmp_path):
+    pack_dir = make_pack(tmp_path)
+    before = context_hash(str(pack_dir))
+    (pack_dir / "two_sum.json").write_text('{"changed": true}')
+    assert context_hash(str(pack_dir)) == before
+    (pack_dir / "harness.py").write_text("print('v2')\n")
+    assert context_hash(str(pack_dir)) != before
+
+
+def test_ensure_builds_once_and_records(tmp_path):
+    pack_dir = make_pack(tmp_path)
+    fake = FakeBuilds()
+    with patch("drb.images.stream_process", side_effect=fake.stream), \
+         patch("subprocess.run", side_effect=fake.inspect):
+        registry = new_registry(tmp_path / "state")
+        status = registry.ensure("drb-python", str(pack_dir))
+        assert status["state"] == "ready"
+        registry.ensure("drb-python", str(pack_dir))
+    assert len(fake.builds) == 1
+    assert fake.builds[0][:4] == ["docker", "build", "-t", "drb-python"]
+    with open(tmp_path / "state" / "images.json") as f:
+        record = json.load(f)["drb-python"]
+    assert record["id"] == "sha256:1"
+    assert record["hash"] == context_hash(str(pack_dir))
+
+
+def test_rebuild_when_dockerfile_changes(tmp_path):
+    pack_dir = make_pack(tmp_path)
+    fake = FakeBuilds()
+    with patch("drb.images.stream_process", side_effect=fake.stream), \
+         patch("subprocess.run", side_effect=fake.inspect):
+        registry = new_registry(tmp_path / "state")
+        registry.ensure("drb-python", str(pack_dir))
+        (pack_dir / "Dockerfile").write_text("FROM python:3.13-slim\n")
+        assert registry.status("drb-python", str(pack_dir))["state"] == "stale"
+        registry.ensure("drb-python", str(pack_dir))
+    assert len(fake.builds) == 2
+
+
+def test_records_survive_restart_without_rebuild(tmp_path):
+    pack_dir = make_pack(tmp_path)
+    fake = FakeBuilds()
+    with patch("drb.images.stream_process", side_effect=fake.stream), \
+         patch("subprocess.run", side_effect=fake.inspect):
+        new_registry(tmp_path / "state").ensure("drb-python", str(pack_dir))
+        registry = new_registry(tmp_path / "state")
+        assert registry.is_ready("drb-python", str(pack_dir))
+    assert len(fake.builds) == 1
+
+
+def test_pull_without_dockerfile(tmp_path):
+    fake = FakeBuilds()
+    with patch("drb.images.stream_process", side_effect=fake.stream), \
+         patch("subprocess.run", side_effect=fake.inspect):
+        registry = new_registry(tmp_path / "state")
+        registry.ensure("python:3.12-slim")
+    assert fake.builds == [["docker", "pull", "python:3.12-slim"]]
+
+
+def test_build_async_reports_progress(tmp_path):
+    pack_dir = make_pack(tmp_path)
+    fake = FakeBuilds()
+    fake.release.clear()
+    with patch("drb.images.stream_process", side_effect=fake.stream), \
+         patch("subprocess.run", side_effect=fake.inspect):
+        registry = new_registry(tmp_path / "state")
+        status = registry.build_async("drb-python", str(pack_dir))
+        assert status["state"] == "building"
+        again = registry.build_async("drb-python", str(pack_dir))
+        assert again["state"] == "building"
+        fake.release.set()
+        registry._builds["drb-python"]["done"].wait(5)
+        status = registry.status("drb-python")
+    assert len(fake.builds) == 1
+    assert status["state"] == "ready"
+    assert status["progress"] == ["Step 1/2 : FROM python:3.12-slim"]
+
+
+def test_failed_build(tmp_path):
+    pack_dir = make_pack(tmp_path)
+    fake = FakeBuilds(returncode=1)
+    with patch("drb.images.stream_process", side_effect=fake.stream), \
+         patch("subprocess.run", side_effect=fake.inspect):
+        registry = new_registry(tmp_path / "state")
+        status = registry.ensure("drb-python", str(pack_dir))
+    assert status["state"] == "failed"
+    assert "exit 1" in status["error"]
+    assert not os.path.exists(tmp_path / "state" / "images.json")
+
+
+def test_prepare_images_builds_concurrently(tmp_path):
+    from drb.images import prepare_images
+
+    dirs = []
+    for name in ("python", "ruby"):
+        d = tmp_path / name
+        d.mkdir()
+        (d / "Dockerfile").write_text(f"FROM {name}\n")
+        dirs.append((name, f"drb-{name}", str(d)))
+
+    both_running = threading.Barrier(2, timeout=5)
+    lines = []
+
+    def stream(cmd, timeout, on_output, on_timeout=None):
+        on_output(f"building {cmd[3]}\n")
+        both_running.wait()  # fails unless the two builds overlap
+        return 0, ""
+
+    def run(cmd, **kwargs):
+        stdout = "52000000\n" if "{{.Size}}" in cmd else f"sha256:{cmd[-1]}\n"
+        return type("R", (), {"returncode": 0, "stdout": stdout, "stderr": ""})()
+
+    with patch("drb.images.stream_process", side_effect=stream), \
+         patch("subprocess.run", side_effect=run):
+        results = prepare_images(new_registry(tmp_path / "state"), "docker", dirs,
+                                 workers=2, on_output=lambda p, l: lines.append((p, l)))
+
+    assert [r["pack"] for r in results] == ["python", "ruby"]
+    assert all(r["state"] == "ready" for r in results)
+    assert results[0]["size"] == 52000000
+    assert ("ruby", "building drb-ruby\n") in lines
@@ -0,0 +1,111 @@
+import threading
+
+from drb.jobs import JobRunner, fingerprint
+
+
+def test_fingerprint_distinguishes_parts():
+    assert fingerprint("a", "bc") != fingerprint("ab", "c")
+    assert fingerprint("a", "b") == fingerprint("a", "b")
+
+
+def test_submit_returns_immediately_and_completes():
+    gate = threading.Event()
+    completed = []
+    runner = JobRunner(on_complete=completed.append)
+
+    def work(job):
+        gate.wait(5)
+        return {"passed": True, "output": "ok"}
+
+    job_id = runner.submit("python/two_sum", "fp1", work)
+    job = runner.get(job_id)
+    assert job.status == "running"
+    gate.set()
+    assert job.done.wait(5)
+    assert job.status == "done"
+    assert job.result == {"passed": True, "output": "ok"}
+    assert completed == [job]
+
+
+def test_identical_submissions_share_one_execution():
+    gate = threading.Event()
+    calls = []
+    runner = JobRunner()
+
+    def work(job):
+        calls.append(job.id)
+        gate.wait(5)
+        return {"passed": True, "output": ""}
+
+    first = runner.submit("python/two_sum", "same", work)
+    second = runner.submit("python/two_sum", "same", work)
+    assert first == second
+    gate.set()
+    runner.get(first).done.wait(5)
+    assert len(calls) == 1
+
+
+def test_newer_submission_cancels_stale_one():
+    gate = threading.Event()
+    killed = []
+    completed = []
+    runner = JobRunner(on_complete=completed.append)
+
+    def work(job):
+        job.on_cancel(lambda: killed.append(job.id))
+        gate.wait(5)
+        return {"passed": False, "output": job.id}
+
+    stale = runner.submit("python/two_sum", "v1", work)
+    fresh = runner.submit("python/two_sum", "v2", work)
+    assert runner.get(stale).status == "cancelled"
+    gate.set()
+    runner.get(stale).done.wait(5)
+    runner.get(fresh).done.wait(5)
+    assert killed == [stale]
+    assert [job.id for job in completed] == [fresh]
+
+
+def test_other_problem_is_not_cancelled():
+    gate = threading.Event()
+    runner = JobRunner()
+
+    def work(job):
+        gate.wait(5)
+        return {}
+
+    a = runner.submit("python/two_sum", "v1", work)
+    runner.submit("python/fizzbuzz", "v2", work)
+    assert runner.get(a).status == "running"
+    gate.set()
+
+
+def test_cancel_by_id():
+    gate = threading.Event()
+    killed = []
+    runner = JobRunner()
+
+    def work(job):
+        job.on_cancel(lambda: killed.append(True))
+        gate.wait(5)
+        return {}
+
+    job_id = runner.submit("k", "fp", work)
+    assert runner.cancel(job_id) is True
+    assert runner.cancel("nope") is False
+    gate.set()
+    runner.get(job_id).done.wait(5)
+    assert killed == [True]
+    assert runner.cancel(job_id) is False
+
+
+def test_exception_becomes_failed_result():
+    runner = JobRunner()
+
+    def work(job):
+        raise RuntimeError("engine exploded")
+
+    job = runner.get(runner.submit("k", "fp", work))
+    job.done.wait(5)
+    assert job.result["passed"] is False
+    assert "engine exploded" in job.result["output"]
@@ -0,0 +1,51 @@
+import os
+
+import pytest
+
+from drb.container import RESOURCE_FLAGS
+from drb.limits import DEFAULT_LIMITS, limit_flags, resolve_limits
+from drb.problems import load_pack, load_problem
+
+PACKS = os.path.join(os.path.dirname(__file__), "..", "packs")
+
+
+def test_defaults_match_container_flags():
+    assert limit_flags(DEFAULT_LIMITS) == RESOURCE_FLAGS
+    assert resolve_limits({}) == DEFAULT_LIMITS
+
+
+def test_later_sources_win():
+    pack = {"limits": {"timeout": 30, "memory": "256m", "pids": 128}}
+    problem = {"limits": {"timeout": 60, "memory": "512m"}}
+    config = {"limits": {"timeout": 90}}
+    limits = resolve_limits(pack, problem, config)
+    assert limits == {"timeout": 90, "memory": "512m", "cpus": 1, "pids": 128}
+
+
+def test_limit_flags():
+    limits = {"timeout": 5, "memory": "1g", "cpus": 0.5, "pids": 64}
+    assert limit_flags(limits) == ("--memory=1g", "--cpus=0.5", "--pids-limit=64")
+
+
+@pytest.mark.parametrize("bad,message", [
+    ({"timeout": 0}, "timeout"),
+    ({"timeout": "30"}, "timeout"),
+    ({"memory": "lots"}, "memory"),
+    ({"cpus": -1}, "cpus"),
+    ({"pids": 1.5}, "pids"),
+    ({"disk": "1g"}, "Unknown limits: disk"),
+])
+def test_invalid_limits(bad, message):
+    with pytest.raises(ValueError, match=message):
+        resolve_limits({"limits": bad})
+
+
+def test_shipped_limits_are_valid():
+    for pack_name in ("python", "javascript", "ruby"):
+        pack = load_pack(PACKS, pack_name)
+        for problem_id in pack["problems"]:
+            resolve_limits(pack, load_problem(PACKS, pack_name, problem_id))
+    heavy = load_problem(PACKS, "python", "merge_k_sorted_lists")
+    fast = load_problem(PACKS, "python", "fizzbuzz")
+    pack = load_pack(PACKS, "python")
+    assert resolve_limits(pack, heavy)["timeout"] > resolve_limits(pack, fast)["timeout"]
@@ -0,0 +1,225 @@
+import io
+import os
+import shlex
+import subprocess
+import tarfile
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from drb.container import STATS_MARKER, remove_container
+from drb.limits import DEFAULT_LIMITS
+from drb.native import (
+    kill_native, missing_tools, native_command, native_flags, remove_native_caches,
+    run_native, sandbox_command, trim_native_caches,
+)
+from drb.pool import create_pool
+from drb.runner import run_tests
+
+def _can_sandbox():
+    if missing_tools():
+        return False
+    probe = subprocess.run(["unshare", "--user", "--map-root-user", "--mount", "true"],
+                           capture_output=True)
+    return probe.returncode == 0
+
+
+STATS = f"\n{STATS_MARKER} oom_before= oom_after= peak= limit=\n0m0.00s 0m0.00s\n0m0.10s 0m0.02s\n"
+
+
+def test_native_flags_from_limits():
+    assert native_flags(DEFAULT_LIMITS) == ("--ulimit=as=268435456", "--ulimit=cpu=31")
+    limits = dict(DEFAULT_LIMITS, timeout=10, cpus=2, pids=64)
+    pack = {"native": {"address_space": "4g"}}
+    assert native_flags(limits, pack) == (
+        "--ulimit=as=4294967296", "--ulimit=cpu=21", "--ulimit=nproc=64")
+
+
+def test_native_command_override():
+    pack = {"test_command": "python -m pytest", "case_command": "python -m pytest -k {case}",
+            "native": {"test_command": "python3 -m pytest"}}
+    assert native_command(pack) == "python3 -m pytest"
+    assert native_command(pack, "case_command") == "python -m pytest -k {case}"
+    assert native_command({"test_command": "ruby t.rb"}) == "ruby t.rb"
+
+
+def test_sandbox_command():
+    cmd = sandbox_command("pytest -q 'a b'", ("--ulimit=as=1024", "--memory=256m",
+                                              "--ulimit=nproc=8"))
+    assert cmd[0] == "unshare"
+    assert {"--user", "--mount", "--net", "--pid", "--kill-child"} <= set(cmd)
+    script = cmd[-1]
+    assert "prlimit --as=1024 --nproc=8 sh -c 'pytest -q '\"'\"'a b'\"'\"''" in script
+    assert "--memory" not in script
+    assert "mount -t tmpfs" in script and "tar -xf -" in script
+
+
+def test_native_flags_bind_pack_caches():
+    pack = {"name": "go", "caches": [{"name": "go-build", "path": "/cache/go-build",
+                                      "env": "GOCACHE"}]}
+    flags = native_flags(DEFAULT_LIMITS, pack, "/home/u/.drb")
+    assert flags[-1] == "--cache=GOCACHE=/home/u/.drb/cache/go/go-build"
+
+
+def test_sandbox_command_mounts_caches_writable():
+    script = sandbox_command("go test", ("--cache=GOCACHE=/tmp/c d",))[-1]
+    # Opened before /tmp is replaced, bound before the mounts turn read-only.
+    assert script.index("exec 3<'/tmp/c d'") < script.index("mount -t tmpfs")
+    assert script.index("mount --bind /proc/self/fd/3 /tmp/.cache/0") < \
+        script.index("/proc/self/mounts")
+    assert "export GOCACHE=/tmp/.cache/0" in script
+
+
+@pytest.mark.skipif(not _can_sandbox(), reason="no user namespaces here")
+def test_sandbox_writes_only_to_work_dir_and_caches(tmp_path):
+    cache = tmp_path / "cache"
+    # /tmp is the sandbox's own; the host's /dev/shm is a separate mount.
+    targets = ["/dev/shm/drb-probe", os.path.expanduser("~/drb-probe")]
+    script = "".join(f"(echo x > {t}) 2>/dev/null && echo wrote {t}\n" for t in targets)
+    script += "echo x > $CACHE/probe && echo x > here && echo done\n"
+    result = run_native(f"sh -c {shlex.quote(script)}", {}, timeout=10,
+                        resource_flags=(f"--cache=CACHE={cache}",))
+    assert result["output"] == "done"
+    assert (cache / "probe").exists()
+    assert not any(os.path.exists(t) for t in targets)
+
+    result = run_native("sh -c 'echo x > $CACHE/planted'", {}, timeout=10,
+                        resource_flags=(f"--read-only-cache=CACHE={cache}",))
+    assert result["passed"] is False
+    assert not (cache / "planted").exists()
+
+
+def test_cold_read_only_native_cache_is_private(tmp_path):
+    pack = {"name": "go", "caches": [
+        {"name": "go-build", "path": "/cache/go-build", "env": "GOCACHE", "read_only_ok": True},
+    ]}
+    flags = native_flags(DEFAULT_LIMITS, pack, str(tmp_path), private_caches=True)
+    assert flags[-1] == "--private-cache=GOCACHE=256"
+    os.makedirs(tmp_path / "cache" / "go" / "go-build")
+    flags = native_flags(DEFAULT_LIMITS, pack, str(tmp_path), private_caches=True)
+    assert flags[-1] == "--private-cache=GOCACHE=256"
+
+
+def test_sandbox_fails_if_a_mount_stays_writable():
+    script = sandbox_command("true")[-1]
+    assert 'exit 125\n  }\ndone <<EOF\n$(cat /proc/self/mounts)\nEOF' in script
+    assert "2>/dev/null\nmkdir" not in script
+
+
+def test_private_native_caches(tmp_path):
+    pack = {"name": "go", "caches": [
+        {"name": "go-build", "path": "/cache/go-build", "env": "GOCACHE", "read_only_ok": True},
+        {"name": "jest", "path": "/cache/jest", "env": "JEST", "max_mb": 512},
+    ]}
+    os.makedirs(tmp_path / "cache" / "go" / "go-build" / "00")
+    flags = native_flags(DEFAULT_LIMITS, pack, str(tmp_path), private_caches=True)
+    assert flags[-2:] == (f"--read-only-cache=GOCACHE={tmp_path}/cache/go/go-build",
+                          "--private-cache=JEST=512")
+    script = sandbox_command("go test", flags)[-1]
+    assert ("mount --bind /proc/self/fd/3 /tmp/.cache/0 && "
+            "mount -o remount,bind,ro /tmp/.cache/0 || exit 125") in script
+    assert "mount -t tmpfs -o size=512m tmpfs /tmp/.cache/1" in script
+    assert "export GOCACHE=/tmp/.cache/0" in script and "export JEST=/tmp/.cache/1" in script
+
+
+def test_trim_and_remove_native_caches(tmp_path):
+    pack = {"name": "go", "caches": [{"name": "small", "max_mb": 1},
+                                     {"name": "big", "max_mb": 1},
+                                     {"name": "uncapped"}]}
+    caches = tmp_path / "cache" / "go"
+    for name, size in (("small", 10), ("big", 2 * 1024 * 1024), ("uncapped", 2 * 1024 * 1024)):
+        (caches / name).mkdir(parents=True)
+        (caches / name / "obj").write_bytes(b"x" * size)
+    assert trim_native_caches(pack, str(tmp_path)) == [str(caches / "big")]
+    assert (caches / "small" / "obj").exists()
+    assert (caches / "uncapped" / "obj").exists()
+    assert sorted(remove_native_caches(pack, str(tmp_path))) == [
+        str(caches / "small"), str(caches / "uncapped")]
+    assert list(caches.iterdir()) == []
+
+
+def test_missing_tools():
+    with patch("shutil.which", side_effect=lambda x: None if x == "jest" else f"/usr/bin/{x}"):
+        assert missing_tools(["node", "jest"]) == ["jest"]
+        assert missing_tools() == []
+
+
+def test_run_native_result_and_stats():
+    lines = []
+    with patch("drb.native.stream_process") as mock_stream:
+        mock_stream.return_value = (0, "1 passed\n" + STATS)
+        result = run_native("pytest", {"solution.py": "x = 1"}, timeout=5,
+                            on_output=lines.append)
+    assert result["passed"] is True
+    assert result["output"] == "1 passed"
+    assert result["resources"]["cpu_ms"] == 120
+    assert result["resources"]["peak_memory_bytes"] is None
+    archive = mock_stream.call_args[1]["input"]
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        assert tar.getnames() == ["solution.py"]
+
+
+def test_run_native_timeout():
+    with patch("drb.native.stream_process", return_value=(None, "partial\n")):
+        result = run_native("pytest", {}, timeout=3)
+    assert result["passed"] is False
+    assert "did not complete within 3 seconds" in result["output"]
+
+
+def test_run_native_without_unshare():
+    with patch("drb.native.stream_process", side_effect=FileNotFoundError):
+        result = run_native("pytest", {})
+    assert result["passed"] is False
+    assert "unshare" in result["output"]
+
+
+def test_named_run_can_be_killed():
+    process = MagicMock()
+
+    def fake_stream(cmd, timeout, on_output, input=None, on_start=None):
+        on_start(process)
+        kill_native("drb-run-1")
+        return None, ""
+
+    with patch("drb.native.stream_process", side_effect=fake_stream):
+        run_native("pytest", {}, name="drb-run-1")
+    process.kill.assert_called_once()
+    kill_native("drb-run-1")  # finished runs are forgotten
+    assert process.kill.call_count == 1
+
+
+def test_remove_container_native_kills_process():
+    with patch("drb.native.kill_native") as mock_kill, patch("subprocess.run") as mock_run:
+        remove_container("native", "drb-run-2")
+    mock_kill.assert_called_once_with("drb-run-2")
+    mock_run.assert_not_called()
+
+
+def test_runner_uses_native_engine():
+    cache = MagicMock()
+    with patch("drb.runner.run_native") as mock_native, \
+         patch("drb.runner.run_in_container") as mock_container:
+        mock_native.return_value = {"passed": True, "output": "ok"}
+        result = run_tests("code", "tests", engine="native", image="drb-python",
+                           test_command="python3 -m pytest", cache=cache,
+                           resource_flags=("--ulimit=as=1024",))
+    result.pop("phases")
+    assert result == {"passed": True, "output": "ok"}
+    mock_container.assert_not_called()
+    cache.get.assert_not_called()
+    args, kwargs = mock_native.call_args
+    assert args[0] == "python3 -m pytest"
+    assert args[1] == {"solution.py": "code", "test_solution.py": "tests"}
+    assert kwargs["resource_flags"] == ("--ulimit=as=1024",)
+
+
+def test_no_pool_for_native_engine(tmp_path):
+    assert create_pool({"engine": "native", "pool_size": 2}, str(tmp_path)) is None
+
+
+def test_sandbox_command_binds_fixtures_read_only():
+    script = sandbox_command("pytest", ("--cache=GOCACHE=/c", "--fixtures=/f/python"))[-1]
+    assert script.index("exec 4</f/python") < script.index("mount -t tmpfs")
+    assert ("mount --bind /proc/self/fd/4 /tmp/.fixtures && "
+            "mount -o remount,bind,ro /tmp/.fixtures") in script
+    assert "export DRB_FIXTURES=/tmp/.fixtures" in script
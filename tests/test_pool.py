@@ -0,0 +1,429 @@
+import os
+import subprocess as subprocess_mod
+import sys
+from contextlib import contextmanager
+from unittest.mock import patch
+
+import pytest
+
+from drb.pool import ContainerPool, HarnessError, create_pool
+
+
+class FakeEngine:
+    """Records engine CLI calls and answers them like a healthy engine."""
+
+    def __init__(self, exec_returncode=0, exec_output="1 passed", running="true"):
+        self.cmds = []
+        self.exec_returncode = exec_returncode
+        self.exec_output = exec_output
+        self.running = running
+        self.seen_files = []
+
+    def __call__(self, cmd, **kwargs):
+        self.cmds.append(cmd)
+        r = type("R", (), {"returncode": 0, "stdout": "", "stderr": ""})()
+        if cmd[1] == "exec":
+            workdir = cmd[cmd.index("-w") + 1]
+            self.seen_files.append(workdir)
+            r.returncode = self.exec_returncode
+            r.stdout = self.exec_output
+        elif cmd[1] == "inspect":
+            r.stdout = self.running
+        return r
+
+    def count(self, sub):
+        return sum(1 for c in self.cmds if c[1] == sub)
+
+
+@contextmanager
+def engine_calls(run):
+    """Answer engine CLI calls, streamed execs included, with run(cmd, **kwargs)."""
+    def stream(cmd, timeout, on_output, on_timeout=None, input=None):
+        try:
+            result = run(cmd, **({} if input is None else {"input": input}))
+        except subprocess_mod.TimeoutExpired:
+            return None, ""
+        output = result.stdout + result.stderr
+        return result.returncode, output.decode() if isinstance(output, bytes) else output
+
+    with patch("subprocess.run", side_effect=run), \
+         patch("drb.pool.stream_process", side_effect=stream):
+        yield
+
+
+def test_create_pool_disabled_by_default(tmp_path):
+    assert create_pool({}, str(tmp_path)) is None
+    assert create_pool({"pool_size": 0}, str(tmp_path)) is None
+
+
+def test_create_pool_from_config(tmp_path):
+    pool = create_pool({"engine": "podman", "pool_size": 3, "pool_max_runs": 5}, str(tmp_path))
+    assert isinstance(pool, ContainerPool)
+
+
+def test_warm_starts_pool_size_containers(tmp_path):
+    engine = FakeEngine()
+    pool = ContainerPool("docker", str(tmp_path), size=2)
+    with engine_calls(engine):
+        pool.warm("drb-python")
+        pool.warm("drb-python")
+    assert engine.count("run") == 2
+    start = engine.cmds[0]
+    assert "-d" in start and "sleep" in start
+    assert "--memory=256m" in start
+
+
+def test_run_execs_in_warm_container(tmp_path):
+    engine = FakeEngine()
+    pool = ContainerPool("docker", str(tmp_path), size=1)
+    with engine_calls(engine):
+        pool.warm("drb-python")
+        result = pool.run("drb-python", "pytest test_solution.py",
+                          {"solution.py": "x = 1", "test_solution.py": "y = 2"})
+    assert result == {"passed": True, "output": "1 passed"}
+    assert engine.count("run") == 1
+    assert engine.count("exec") == 1
+    assert engine.seen_files[0].startswith("/pool/")
+
+
+def test_run_dir_cleaned_up(tmp_path):
+    written = []
+
+    def fake(cmd, **kwargs):
+        if cmd[1] == "exec":
+            run_id = cmd[cmd.index("-w") + 1].split("/")[-1]
+            name = cmd[cmd.index("-w") + 2]
+            run_dir = os.path.join(str(tmp_path), name, run_id)
+            written.append(sorted(os.listdir(run_dir)))
+        return type("R", (), {"returncode": 0, "stdout": "", "stderr": ""})()
+
+    pool = ContainerPool("docker", str(tmp_path), size=1)
+    with engine_calls(fake):
+        pool.run("img", "true", {"solution.py": "a", "test_solution.py": "b"})
+        container = pool._idle["img"][0]
+    assert written == [["solution.py", "test_solution.py"]]
+    assert os.listdir(container.host_dir) == []
+
+
+def test_containers_reused_between_runs(tmp_path):
+    engine = FakeEngine()
+    pool = ContainerPool("docker", str(tmp_path), size=1, max_runs=10)
+    with engine_calls(engine):
+        for _ in range(3):
+            pool.run("img", "true", {"solution.py": ""})
+    assert engine.count("run") == 1
+    assert engine.count("exec") == 3
+
+
+def test_recycle_after_max_runs(tmp_path):
+    engine = FakeEngine()
+    pool = ContainerPool("docker", str(tmp_path), size=1, max_runs=2)
+    with engine_calls(engine), \
+         patch.object(pool, "warm_in_background"):
+        pool.run("img", "true", {})
+        pool.run("img", "true", {})
+        pool.run("img", "true", {})
+    assert engine.count("rm") == 1
+    assert engine.count("run") == 2
+
+
+def test_timeout_recycles_container(tmp_path):
+    engine = FakeEngine()
+
+    def fake(cmd, **kwargs):
+        if cmd[1] == "exec":
+            raise subprocess_mod.TimeoutExpired(cmd=cmd, timeout=1)
+        return engine(cmd, **kwargs)
+
+    pool = ContainerPool("docker", str(tmp_path), size=1)
+    with engine_calls(fake), \
+         patch.object(pool, "warm_in_background"):
+        result = pool.run("img", "true", {}, timeout=1)
+    assert result["passed"] is False
+    assert "timeout" in result["output"].lower()
+    assert engine.count("rm") == 1
+    assert pool._idle["img"] == []
+
+
+def test_crashed_container_is_recycled(tmp_path):
+    engine = FakeEngine(exec_returncode=137, running="false")
+    pool = ContainerPool("docker", str(tmp_path), size=1)
+    with engine_calls(engine), \
+         patch.object(pool, "warm_in_background"):
+        result = pool.run("img", "true", {})
+    assert result["passed"] is False
+    assert engine.count("inspect") == 1
+    assert engine.count("rm") == 1
+
+
+def test_cancelled_run_frees_its_slot(tmp_path):
+    engine = FakeEngine(exec_returncode=137)
+    cancels = []
+    pool = ContainerPool("docker", str(tmp_path), size=1)
+
+    def fake(cmd, **kwargs):
+        if cmd[1] == "exec":
+            cancels[0]()  # the user cancels while the tests run
+        return engine(cmd, **kwargs)
+
+    with engine_calls(fake), \
+         patch.object(pool, "warm_in_background"):
+        result = pool.run("img", "true", {}, on_cancel=cancels.append)
+        assert pool._idle["img"] == []
+        assert pool._count["img"] == 0
+        pool.run("img", "true", {})
+        cancels[0]()  # too late: the run is over
+    assert "Run cancelled." in result["output"]
+    assert engine.count("rm") == 2
+    assert engine.count("run") == 2
+    assert len(pool._idle["img"]) == 1
+
+
+def test_cancelled_harness_run_is_not_retried(tmp_path):
+    engine = FakeEngine()
+    popen, launched = fake_popen()
+    pool = ContainerPool("docker", str(tmp_path), size=1)
+    with engine_calls(engine), \
+         patch("subprocess.Popen", side_effect=popen), \
+         patch.object(pool, "warm_in_background"), \
+         patch("drb.pool.uuid.uuid4") as mock_uuid:
+        mock_uuid.return_value.hex = "crash"
+        result = pool.run("img", "pytest", {}, harness="h", on_cancel=lambda cancel: cancel())
+    assert result == {"passed": False, "output": "Run cancelled."}
+    assert pool._idle["img"] == [] and pool._count["img"] == 0
+
+
+def test_failing_tests_keep_container(tmp_path):
+    engine = FakeEngine(exec_returncode=1, exec_output="FAILED")
+    pool = ContainerPool("docker", str(tmp_path), size=1)
+    with engine_calls(engine):
+        result = pool.run("img", "true", {})
+    assert result["passed"] is False
+    assert engine.count("inspect") == 0
+    assert engine.count("rm") == 0
+    assert len(pool._idle["img"]) == 1
+
+
+def test_shutdown_removes_containers(tmp_path):
+    engine = FakeEngine()
+    pool = ContainerPool("docker", str(tmp_path), size=2)
+    with engine_calls(engine):
+        pool.warm("img")
+        pool.shutdown()
+    assert engine.count("rm") == 2
+
+
+FAKE_HARNESS = r"""
+import json, sys
+print(json.dumps({"ready": True}), flush=True)
+for line in sys.stdin:
+    req = json.loads(line)
+    if req["dir"].endswith("crash"):
+        sys.exit(1)
+    print(json.dumps({"returncode": 0, "output": "ran " + req["test_file"] + req.get("case", ""),
+                      "timed_out": req["timeout"] == 0}), flush=True)
+"""
+
+
+def fake_popen(greeting=None, script=FAKE_HARNESS):
+    real_popen = subprocess_mod.Popen
+    launched = []
+
+    def popen(cmd, **kwargs):
+        launched.append(cmd)
+        source = script if greeting is None else f"print({greeting!r})"
+        return real_popen([sys.executable, "-c", source], **kwargs)
+
+    return popen, launched
+
+
+def test_harness_container_runs_requests(tmp_path):
+    engine = FakeEngine()
+    popen, launched = fake_popen()
+    pool = ContainerPool("docker", str(tmp_path), size=1)
+    with engine_calls(engine), \
+         patch("subprocess.Popen", side_effect=popen):
+        first = pool.run("img", "pytest", {"solution.py": ""},
+                         harness="python /opt/drb/harness.py")
+        second = pool.run("img", "pytest", {"solution.py": ""},
+                          test_file="test_solution.js")
+        pool.shutdown()
+    assert first == {"passed": True, "output": "ran test_solution.py"}
+    assert second["output"] == "ran test_solution.js"
+    assert len(launched) == 1
+    assert "-i" in launched[0]
+    assert launched[0][-1] == "python /opt/drb/harness.py"
+    assert engine.count("exec") == 0
+
+
+def test_harness_timeout_keeps_container(tmp_path):
+    engine = FakeEngine()
+    popen, launched = fake_popen()
+    pool = ContainerPool("docker", str(tmp_path), size=1)
+    with engine_calls(engine), \
+         patch("subprocess.Popen", side_effect=popen):
+        result = pool.run("img", "pytest", {}, timeout=0, harness="h")
+        assert len(pool._idle["img"]) == 1
+        pool.shutdown()
+    assert result["passed"] is False
+    assert "timeout" in result["output"].lower()
+
+
+def test_harness_crash_raises_and_discards(tmp_path):
+    engine = FakeEngine()
+    popen, launched = fake_popen()
+    pool = ContainerPool("docker", str(tmp_path), size=1)
+    with engine_calls(engine), \
+         patch("subprocess.Popen", side_effect=popen), \
+         patch.object(pool, "warm_in_background"), \
+         patch("drb.pool.uuid.uuid4") as mock_uuid:
+        mock_uuid.return_value.hex = "crash"
+        with pytest.raises(HarnessError):
+            pool.run("img", "pytest", {}, harness="h")
+    assert pool._idle["img"] == []
+    assert engine.count("rm") == 1
+
+
+def test_bad_harness_greeting_disables_harness(tmp_path):
+    engine = FakeEngine()
+    popen, launched = fake_popen(greeting="not json")
+    pool = ContainerPool("docker", str(tmp_path), size=1)
+    with engine_calls(engine), \
+         patch("subprocess.Popen", side_effect=popen):
+        with pytest.raises(HarnessError):
+            pool.run("img", "pytest", {}, harness="h")
+        result = pool.run("img", "pytest", {}, harness="h")
+    assert result["passed"] is True
+    assert len(launched) == 1
+    assert engine.count("exec") == 1
+
+
+def test_stdin_transport_uses_tmpfs_and_pipes_files(tmp_path):
+    engine = FakeEngine()
+    pool = ContainerPool("podman", str(tmp_path), size=1, transport="stdin")
+    inputs = []
+
+    def fake(cmd, **kwargs):
+        if cmd[1] == "exec":
+            inputs.append(kwargs.get("input"))
+            kwargs.pop("text", None)
+            r = engine(cmd, **kwargs)
+            r.stdout, r.stderr = b"1 passed", b""
+            return r
+        return engine(cmd, **kwargs)
+
+    with engine_calls(fake):
+        result = pool.run("img", "pytest -q", {"solution.py": "x = 1"})
+    assert result == {"passed": True, "output": "1 passed"}
+    start = engine.cmds[0]
+    assert "--tmpfs" in start and "-v" not in start
+    exec_cmd = engine.cmds[1]
+    assert "-i" in exec_cmd and any("pytest -q" in part for part in exec_cmd)
+    assert inputs[0].startswith(b"solution.py")
+    assert os.listdir(str(tmp_path)) == []
+
+
+def test_stdin_transport_unpacks_before_harness_request(tmp_path):
+    engine = FakeEngine()
+    popen, launched = fake_popen()
+
+    def fake(cmd, **kwargs):
+        r = engine(cmd, **kwargs)
+        if cmd[1] == "exec":
+            r.stdout, r.stderr = b"", b""
+        return r
+
+    pool = ContainerPool("podman", str(tmp_path), size=1, transport="stdin")
+    with engine_calls(fake), \
+         patch("subprocess.Popen", side_effect=popen):
+        result = pool.run("img", "pytest", {"solution.py": ""}, harness="h")
+        pool.shutdown()
+    assert result["passed"] is True
+    assert "--tmpfs" in launched[0]
+    unpack = next(c for c in engine.cmds if c[1] == "exec")
+    assert "tar -xf -" in " ".join(unpack)
+
+
+def test_harness_request_carries_case(tmp_path):
+    engine = FakeEngine()
+    popen, launched = fake_popen()
+    pool = ContainerPool("docker", str(tmp_path), size=1)
+    with engine_calls(engine), \
+         patch("subprocess.Popen", side_effect=popen):
+        result = pool.run("img", "pytest", {}, harness="h", case="::test_a")
+        pool.shutdown()
+    assert result["output"] == "ran test_solution.py::test_a"
+
+
+def test_harness_resources_passed_through(tmp_path):
+    script = FAKE_HARNESS.replace(
+        '"timed_out": req["timeout"] == 0}',
+        '"timed_out": False, "resources": {"cpu_ms": 7, "peak_memory_bytes": 1024, "oom_killed": False}}',
+    )
+    engine = FakeEngine()
+    popen, launched = fake_popen(script=script)
+    pool = ContainerPool("docker", str(tmp_path), size=1)
+    with engine_calls(engine), \
+         patch("subprocess.Popen", side_effect=popen):
+        result = pool.run("img", "pytest", {}, harness="h")
+        pool.shutdown()
+    assert result["resources"]["cpu_ms"] == 7
+    assert result["resources"]["peak_memory_bytes"] == 1024
+    assert "wall_ms" in result["resources"]
+
+
+def test_harness_request_bounds_output(tmp_path):
+    script = FAKE_HARNESS.replace(
+        '"output": "ran " + req["test_file"] + req.get("case", ""),',
+        '"output": "%d %d\\n[drb: 9 bytes of output dropped]\\nend" % (req["output_head"], req["output_tail"]),',
+    )
+    engine = FakeEngine()
+    popen, launched = fake_popen(script=script)
+    pool = ContainerPool("docker", str(tmp_path), size=1)
+    with engine_calls(engine), \
+         patch("subprocess.Popen", side_effect=popen), \
+         patch("drb.container._output_limits", [10, 20]):
+        result = pool.run("img", "pytest", {}, harness="h")
+        pool.shutdown()
+    assert result["output"].startswith("10 20\n")
+    assert result["dropped_bytes"] == 9
+
+
+def test_exec_runs_leave_out_memory_peak(tmp_path):
+    engine = FakeEngine()
+    pool = ContainerPool("docker", str(tmp_path), size=1)
+    with engine_calls(engine):
+        pool.run("img", "pytest", {})
+    script = engine.cmds[-1][-1]
+    assert "memory.peak" not in script and "oom_kill" in script
+
+
+def test_warm_flags_apply_to_new_containers(tmp_path):
+    engine = FakeEngine()
+    pool = ContainerPool("docker", str(tmp_path), size=1)
+    with engine_calls(engine):
+        pool.warm("img", flags=("--memory=512m", "--cpus=2", "--pids-limit=64"))
+    start = engine.cmds[0]
+    assert "--memory=512m" in start and "--pids-limit=64" in start
+    assert "--memory=256m" not in start
+    assert pool.flags_for("img") == ("--memory=512m", "--cpus=2", "--pids-limit=64")
+    assert pool.flags_for("other") == ("--memory=256m", "--cpus=1")
+
+
+def test_check_uses_idle_container_only(tmp_path):
+    engine = FakeEngine()
+    pool = ContainerPool("docker", str(tmp_path), size=1)
+    assert pool.check("drb-javascript", "node --check solution.js", {"solution.js": "x"}) is None
+    assert engine.cmds == []
+
+    def run(cmd, **kwargs):
+        if cmd[1] == "exec":
+            assert kwargs["input"]  # the files, as a tar stream
+            return type("R", (), {"returncode": 1, "stdout": b"solution.js:1\n", "stderr": b""})()
+        return engine(cmd, **kwargs)
+
+    with engine_calls(run):
+        pool.warm("drb-javascript")
+        checked = pool.check("drb-javascript", "node --check solution.js", {"solution.js": "x"})
+        assert checked == (1, "solution.js:1\n")
+        assert pool.check("drb-javascript", "true", {}) is not None  # released again
@@ -72,3 +72,32 @@ def test_load_ruby_problem():
     assert problem["id"] == "two_sum"
     assert "def two_sum" in problem["skeleton"]
     assert "require_relative" in problem["test_code"]
+
+
+@pytest.mark.parametrize("pack_name,env", [("python", "PYTHONPYCACHEPREFIX"),
+                                           ("javascript", "DRB_JEST_CACHE")])
+def test_packs_declare_toolchain_caches(pack_name, env):
+    pack = load_pack(PACKS_DIR, pack_name)
+    assert [cache["env"] for cache in pack["caches"]] == [env]
+
+
+def test_load_go_pack():
+    pack = load_pack(PACKS_DIR, "go")
+    assert pack["language"] == "go"
+    assert len(pack["problems"]) == 35
+    assert pack["caches"][0]["env"] == "GOCACHE"
+
+
+def test_load_go_problem():
+    problem = load_problem(PACKS_DIR, "go", "two_sum")
+    assert "func twoSum" in problem["skeleton"]
+    assert problem["test_code"].startswith("package solution")
+
+
+@pytest.mark.parametrize("pack_name", ["python", "javascript", "ruby", "go"])
+def test_every_problem_has_reference_solution(pack_name):
+    pack = load_pack(PACKS_DIR, pack_name)
+    for problem_id in pack["problems"]:
+        problem = load_problem(PACKS_DIR, pack_name, problem_id)
+        assert problem.get("reference_solution"), problem_id
+        assert problem["reference_solution"] != problem["skeleton"], problem_id
@@ -0,0 +1,119 @@
+import json
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from drb.container import REPORT_MARKER, hide_stats
+from drb.reports import extract_report, parse_report, with_report
+
+PACKS = os.path.join(os.path.dirname(__file__), "..", "packs")
+
+JUNIT = """<?xml version="1.0" encoding="utf-8"?><testsuites><testsuite name="pytest">
+<testcase classname="test_solution" name="test_a" time="0.002" />
+<testcase classname="test_solution" name="test_b" time="0.013"><failure message="assert 3 == 4">
+test_solution.py:3: in test_b</failure></testcase>
+<testcase classname="test_solution" name="test_c" time="0.000"><error message="">boom</error></testcase>
+<testcase classname="test_solution" name="test_d" time="0.000"><skipped message="later" /></testcase>
+</testsuite></testsuites>"""
+
+JEST = json.dumps({"testResults": [{"assertionResults": [
+    {"fullName": "twoSum basic", "title": "basic", "status": "passed", "duration": 4,
+     "failureMessages": []},
+    {"fullName": "twoSum negative", "title": "negative", "status": "failed", "duration": 12,
+     "failureMessages": ["Expected: [0, 2]", "Received: undefined"]},
+    {"fullName": "twoSum later", "title": "later", "status": "pending", "duration": None,
+     "failureMessages": []},
+]}]})
+
+
+def test_with_report_wraps_command():
+    report = {"format": "junit", "file": ".drb-report.xml",
+              "command": "{command} --junitxml=.drb-report.xml"}
+    command = with_report("python -m pytest -q", report)
+    assert command.startswith("python -m pytest -q --junitxml=.drb-report.xml; r=$?;")
+    assert f"printf '\\n{REPORT_MARKER}\\n'; cat .drb-report.xml" in command
+    assert command.endswith("exit $r")
+
+
+def test_extract_report():
+    assert extract_report(f"1 passed\n{REPORT_MARKER}\n<xml/>") == ("1 passed", "<xml/>")
+    assert extract_report(f"{REPORT_MARKER}\n<xml/>") == ("", "<xml/>")
+    assert extract_report("1 passed") == ("1 passed", None)
+
+
+def test_extract_report_without_report_file():
+    # The reporter never wrote its file: the marker ends the output.
+    assert extract_report(f"bye\n\n{REPORT_MARKER}") == ("bye", "")
+    assert extract_report(REPORT_MARKER) == ("", "")
+
+
+def test_parse_junit():
+    tests = parse_report(JUNIT, "junit")
+    assert [(t["name"], t["status"], t["duration_ms"]) for t in tests] == [
+        ("test_a", "passed", 2), ("test_b", "failed", 13),
+        ("test_c", "error", 0), ("test_d", "skipped", 0)]
+    assert tests[0]["message"] is None
+    assert tests[1]["message"] == "assert 3 == 4"
+    assert tests[2]["message"] == "boom"
+
+
+def test_parse_jest():
+    tests = parse_report(JEST, "jest")
+    assert [(t["name"], t["status"], t["duration_ms"]) for t in tests] == [
+        ("twoSum basic", "passed", 4), ("twoSum negative", "failed", 12),
+        ("twoSum later", "skipped", None)]
+    assert tests[1]["message"] == "Expected: [0, 2]\nReceived: undefined"
+
+
+def test_parse_json():
+    raw = json.dumps({"tests": [
+        {"name": "test_basic", "status": "passed", "duration_ms": 3, "message": None},
+        {"name": "test_edge", "status": "weird", "duration_ms": None, "message": "x"},
+    ]})
+    assert parse_report(raw, "json") == [
+        {"name": "test_basic", "status": "passed", "duration_ms": 3, "message": None},
+        {"name": "test_edge", "status": "failed", "duration_ms": None, "message": "x"},
+    ]
+
+
+def test_unreadable_reports():
+    assert parse_report("", "junit") is None
+    assert parse_report("<testsuite", "junit") is None
+    assert parse_report("{}", "jest") is None
+    with pytest.raises(ValueError, match="Unknown report format"):
+        parse_report("{}", "tap")
+
+
+def test_hide_stats_hides_report():
+    lines = []
+    forward = hide_stats(lines.append)
+    for line in ["ok\n", "\n", f"{REPORT_MARKER}\n", "<xml/>\n"]:
+        forward(line)
+    assert lines == ["ok\n", "\n"]
+
+
+def test_pack_reports_are_declared():
+    for lang, fmt in (("python", "junit"), ("javascript", "jest"), ("ruby", "json")):
+        with open(os.path.join(PACKS, lang, "pack.json")) as f:
+            report = json.load(f)["report"]
+        assert report["format"] == fmt
+        assert "{command}" in report["command"]
+
+
+@pytest.mark.skipif(shutil.which("ruby") is None, reason="ruby not installed")
+def test_minitest_plugin_writes_report(tmp_path):
+    (tmp_path / "test_solution.rb").write_text(
+        "require 'minitest/autorun'\n"
+        "class T < Minitest::Test\n"
+        "  def test_ok; assert true; end\n"
+        "  def test_bad; assert_equal 1, 2; end\n"
+        "end\n")
+    plugin = os.path.abspath(os.path.join(PACKS, "ruby", "minitest_json.rb"))
+    subprocess.run(["ruby", "test_solution.rb"], cwd=tmp_path, capture_output=True,
+                   env=dict(os.environ, RUBYOPT=f"-r{plugin}"), timeout=60)
+    tests = parse_report((tmp_path / ".drb-report.json").read_text(), "json")
+    assert sorted((t["name"], t["status"]) for t in tests) == [
+        ("test_bad", "failed"), ("test_ok", "passed")]
+    assert "Expected: 1" in next(t for t in tests if t["name"] == "test_bad")["message"]
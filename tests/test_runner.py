@@ -1,7 +1,8 @@
+import json
 import os
 import pytest
 from unittest.mock import patch
-from drb.runner import run_tests
+from drb.runner import pack_run_options, run_cases, run_tests
 
 
 def test_passing_solution():
@@ -39,7 +40,7 @@ def test_timeout():
 
 def test_files_written_to_tmpdir():
     written_dir = [None]
-    def mock_run_in_container(engine, image, test_command, work_dir, timeout=10):
+    def mock_run_in_container(engine, image, test_command, work_dir, timeout=10, **kwargs):
         written_dir[0] = work_dir
         assert os.path.isfile(os.path.join(work_dir, "solution.py"))
         assert os.path.isfile(os.path.join(work_dir, "test_solution.py"))
@@ -52,7 +53,7 @@ def test_files_written_to_tmpdir():
 
 def test_custom_filenames():
     written_files = []
-    def mock_run_in_container(engine, image, test_command, work_dir, timeout=10):
+    def mock_run_in_container(engine, image, test_command, work_dir, timeout=10, **kwargs):
         written_files.append(os.listdir(work_dir))
         assert os.path.isfile(os.path.join(work_dir, "solution.js"))
         assert os.path.isfile(os.path.join(work_dir, "test_solution.js"))
@@ -62,3 +63,414 @@ def test_custom_filenames():
         run_tests("code", "test_code", engine="docker", image="img",
                   test_command="jest", solution_file="solution.js",
                   test_file="test_solution.js")
+
+
+def test_pool_used_when_given():
+    class FakePool:
+        def run(self, image, test_command, files, timeout, **kwargs):
+            self.args = (image, test_command, files, timeout)
+            return {"passed": True, "output": "warm"}
+
+    pool = FakePool()
+    with patch("drb.runner.run_in_container") as mock_container:
+        result = run_tests("code", "tests", engine="docker", image="img",
+                           test_command="pytest", timeout=5, pool=pool)
+    mock_container.assert_not_called()
+    assert result["output"] == "warm"
+    assert pool.args == ("img", "pytest",
+                         {"solution.py": "code", "test_solution.py": "tests"}, 5)
+
+
+def test_harness_failure_falls_back_to_fresh_container():
+    from drb.pool import HarnessError
+
+    class BrokenPool:
+        def run(self, *args, **kwargs):
+            raise HarnessError("harness died")
+
+    with patch("drb.runner.run_in_container") as mock_container:
+        mock_container.return_value = {"passed": True, "output": "cold"}
+        result = run_tests("code", "tests", engine="docker", image="img",
+                           test_command="pytest", pool=BrokenPool(),
+                           harness="python /opt/drb/harness.py")
+    assert result["output"] == "cold"
+    mock_container.assert_called_once()
+
+
+def test_cache_hit_skips_container(tmp_path):
+    from drb.cache import ResultCache
+
+    cache = ResultCache(str(tmp_path))
+    with patch("drb.runner.resolve_image_id", return_value="sha256:img"), \
+         patch("drb.runner.run_in_container") as mock_container:
+        mock_container.return_value = {"passed": True, "output": "1 passed"}
+        first = run_tests("code", "tests", engine="docker", image="img",
+                          test_command="pytest", cache=cache)
+        second = run_tests("code", "tests", engine="docker", image="img",
+                           test_command="pytest", cache=cache)
+    assert mock_container.call_count == 1
+    assert "cached" not in first
+    assert second.pop("phases").keys() == {"lookup", "total"}
+    assert second == {"passed": True, "output": "1 passed", "cached": True}
+
+
+def test_run_tests_reports_phases():
+    with patch("drb.runner.run_in_container") as mock_container:
+        mock_container.return_value = {
+            "passed": True, "output": "ok",
+            "phases": {"start": 100, "test": 300, "teardown": 50},
+        }
+        result = run_tests("code", "tests", engine="docker", image="img", test_command="pytest")
+    phases = result["phases"]
+    assert list(phases) == ["lookup", "prepare", "start", "test", "teardown", "total"]
+    assert (phases["start"], phases["test"], phases["teardown"]) == (100, 300, 50)
+
+
+def test_run_tests_without_engine_phases_reports_execute():
+    with patch("drb.runner.run_in_container") as mock_container:
+        mock_container.return_value = {"passed": True, "output": "ok"}
+        result = run_tests("code", "tests", engine="docker", image="img", test_command="pytest")
+    assert list(result["phases"]) == ["lookup", "execute", "total"]
+
+
+def test_cached_result_has_no_stale_phases(tmp_path):
+    from drb.cache import ResultCache
+
+    cache = ResultCache(str(tmp_path))
+    with patch("drb.runner.resolve_image_id", return_value="sha256:img"), \
+         patch("drb.runner.run_in_container") as mock_container:
+        mock_container.return_value = {"passed": True, "output": "ok",
+                                       "phases": {"start": 1, "test": 2, "teardown": 3}}
+        run_tests("code", "tests", engine="docker", image="img",
+                  test_command="pytest", cache=cache)
+    stored = json.loads(next(tmp_path.glob("*.json")).read_text())
+    assert "phases" not in stored
+
+
+def test_cache_miss_on_changed_code(tmp_path):
+    from drb.cache import ResultCache
+
+    cache = ResultCache(str(tmp_path))
+    with patch("drb.runner.resolve_image_id", return_value="sha256:img"), \
+         patch("drb.runner.run_in_container") as mock_container:
+        mock_container.return_value = {"passed": False, "output": "FAILED"}
+        run_tests("v1", "tests", engine="docker", image="img",
+                  test_command="pytest", cache=cache)
+        run_tests("v2", "tests", engine="docker", image="img",
+                  test_command="pytest", cache=cache)
+    assert mock_container.call_count == 2
+
+
+def test_timeouts_not_cached(tmp_path):
+    from drb.cache import ResultCache
+
+    cache = ResultCache(str(tmp_path))
+    with patch("drb.runner.resolve_image_id", return_value="sha256:img"), \
+         patch("drb.runner.run_in_container") as mock_container:
+        mock_container.return_value = {
+            "passed": False,
+            "output": "Timeout: tests did not complete within 2 seconds.",
+        }
+        run_tests("code", "tests", engine="docker", image="img",
+                  test_command="pytest", cache=cache)
+        run_tests("code", "tests", engine="docker", image="img",
+                  test_command="pytest", cache=cache)
+    assert mock_container.call_count == 2
+
+
+def test_cancelled_runs_not_cached(tmp_path):
+    from drb.cache import ResultCache
+
+    cache = ResultCache(str(tmp_path))
+    with patch("drb.runner.resolve_image_id", return_value="sha256:img"), \
+         patch("drb.runner.run_in_container") as mock_container:
+        mock_container.return_value = {"passed": False, "output": ""}
+        run_tests("code", "tests", engine="docker", image="img",
+                  test_command="pytest", cache=cache, should_cache=lambda: False)
+        run_tests("code", "tests", engine="docker", image="img",
+                  test_command="pytest", cache=cache)
+    assert mock_container.call_count == 2
+
+
+def test_engine_errors_not_cached(tmp_path):
+    from drb.cache import ResultCache
+
+    cache = ResultCache(str(tmp_path))
+    with patch("drb.runner.resolve_image_id", return_value="sha256:img"), \
+         patch("drb.runner.run_in_container") as mock_container:
+        mock_container.return_value = {
+            "passed": False, "output": "Error: name already in use", "exit_code": 125,
+        }
+        run_tests("code", "tests", engine="docker", image="img",
+                  test_command="pytest", cache=cache)
+        run_tests("code", "tests", engine="docker", image="img",
+                  test_command="pytest", cache=cache)
+    assert mock_container.call_count == 2
+
+
+def test_killed_cases_not_cached(tmp_path):
+    from drb.cache import ResultCache
+
+    cache = ResultCache(str(tmp_path))
+    results = [{"passed": True, "output": "ok"}, {"passed": False, "output": "", "exit_code": -9}]
+    with patch("drb.runner.resolve_image_id", return_value="sha256:img"), \
+         patch("drb.runner.run_in_container", side_effect=results * 2) as mock_container:
+        for _ in range(2):
+            run_cases("code", "tests", engine="docker", image="img",
+                      case_command="pytest {case}", cases=["a", "b"], workers=1,
+                      cache=cache)
+    assert mock_container.call_count == 4
+
+
+def test_cache_skipped_without_image_id(tmp_path):
+    from drb.cache import ResultCache
+
+    cache = ResultCache(str(tmp_path))
+    with patch("drb.runner.resolve_image_id", return_value=None), \
+         patch("drb.runner.run_in_container") as mock_container:
+        mock_container.return_value = {"passed": True, "output": "ok"}
+        run_tests("code", "tests", engine="docker", image="img",
+                  test_command="pytest", cache=cache)
+    assert os.listdir(str(tmp_path)) == []
+
+
+def test_stdin_transport_skips_tmpdir():
+    with patch("drb.runner.run_with_stdin") as mock_stdin, \
+         patch("drb.runner.run_in_container") as mock_container:
+        mock_stdin.return_value = {"passed": True, "output": "ok"}
+        result = run_tests("code", "tests", engine="podman", image="img",
+                           test_command="pytest", transport="stdin")
+    assert result["passed"] is True
+    mock_container.assert_not_called()
+    files = mock_stdin.call_args[0][3]
+    assert files == {"solution.py": "code", "test_solution.py": "tests"}
+
+
+def test_run_cases_runs_each_case_and_merges():
+    import threading
+    import time
+
+    seen = []
+    barrier = threading.Barrier(3, timeout=5)
+
+    def fake_container(engine, image, test_command, work_dir, timeout, **kwargs):
+        seen.append((test_command, kwargs["name"]))
+        barrier.wait()  # all three cases must be in flight at once
+        if "test_b" in test_command:
+            time.sleep(0.05)
+            return {"passed": False, "output": "assert 1 == 2"}
+        return {"passed": True, "output": "1 passed"}
+
+    lines = []
+    with patch("drb.runner.run_in_container", side_effect=fake_container):
+        result = run_cases("code", "tests", engine="docker", image="img",
+                           case_command="pytest test_solution.py::{case} -q",
+                           cases=["test_a", "test_b", "test_c"], name="drb-run-x",
+                           workers=3, on_output=lines.append)
+    assert sorted(seen) == [
+        ("pytest test_solution.py::test_a -q", "drb-run-x-0"),
+        ("pytest test_solution.py::test_b -q", "drb-run-x-1"),
+        ("pytest test_solution.py::test_c -q", "drb-run-x-2"),
+    ]
+    assert result["passed"] is False
+    assert [c["name"] for c in result["cases"]] == ["test_a", "test_b", "test_c"]
+    assert [c["passed"] for c in result["cases"]] == [True, False, True]
+    assert result["cases"][1]["duration_ms"] >= 50
+    assert "--- test_b: FAIL" in result["output"]
+    assert result["output"].endswith("ms")
+    assert "2/3 cases passed" in result["output"]
+    assert lines[-1].startswith("--- test_b: FAIL")
+
+
+def test_run_cases_passes_case_to_pool():
+    class FakePool:
+        def __init__(self):
+            self.cases = []
+
+        def run(self, image, test_command, files, timeout, **kwargs):
+            self.cases.append(kwargs["case"])
+            return {"passed": True, "output": ""}
+
+    pool = FakePool()
+    result = run_cases("code", "tests", engine="docker", image="img",
+                       case_command="jest -t {case}", cases=["adds", "subtracts"],
+                       test_file="test_solution.js", pool=pool)
+    assert sorted(pool.cases) == ["adds", "subtracts"]
+    assert result["passed"] is True
+
+
+def test_run_cases_cached(tmp_path):
+    from drb.cache import ResultCache
+
+    cache = ResultCache(str(tmp_path))
+    with patch("drb.runner.resolve_image_id", return_value="sha256:img"), \
+         patch("drb.runner.run_in_container") as mock_container:
+        mock_container.return_value = {"passed": True, "output": "ok"}
+        for _ in range(2):
+            result = run_cases("code", "tests", engine="docker", image="img",
+                               case_command="pytest ::{case}", cases=["test_a", "test_b"],
+                               cache=cache)
+    assert mock_container.call_count == 2
+    assert result["cached"] is True
+
+
+def test_resource_flags_reach_fresh_container():
+    with patch("drb.runner.run_in_container") as mock_container:
+        mock_container.return_value = {"passed": True, "output": "ok"}
+        run_tests("code", "tests", engine="docker", image="img", test_command="pytest",
+                  resource_flags=("--memory=512m", "--cpus=2"))
+    assert mock_container.call_args[1]["resource_flags"] == ("--memory=512m", "--cpus=2")
+
+
+def test_pool_skipped_when_limits_differ():
+    class FakePool:
+        def flags_for(self, image):
+            return ("--memory=256m", "--cpus=1")
+
+        def run(self, *args, **kwargs):
+            raise AssertionError("pool containers have other limits")
+
+    with patch("drb.runner.run_in_container") as mock_container:
+        mock_container.return_value = {"passed": True, "output": "fresh"}
+        result = run_tests("code", "tests", engine="docker", image="img",
+                           test_command="pytest", pool=FakePool(),
+                           resource_flags=("--memory=512m", "--cpus=1"))
+    assert result["output"] == "fresh"
+
+
+def test_pool_used_despite_cache_mounts():
+    class FakePool:
+        def flags_for(self, image):
+            return ("--memory=256m",)
+
+        def run(self, image, test_command, files, timeout, **kwargs):
+            return {"passed": True, "output": "warm"}
+
+    with patch("drb.runner.run_in_container") as mock_container:
+        result = run_tests("code", "tests", engine="docker", image="img",
+                           test_command="pytest", pool=FakePool(),
+                           resource_flags=("--memory=256m", "--volume=drb-cache-img_1_pyc:/cache",
+                                           "--env=PYTHONPYCACHEPREFIX=/cache"))
+    mock_container.assert_not_called()
+    assert result["output"] == "warm"
+
+
+def test_cache_keyed_by_limits(tmp_path):
+    from drb.cache import ResultCache
+
+    cache = ResultCache(str(tmp_path))
+    with patch("drb.runner.resolve_image_id", return_value="sha256:img"), \
+         patch("drb.runner.run_in_container") as mock_container:
+        mock_container.return_value = {"passed": True, "output": "ok"}
+        run_tests("code", "tests", engine="docker", image="img", test_command="pytest",
+                  timeout=30, cache=cache)
+        run_tests("code", "tests", engine="docker", image="img", test_command="pytest",
+                  timeout=5, cache=cache)
+    assert mock_container.call_count == 2
+
+
+JUNIT_REPORT = ('<testsuite><testcase name="test_a" time="0.004" />'
+                '<testcase name="test_b" time="0.001"><failure message="assert 1 == 2">x</failure>'
+                '</testcase></testsuite>')
+REPORT_SPEC = {"format": "junit", "file": ".drb-report.xml",
+               "command": "{command} --junitxml=.drb-report.xml"}
+
+
+def test_report_becomes_tests():
+    with patch("drb.runner.run_in_container") as mock_container:
+        mock_container.return_value = {
+            "passed": False, "output": "1 failed, 1 passed\n__DRB_REPORT__\n" + JUNIT_REPORT}
+        result = run_tests("code", "tests", engine="docker", image="img",
+                           test_command="pytest -q", report=REPORT_SPEC)
+    command = mock_container.call_args[0][2]
+    assert command.startswith("pytest -q --junitxml=.drb-report.xml;")
+    assert result["output"] == "1 failed, 1 passed"
+    assert result["tests"] == [
+        {"name": "test_a", "status": "passed", "duration_ms": 4, "message": None},
+        {"name": "test_b", "status": "failed", "duration_ms": 1, "message": "assert 1 == 2"},
+    ]
+
+
+def test_missing_report_keeps_output():
+    with patch("drb.runner.run_in_container") as mock_container:
+        mock_container.return_value = {"passed": False, "output": "Timeout: tests did not complete"}
+        result = run_tests("code", "tests", engine="docker", image="img",
+                           test_command="pytest -q", report=REPORT_SPEC)
+    result.pop("phases")
+    assert result == {"passed": False, "output": "Timeout: tests did not complete"}
+
+
+def test_case_reports_merge():
+    def fake_run(engine, image, command, work_dir, timeout, **kwargs):
+        name = "test_a" if "::test_a" in command else "test_b"
+        xml = f'<testsuite><testcase name="{name}" time="0.002" /></testsuite>'
+        return {"passed": True, "output": f"1 passed\n__DRB_REPORT__\n{xml}"}
+
+    with patch("drb.runner.run_in_container", side_effect=fake_run):
+        result = run_cases("code", "tests", engine="docker", image="img",
+                           case_command="pytest test_solution.py::{case} -q",
+                           cases=["test_a", "test_b"], report=REPORT_SPEC)
+    assert [t["name"] for t in result["tests"]] == ["test_a", "test_b"]
+    assert [c["tests"][0]["name"] for c in result["cases"]] == ["test_a", "test_b"]
+    assert "__DRB_REPORT__" not in result["output"]
+
+
+def test_pack_run_options_mount_pack_caches():
+    pack = {"name": "go", "image": "drb-go",
+            "caches": [{"name": "go-build", "path": "/cache/go-build", "env": "GOCACHE"}]}
+    with patch("drb.container.resolve_image_id", return_value="sha256:abcdef1234567890"):
+        flags = pack_run_options(pack, None, {"engine": "docker"}, "/s")["resource_flags"]
+    assert flags[-2:] == ("--volume=drb-cache-drb-go_abcdef123456_go-build:/cache/go-build",
+                          "--env=GOCACHE=/cache/go-build")
+    flags = pack_run_options(pack, None, {"engine": "native"}, "/s")["resource_flags"]
+    assert flags[-1] == "--cache=GOCACHE=/s/cache/go/go-build"
+
+
+def test_syntax_error_skips_run():
+    with patch("drb.runner.run_in_container") as mock_container, \
+         patch("drb.syntax.COMPILE_MIN_VERSION", (3,)):
+        result = run_tests("def add(a, b)\n    return a + b\n", "tests", engine="docker",
+                           image="img", test_command="pytest", syntax_check="compile")
+    mock_container.assert_not_called()
+    assert result["passed"] is False
+    assert result["syntax_error"]["line"] == 1
+    assert "Syntax error in solution.py on line 1; tests were not run." in result["output"]
+    assert list(result["phases"]) == ["check", "total"]
+
+
+def test_syntax_check_adds_phase():
+    with patch("drb.runner.run_in_container") as mock_container, \
+         patch("drb.syntax.COMPILE_MIN_VERSION", (3,)):
+        mock_container.return_value = {"passed": True, "output": "ok"}
+        result = run_tests("x = 1\n", "tests", engine="docker", image="img",
+                           test_command="pytest", syntax_check="compile")
+    assert result["passed"] is True
+    assert list(result["phases"]) == ["check", "lookup", "execute", "total"]
+
+
+def test_run_cases_stops_on_syntax_error():
+    with patch("drb.runner.run_in_container") as mock_container, \
+         patch("drb.syntax.COMPILE_MIN_VERSION", (3,)):
+        result = run_cases("def f(:\n", "tests", engine="docker", image="img",
+                           case_command="pytest {case}", cases=["test_a", "test_b"],
+                           syntax_check="compile")
+    mock_container.assert_not_called()
+    assert result["syntax_error"]["file"] == "solution.py"
+
+
+def test_pack_run_options_syntax_check():
+    pack = {"name": "python", "syntax_check": "compile"}
+    assert pack_run_options(pack, None, {"engine": "native"}, "/s")["syntax_check"] == "compile"
+    options = pack_run_options(pack, None, {"engine": "native", "syntax_check": False}, "/s")
+    assert options["syntax_check"] is None
+
+
+def test_pack_run_options_prepares_fixtures(tmp_path):
+    pack = {"name": "python", "image": "drb-python", "fixtures": True}
+    problem = {"fixtures": {"nums.txt": "ab" * 32}}
+    with patch("drb.runner.prepare_fixtures") as prepare:
+        options = pack_run_options(pack, problem, {"engine": "docker"}, str(tmp_path),
+                                   "/packs/python")
+        pack_run_options(pack, None, {"engine": "docker"}, str(tmp_path), "/packs/python")
+    prepare.assert_called_once_with(pack, problem, "/packs/python", str(tmp_path))
+    assert f"--volume={tmp_path}/fixtures/packs/python:/fixtures:ro" in options["resource_flags"]
@@ -0,0 +1,56 @@
+import json
+from unittest.mock import patch
+
+from drb.stats import RUNS_LOG, load_runs, percentile, record_run, summarize
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile([7], 99) == 7
+    assert percentile([], 50) is None
+
+
+def test_record_run_appends_jsonl(tmp_path):
+    result = {"passed": False, "output": "x", "cached": True, "phases": {"lookup": 2, "total": 3}}
+    record_run(str(tmp_path), result, "python", "two_sum", "podman")
+    record_run(str(tmp_path), {"passed": True, "output": "no phases"}, "python", "two_sum", "podman")
+    runs = load_runs(str(tmp_path))
+    assert len(runs) == 1
+    assert runs[0]["pack"] == "python"
+    assert runs[0]["problem"] == "two_sum"
+    assert runs[0]["engine"] == "podman"
+    assert runs[0]["passed"] is False
+    assert runs[0]["cached"] is True
+    assert runs[0]["phases"] == {"lookup": 2, "total": 3}
+    assert "output" not in runs[0]
+
+
+def test_log_is_capped(tmp_path):
+    with patch("drb.stats.MAX_LOG_BYTES", 2000):
+        for i in range(100):
+            record_run(str(tmp_path), {"phases": {"total": i}}, "python", "p", "docker")
+    assert (tmp_path / RUNS_LOG).stat().st_size <= 2000
+    runs = load_runs(str(tmp_path))
+    assert runs[-1]["phases"]["total"] == 99
+    assert runs[0]["phases"]["total"] > 0
+
+
+def test_load_runs_skips_broken_lines(tmp_path):
+    (tmp_path / RUNS_LOG).write_text(json.dumps({"pack": "js", "phases": {}}) + "\n{\"pa")
+    assert load_runs(str(tmp_path)) == [{"pack": "js", "phases": {}}]
+    assert load_runs(str(tmp_path / "missing")) == []
+
+
+def test_summarize_per_pack_and_phase():
+    runs = [
+        {"pack": "python", "phases": {"total": 40, "lookup": 1, "test": 30}},
+        {"pack": "python", "phases": {"total": 20, "lookup": 3, "test": 10}},
+        {"pack": "js", "phases": {"lookup": 0, "total": 2}},
+    ]
+    summary = summarize(runs)
+    assert list(summary["python"]) == ["lookup", "test", "total"]
+    assert summary["python"]["total"] == {"n": 2, "p50": 20, "p95": 40, "p99": 40}
+    assert summary["js"]["total"]["n"] == 1
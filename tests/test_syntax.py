@@ -0,0 +1,90 @@
+import shutil
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from drb.syntax import check_syntax
+
+
+@pytest.fixture
+def new_host():
+    with patch("drb.syntax.COMPILE_MIN_VERSION", (3,)):
+        yield
+
+
+def test_python_compile_reports_line(new_host):
+    error = check_syntax("def f():\n    return (1\n\nx = 2\n", "solution.py", "compile")
+    assert error["file"] == "solution.py"
+    assert error["line"] == 2
+    assert "never closed" in error["message"]
+    assert 'File "solution.py", line 2' in error["output"]
+
+
+def test_python_compile_passes_valid_code(new_host):
+    assert check_syntax("def f():\n    return 1\n", "solution.py", "compile") is None
+
+
+def test_python_compile_uses_warm_container_on_older_host():
+    pool = MagicMock()
+    pool.check.return_value = (1, '  File "/pool/1a2b/solution.py", line 1\n    def f(:\n'
+                                  '          ^\nSyntaxError: invalid syntax\n')
+    with patch("drb.syntax.COMPILE_MIN_VERSION", (99,)), \
+         patch("shutil.which", return_value="/usr/bin/python"):
+        assert check_syntax("def f(:\n", "solution.py", "compile") is None
+        error = check_syntax("def f(:\n", "solution.py", "compile",
+                             image="drb-python", pool=pool)
+    assert pool.check.call_args[0][1] == "python -m py_compile solution.py"
+    assert (error["line"], error["message"]) == (1, "SyntaxError: invalid syntax")
+
+
+def test_host_command_output_is_parsed():
+    result = MagicMock(returncode=1, stderr="",
+                       stdout="/tmp/abc/solution.js:3\n  x +;\n\nSyntaxError: Unexpected token ';'\n")
+    with patch("shutil.which", return_value="/usr/bin/node"), \
+         patch("subprocess.run", return_value=result) as run:
+        error = check_syntax("code", "solution.js", "node --check {file}")
+    assert run.call_args[0][0] == ["node", "--check", "solution.js"]
+    assert error["line"] == 3
+    assert error["message"] == "SyntaxError: Unexpected token ';'"
+    assert error["output"].startswith("solution.js:3")
+
+
+def test_gofmt_style_message():
+    result = MagicMock(returncode=2, stdout="", stderr="solution.go:4:1: expected operand, found '}'\n")
+    with patch("shutil.which", return_value="/usr/bin/gofmt"), \
+         patch("subprocess.run", return_value=result):
+        error = check_syntax("code", "solution.go", "gofmt -l -e {file}")
+    assert (error["line"], error["message"]) == (4, "expected operand, found '}'")
+
+
+def test_unparseable_failure_does_not_block():
+    result = MagicMock(returncode=1, stdout="", stderr="Segmentation fault\n")
+    with patch("shutil.which", return_value="/usr/bin/ruby"), \
+         patch("subprocess.run", return_value=result):
+        assert check_syntax("code", "solution.rb", "ruby -c {file}") is None
+
+
+def test_falls_back_to_warm_container():
+    pool = MagicMock()
+    pool.check.return_value = (1, "/pool/1a2b/solution.rb:2: syntax error, unexpected end-of-input\n")
+    with patch("shutil.which", return_value=None):
+        error = check_syntax("code", "solution.rb", "ruby -c {file}", image="drb-ruby", pool=pool)
+    assert pool.check.call_args[0][:3] == ("drb-ruby", "ruby -c solution.rb", {"solution.rb": "code"})
+    assert error["line"] == 2
+    assert error["message"] == "syntax error, unexpected end-of-input"
+
+
+def test_skipped_without_checker():
+    pool = MagicMock()
+    pool.check.return_value = None  # no idle container
+    with patch("shutil.which", return_value=None):
+        assert check_syntax("code", "solution.rb", "ruby -c {file}") is None
+        assert check_syntax("code", "solution.rb", "ruby -c {file}",
+                            image="drb-ruby", pool=pool) is None
+
+
+@pytest.mark.skipif(not shutil.which("node"), reason="node not installed")
+def test_node_check_on_host():
+    error = check_syntax("function f() {\n  return 1 +;\n}\n", "solution.js", "node --check {file}")
+    assert error["line"] == 2
+    assert check_syntax("function f() { return 1; }\n", "solution.js", "node --check {file}") is None
@@ -0,0 +1,78 @@
+import json
+from unittest.mock import patch
+
+import pytest
+
+from drb.verify import format_row, verify_packs, verify_row
+
+
+@pytest.fixture
+def packs_dir(tmp_path):
+    for pack_name in ("alpha", "beta"):
+        pack_dir = tmp_path / pack_name
+        pack_dir.mkdir()
+        (pack_dir / "pack.json").write_text(json.dumps({
+            "name": pack_name, "image": f"drb-{pack_name}", "test_command": "run",
+            "problems": ["one", "two"],
+        }))
+        for problem_id in ("one", "two"):
+            problem = {"id": problem_id, "skeleton": "SKELETON", "test_code": "tests"}
+            if problem_id == "one":
+                problem["reference_solution"] = "REFERENCE"
+            (pack_dir / f"{problem_id}.json").write_text(json.dumps(problem))
+    return str(tmp_path)
+
+
+def fake_run(code, test_code, **kwargs):
+    return {"passed": code == "REFERENCE", "output": f"ran {code}"}
+
+
+def test_verify_packs_checks_reference_and_skeleton(packs_dir):
+    seen = []
+    with patch("drb.verify.run_tests", side_effect=fake_run) as mock_run:
+        rows = verify_packs(packs_dir, ["alpha", "beta"], {"engine": "docker"}, packs_dir,
+                            workers=3, on_result=seen.append)
+
+    assert [(r["pack"], r["problem"]) for r in rows] == [
+        ("alpha", "one"), ("alpha", "two"), ("beta", "one"), ("beta", "two")]
+    assert len(seen) == 4
+    assert all(r["ok"] for r in rows)
+    assert rows[0]["reference"] == "passed" and rows[0]["skeleton"] == "failed"
+    assert rows[1]["reference"] is None and rows[1]["reference_ms"] is None
+    # Three runs per pack: one reference and two skeletons.
+    assert mock_run.call_count == 6
+    images = {call[1]["image"] for call in mock_run.call_args_list}
+    assert images == {"drb-alpha", "drb-beta"}
+    assert all(call[1].get("cache") is None for call in mock_run.call_args_list)
+
+
+def test_verify_packs_reports_bad_limits_as_rows(packs_dir):
+    config = {"engine": "docker", "limits": {"memory": "lots"}}
+    with patch("drb.verify.run_tests", side_effect=fake_run) as mock_run:
+        rows = verify_packs(packs_dir, ["alpha"], config, packs_dir)
+    mock_run.assert_not_called()
+    assert [r["ok"] for r in rows] == [False, False]
+    assert "Invalid memory limit" in rows[0]["errors"][0]
+    assert "FAIL" in format_row(rows[0])
+
+
+def test_verify_row_flags_broken_problems():
+    problem = {"id": "one"}
+    row = verify_row("alpha", problem, {"passed": False, "output": "AssertionError"}, 40,
+                     {"passed": True, "output": ""}, 30, timeout=10)
+    assert row["ok"] is False
+    assert "AssertionError" in row["errors"][0]
+    assert "skeleton passes" in row["errors"][1]
+
+    slow = verify_row("alpha", problem, {"passed": True, "output": ""}, 6000,
+                      {"passed": False, "output": ""}, 30, timeout=10)
+    assert slow["ok"] is True and slow["slow"] is True
+    assert "slow" in format_row(slow)
+
+
+def test_verify_row_timeout_outcome():
+    row = verify_row("alpha", {"id": "one"}, None, None,
+                     {"passed": False, "output": "Timeout: tests did not complete within 10 seconds."}, 10000,
+                     timeout=10)
+    assert row["skeleton"] == "timeout"
+    assert row["ok"] is True